@@ -0,0 +1,258 @@
+"""
+A content addressed on-disk cache of the results of workflow components for single molecules.
+"""
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from openforcefield.topology import Molecule
+from pydantic import BaseModel
+
+from openff.qcsubmit.datasets import ComponentResult
+from openff.qcsubmit.utils import pack_molecule
+
+
+def _canonicalize(value: Any) -> Any:
+    """
+    Turn settings and molecule properties such as the torsion indexer, which may have tuple keys, into json
+    serializable values with a fixed order so they can be hashed.
+    """
+    if isinstance(value, BaseModel):
+        value = value.dict()
+    if isinstance(value, dict):
+        return sorted(
+            ([repr(key), _canonicalize(item)] for key, item in value.items()),
+            key=lambda pair: pair[0],
+        )
+    if isinstance(value, (set, frozenset)):
+        return sorted((_canonicalize(item) for item in value), key=repr)
+    if isinstance(value, (list, tuple)):
+        return [_canonicalize(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return repr(value)
+
+
+class ResultCache:
+    """
+    Store the result of running a workflow component on each molecule on local disk, so that rerunning a workflow
+    with unchanged components only has to process molecules which have not been seen before.
+
+    Results are keyed by a hash of the settings and provenance of the component and a hash of the input molecule, once
+    the cache grows past its size limit the least recently used results are removed.
+
+    Example:
+        Reusing results between runs.
+
+        ```python
+        >>> from openff.qcsubmit.cache import ResultCache
+        >>> cache = ResultCache(directory="qcsubmit-cache", max_size=2000)
+        >>> result = component.apply(molecules, cache=cache)
+        >>> # only the new molecules are processed
+        >>> result = component.apply(molecules + new_molecules, cache=cache)
+        ```
+
+    Note:
+        Molecules which crash or time out a worker are not cached as the failure may not happen again.
+    """
+
+    def __init__(self, directory: str, max_size: Optional[float] = 1000):
+        """
+        Parameters:
+            directory: The directory the results should be stored in, this is made if it does not exist.
+            max_size: The largest size in MB the cache may grow to before old results are removed, None means no limit.
+        """
+        self.directory: str = os.path.abspath(directory)
+        self.max_size: Optional[float] = max_size
+        os.makedirs(self.directory, exist_ok=True)
+
+    def __repr__(self):
+        return f"ResultCache(directory={self.directory}, max_size={self.max_size})"
+
+    @staticmethod
+    def get_component_key(
+        component_description: Dict[str, Any], component_provenance: Dict[str, str]
+    ) -> str:
+        """
+        Create the key of a workflow component from its settings and provenance, so a change in either the settings
+        or the version of a dependency will not reuse old results.
+
+        Parameters:
+            component_description: The dictionary representation of the component.
+            component_provenance: The provenance of the component.
+        """
+        settings = json.dumps(
+            _canonicalize([component_description, component_provenance])
+        )
+        return hashlib.sha1(settings.encode()).hexdigest()
+
+    @staticmethod
+    def get_molecule_key(molecule: Molecule) -> str:
+        """
+        Create the key of an input molecule from its graph, atom order, conformers and properties.
+
+        The atom order is part of the key as the coordinates and torsion indices of the results are given in the order
+        of the input molecule.
+
+        Parameters:
+            molecule: The input molecule.
+        """
+        record = pack_molecule(molecule)
+        hasher = hashlib.sha1()
+        for array in (
+            record.atomic_numbers,
+            record.formal_charges,
+            record.is_aromatic,
+            record.bonds,
+            record.bond_orders,
+            record.bond_aromatic,
+        ):
+            hasher.update(array.tobytes())
+        if record.conformers is not None:
+            # round the coordinates so that noise from a file round trip does not change the key
+            hasher.update(np.round(record.conformers, 6).tobytes())
+        if record.partial_charges is not None:
+            hasher.update(np.round(record.partial_charges, 6).tobytes())
+        hasher.update(
+            json.dumps(
+                _canonicalize(
+                    [
+                        record.name,
+                        record.atom_stereo,
+                        record.bond_stereo,
+                        record.properties,
+                    ]
+                )
+            ).encode()
+        )
+        return hasher.hexdigest()
+
+    def _get_path(self, component_key: str, molecule_key: str) -> str:
+        """
+        Get the file which holds the result of the component for the molecule.
+        """
+        return os.path.join(self.directory, component_key, f"{molecule_key}.pkl")
+
+    def get(self, component_key: str, molecule_key: str) -> Optional[ComponentResult]:
+        """
+        Get the stored result of a component for a molecule.
+
+        Parameters:
+            component_key: The key of the component.
+            molecule_key: The key of the input molecule.
+
+        Returns:
+            The result holding the passed and filtered molecules, with their molecules still packed, or `None` if the
+            result is not cached.
+        """
+        path = self._get_path(component_key, molecule_key)
+        try:
+            with open(path, "rb") as cached:
+                state = pickle.load(cached)
+            # mark the result as recently used
+            os.utime(path, None)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+        result = ComponentResult.__new__(ComponentResult)
+        result.__setstate__(state)
+        return result
+
+    def put(
+        self, component_key: str, molecule_key: str, result: ComponentResult
+    ) -> None:
+        """
+        Store the result of a component for a molecule, the result is written atomically so that workers can share
+        the cache.
+
+        Parameters:
+            component_key: The key of the component.
+            molecule_key: The key of the input molecule.
+            result: The result of the component for the single molecule.
+        """
+        path = self._get_path(component_key, molecule_key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # the component information is not needed to rebuild the molecules
+        state = result.__getstate__()
+        state.update(
+            component_description={}, component_provenance={}, scheduling_report=None
+        )
+
+        handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as output:
+                pickle.dump(state, output, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _get_entries(self) -> List[Tuple[float, int, str]]:
+        """
+        Get the last used time, size and path of every cached result.
+        """
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for file_name in files:
+                if not file_name.endswith(".pkl"):
+                    continue
+                path = os.path.join(root, file_name)
+                try:
+                    stats = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stats.st_mtime, stats.st_size, path))
+
+        return entries
+
+    @property
+    def size(self) -> float:
+        """
+        Returns:
+            The size of the cached results in MB.
+        """
+        return sum(size for _, size, _ in self._get_entries()) / 1024 ** 2
+
+    def evict(self) -> int:
+        """
+        Remove the least recently used results until the cache is within its size limit.
+
+        Returns:
+            The number of results which were removed.
+        """
+        if self.max_size is None:
+            return 0
+
+        entries = self._get_entries()
+        total_size = sum(size for _, size, _ in entries)
+        max_size = self.max_size * 1024 ** 2
+
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total_size <= max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+            removed += 1
+
+        return removed
+
+    def clear(self) -> None:
+        """
+        Remove every cached result.
+        """
+        for _, _, path in self._get_entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
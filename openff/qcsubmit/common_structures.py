@@ -9,7 +9,15 @@ from typing import Any, ClassVar, Dict, List, Optional, Set, Tuple, Union
 
 import numpy as np
 import qcportal as ptl
-from pydantic import BaseModel, Field, HttpUrl, PositiveInt, constr, validator
+from pydantic import (
+    BaseModel,
+    Field,
+    HttpUrl,
+    PositiveFloat,
+    PositiveInt,
+    constr,
+    validator,
+)
 from qcelemental import constants
 from qcelemental.models.results import WavefunctionProtocolEnum
 from qcfractal.interface import FractalClient
@@ -55,11 +63,39 @@ class ResultsConfig(BaseModel):
 class ComponentProperties(BaseModel):
     """
     The workflow properties class which controls if the component can be used in multiprocessing or if the component
-    produces duplicates.
+    produces duplicates, along with any limits on the resources the component can use when ran in parallel.
     """
 
     process_parallel: bool = True
     produces_duplicates: bool = True
+    max_workers: Optional[PositiveInt] = Field(
+        None,
+        description="The most workers which may run the component at once, None means no limit.",
+    )
+    max_memory: Optional[PositiveFloat] = Field(
+        None,
+        description="The memory in MB each worker needs to run the component, this limits the number of workers to fit the memory budget of the executor and workers which use more are replaced.",
+    )
+    licence_seats: Optional[PositiveInt] = Field(
+        None,
+        description="The number of licence seats available to the component, for example OpenEye licences, which limits the number of workers which may run it at once.",
+    )
+    pure_filter: bool = Field(
+        False,
+        description="If the component only removes molecules based on their chemical graph, without changing them or reading their conformers, so it may be moved in front of components which do not change the graph.",
+    )
+    changes_graph: bool = Field(
+        True,
+        description="If the component may change the chemical graph of the molecules, for example by enumerating states or fragmenting, filters are never moved past these components.",
+    )
+    relative_cost: PositiveFloat = Field(
+        1.0,
+        description="A rough cost of running the component on one molecule relative to a simple filter, used to plan the order of the workflow.",
+    )
+    batch_size: Optional[PositiveInt] = Field(
+        None,
+        description="The preferred number of molecules passed to the `_apply_batch` method of the component in one call, components which share work between molecules or use vectorised code set this. None means the molecules are processed one at a time.",
+    )
 
     class Config:
         allow_mutation: bool = False
@@ -1,6 +1,16 @@
 import json
 import os
-from typing import Any, Dict, Generator, List, Optional, Set, Tuple, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Generator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
 import qcelemental as qcel
 import qcportal as ptl
@@ -38,7 +48,23 @@ from openff.qcsubmit.exceptions import (
 )
 from openff.qcsubmit.procedures import GeometricProcedure
 from openff.qcsubmit.serializers import deserialize, serialize
-from openff.qcsubmit.utils import chunk_generator
+from openff.qcsubmit.utils import (
+    IDENTIFIER_CACHE,
+    MOLECULE_HASH_METHODS,
+    MoleculeRecord,
+    MoleculeView,
+    chunk_generator,
+    get_canonical_order,
+    get_inchikey,
+    get_molecule_file_ranges,
+    get_molecule_hash,
+    pack_molecule,
+    read_molecule_range,
+    unpack_molecule,
+)
+
+if TYPE_CHECKING:
+    from openff.qcsubmit.executors import SchedulingReport
 
 
 class ComponentResult:
@@ -49,6 +75,9 @@ class ComponentResult:
 
 
     If a molecule in the molecules list is then filtered it will be removed from the molecules list.
+
+    The molecules are stored as compact records holding the graph in numpy arrays and the conformers in one array, they
+    are only rebuilt as molecules when they are accessed through the `molecules` and `filtered` views.
     """
 
     def __init__(
@@ -61,6 +90,9 @@ class ComponentResult:
         input_directory: Optional[str] = None,
         skip_unique_check: Optional[bool] = False,
         verbose: bool = True,
+        processors: Optional[int] = 1,
+        hash_method: str = "inchikey",
+        conformer_tolerance: float = 1e-4,
     ):
         """Register the list of molecules to process.
 
@@ -82,19 +114,56 @@ class ComponentResult:
             If the timing information and progress bar should be shown while doing deduplication.
         skip_unique_check: bool. default=False
             Set to True if it is sure that all molecules will be unique in this result
-        """
+        processors: Optional[int], default=1
+            The number of processes used to read the input file or directory, large SMILES and SDF files are split
+            into ranges of records and the molecules are de-duplicated by the workers as they are read. None will use
+            all cores.
+        hash_method: str, default="inchikey"
+            The key used to find duplicate molecules, `inchikey`, `smiles` or `graph`, see
+            [get_molecule_hash][qcsubmit.utils.get_molecule_hash].
+        conformer_tolerance: float, default=1e-4
+            The largest deviation of any atom in angstroms between two conformers of the same molecule for them to be
+            treated as duplicates when the molecules are condensed.
+        """
+        if hash_method not in MOLECULE_HASH_METHODS:
+            raise ValueError(
+                f"The hash method {hash_method} is not supported, please chose from {list(MOLECULE_HASH_METHODS)}."
+            )
 
-        self._molecules: Dict[str, off.Molecule] = {}
-        self._filtered: Dict[str, off.Molecule] = {}
+        # molecules are held packed and only rebuilt when they are accessed
+        self._molecules: Dict[str, MoleculeRecord] = {}
+        self._filtered: Dict[str, MoleculeRecord] = {}
+        self._filter_reasons: Dict[str, str] = {}
+        # the canonical smiles and atom ranks of molecules which may need aligning when merged
+        self._canonical_orders: Dict[str, Tuple[str, List[int]]] = {}
         self.component_name: str = component_name
         self.component_description: Dict = component_description
         self.component_provenance: Dict = component_provenance
         self.skip_unique_check: bool = skip_unique_check
+        self.hash_method: str = hash_method
+        self.conformer_tolerance: float = conformer_tolerance
+        # set when the molecules were scheduled largest first
+        self.scheduling_report: Optional["SchedulingReport"] = None
 
         assert (
             molecules is None or input_file is None
         ), "Provide either a list of molecules or an input file name."
 
+        if (input_file is not None or input_directory is not None) and (
+            processors is None or processors > 1
+        ):
+            if input_file is not None:
+                file_paths = [input_file]
+            else:
+                file_paths = [
+                    os.path.join(input_directory, file_name)
+                    for file_name in sorted(os.listdir(input_directory))
+                ]
+            self._load_files(
+                file_paths=file_paths, processors=processors, verbose=verbose
+            )
+            input_file = input_directory = None
+
         # if we have an input file load it
         if input_file is not None:
             molecules = off.Molecule.from_file(
@@ -129,19 +198,81 @@ class ComponentResult:
             ):
                 self.add_molecule(molecule)
 
+    def _load_files(
+        self, file_paths: List[str], processors: Optional[int], verbose: bool
+    ) -> None:
+        """
+        Read molecule files in parallel, each worker reads a range of records and de-duplicates them, computing the
+        hashes and canonical orders, so only the merge of the results happens in this process. The results are merged
+        in input order as they arrive.
+
+        Parameters:
+            file_paths: The molecule files which should be read.
+            processors: The number of processes to use, None will use all cores.
+            verbose: If a progress bar should be shown.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        from functools import partial
+
+        processors = processors or os.cpu_count()
+        total_size = sum(os.path.getsize(file_path) for file_path in file_paths)
+        # aim for a few ranges per worker but do not make them so small that the overhead dominates
+        range_size = max(total_size // (processors * 4), 2 ** 18)
+        ranges = [
+            file_range
+            for file_path in file_paths
+            for file_range in get_molecule_file_ranges(file_path, range_size)
+        ]
+
+        read_range = partial(_read_component_result, hash_method=self.hash_method)
+        with ProcessPoolExecutor(max_workers=processors) as pool:
+            for result in tqdm.tqdm(
+                pool.map(read_range, ranges),
+                total=len(ranges),
+                ncols=80,
+                desc="{:30s}".format("Deduplication"),
+                disable=not verbose,
+            ):
+                self.update(result)
+
     @property
-    def molecules(self) -> List[off.Molecule]:
+    def molecules(self) -> MoleculeView:
         """
-        Get the list of molecules which can be iterated over.
+        Get a view of the molecules which can be iterated over, each molecule is rebuilt from its record when accessed.
         """
-        return list(self._molecules.values())
+        return MoleculeView(list(self._molecules.values()))
 
     @property
-    def filtered(self) -> List[off.Molecule]:
+    def filtered(self) -> MoleculeView:
+        """
+        Get a view of the molecules that have been filtered to iterate over.
+        """
+        return MoleculeView(list(self._filtered.values()))
+
+    def _get_molecule(
+        self,
+        molecule_hash: str,
+        filtered: bool = False,
+        include_conformers: bool = True,
+    ) -> off.Molecule:
         """
-        Get the list of molecule that have been filtered to iterate over.
+        Rebuild a stored molecule by its hash, the conformers can be left out when only the graph is needed.
         """
-        return list(self._filtered.values())
+        store = self._filtered if filtered else self._molecules
+        record = store[molecule_hash]
+        if not include_conformers:
+            record = record._replace(conformers=None)
+        return unpack_molecule(record)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # the molecules are already packed, copy the state so callers can change it without changing this result
+        return self.__dict__.copy()
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        # results saved before the hash method could be changed used the inchikey
+        self.hash_method = "inchikey"
+        self.conformer_tolerance = 1e-4
+        self.__dict__.update(state)
 
     @property
     def n_molecules(self) -> int:
@@ -172,36 +303,62 @@ class ComponentResult:
         """
         return len(self._filtered)
 
-    def add_molecule(self, molecule: off.Molecule) -> bool:
+    def add_molecule(
+        self,
+        molecule: off.Molecule,
+        molecule_hash: Optional[str] = None,
+        canonical_order: Optional[Tuple[str, List[int]]] = None,
+    ) -> bool:
         """
         Add a molecule to the molecule list after checking that it is not present already. If it is de-duplicate the
         record and condense the conformers and metadata.
-        """
 
-        import numpy as np
-        from simtk import unit
+        Parameters:
+            molecule: The molecule which should be added, this may be packed when the hash is given in which case it
+                is only rebuilt if it has to be aligned to a duplicate with an isomorphism check.
+            molecule_hash: The unique hash of the molecule if it has already been computed, for example by a worker.
+            canonical_order: The canonical smiles and atom ranks of the molecule if they have already been computed,
+                these are used to align duplicates without an isomorphism check.
+        """
 
         # make a unique molecule hash independent of atom order or conformers
-        molecule_hash = molecule.to_inchikey(fixed_hydrogens=True)
+        if molecule_hash is None:
+            molecule = unpack_molecule(molecule)
+            molecule_hash, molecule_order = get_molecule_hash(
+                molecule, hash_method=self.hash_method
+            )
+            canonical_order = canonical_order or molecule_order
 
         if not self.skip_unique_check and molecule_hash in self._molecules:
+            record = self._molecules[molecule_hash]
             # we need to align the molecules and transfer the coords and properties
-            # get the mapping, drop some comparisons to match inchikey
-            isomorphic, mapping = off.Molecule.are_isomorphic(
-                molecule,
-                self._molecules[molecule_hash],
-                return_atom_map=True,
-                formal_charge_matching=False,
-                bond_order_matching=False,
+            mapping = self._get_canonical_mapping(
+                canonical_order, self._canonical_orders.get(molecule_hash, None)
             )
-            assert isomorphic is True
+            if mapping is None:
+                molecule = unpack_molecule(molecule)
+                # get the mapping, dropping some comparisons when matching by inchikey
+                inchikey = self.hash_method == "inchikey"
+                isomorphic, mapping = off.Molecule.are_isomorphic(
+                    molecule,
+                    self._get_molecule(molecule_hash, include_conformers=False),
+                    return_atom_map=True,
+                    formal_charge_matching=not inchikey,
+                    bond_order_matching=not inchikey,
+                )
+                if not isomorphic and self.hash_method == "graph":
+                    # a different molecule shares the graph hash so key it by its inchikey as well
+                    return self.add_molecule(
+                        molecule,
+                        molecule_hash=self._get_collision_hash(molecule, molecule_hash),
+                        canonical_order=canonical_order,
+                    )
+                assert isomorphic is True
             # transfer any torsion indexes for similar fragments
             if "dihedrals" in molecule.properties:
                 # we need to transfer the properties; get the current molecule dihedrals indexer
                 # if one is missing create a new one
-                current_indexer = self._molecules[molecule_hash].properties.get(
-                    "dihedrals", TorsionIndexer()
-                )
+                current_indexer = record.properties.get("dihedrals", TorsionIndexer())
 
                 # update it with the new molecule info
                 current_indexer.update(
@@ -210,43 +367,198 @@ class ComponentResult:
                 )
 
                 # store it back
-                self._molecules[molecule_hash].properties["dihedrals"] = current_indexer
+                record.properties["dihedrals"] = current_indexer
 
             if molecule.n_conformers != 0:
-
-                # transfer the coordinates
-                for conformer in molecule.conformers:
-                    new_conformer = np.zeros((molecule.n_atoms, 3))
-                    for i in range(molecule.n_atoms):
-                        new_conformer[i] = conformer[mapping[i]].value_in_unit(
-                            unit.angstrom
-                        )
-
-                    new_conf = unit.Quantity(value=new_conformer, unit=unit.angstrom)
-
-                    # check if the conformer is already on the molecule
-                    for old_conformer in self._molecules[molecule_hash].conformers:
-                        if old_conformer.tolist() == new_conf.tolist():
-                            break
-                    else:
-                        self._molecules[molecule_hash].add_conformer(
-                            new_conformer * unit.angstrom
-                        )
+                self._molecules[molecule_hash] = self._transfer_conformers(
+                    molecule, record, mapping
+                )
             else:
                 # molecule already in list and coords not present so just return
                 return True
 
         else:
+            if not isinstance(molecule, MoleculeRecord):
+                molecule = pack_molecule(molecule)
             self._molecules[molecule_hash] = molecule
+            if canonical_order is not None:
+                self._canonical_orders[molecule_hash] = canonical_order
+            else:
+                self._canonical_orders.pop(molecule_hash, None)
             return False
 
-    def filter_molecule(self, molecule: off.Molecule):
+    def _transfer_conformers(
+        self,
+        molecule: Union[off.Molecule, MoleculeRecord],
+        record: MoleculeRecord,
+        mapping: Dict[int, int],
+    ) -> MoleculeRecord:
+        """
+        Reorder the conformers of a duplicate molecule into the atom order of the stored record and add those which
+        are not already on it.
+
+        Parameters:
+            molecule: The duplicate molecule whose conformers should be transferred, this may be packed.
+            record: The stored record the conformers are added to.
+            mapping: The mapping from the atoms of the duplicate to the atoms of the record.
+
+        Returns:
+            The record holding the combined conformers.
+        """
+        import numpy as np
+        from simtk import unit
+
+        if isinstance(molecule, MoleculeRecord):
+            conformers = molecule.conformers
+        else:
+            conformers = np.stack(
+                [
+                    conformer.value_in_unit(unit.angstrom)
+                    for conformer in molecule.conformers
+                ]
+            )
+        # the atom of the duplicate which sits at each position of the record
+        atom_order = np.empty(len(mapping), dtype=np.int64)
+        atom_order[list(mapping.values())] = list(mapping.keys())
+        conformers = conformers[:, atom_order]
+
+        n_stored = record.n_conformers
+        if n_stored == 0:
+            combined = conformers
+        else:
+            combined = np.concatenate([record.conformers, conformers])
+
+        # a conformer is a duplicate when the largest deviation of any atom from a conformer already kept is within
+        # the tolerance, each check only reads a view of the conformers before it so nothing is copied
+        keep = np.ones(len(combined), dtype=bool)
+        for i in range(n_stored, len(combined)):
+            if i == 0:
+                continue
+            deviations = np.abs(combined[:i] - combined[i]).max(axis=(1, 2))
+            keep[i] = not (deviations[keep[:i]] <= self.conformer_tolerance).any()
+
+        if keep[n_stored:].sum() == 0:
+            return record
+        # keep every conformer of the molecule in one contiguous array
+        return record._replace(conformers=np.ascontiguousarray(combined[keep]))
+
+    @staticmethod
+    def _get_canonical_order(molecule: off.Molecule) -> Tuple[str, List[int]]:
+        """
+        Get the canonical smiles and the canonical rank of each atom of the molecule using RDKit, two molecules with the
+        same canonical smiles can be aligned by matching the atoms with the same rank.
+        """
+        return get_canonical_order(molecule)
+
+    def _get_collision_hash(self, molecule: off.Molecule, molecule_hash: str) -> str:
+        """
+        Get the hash a molecule is stored under when a different molecule already holds its graph hash, graph hashes
+        are not canonical so some different molecules share them.
+        """
+        return f"{molecule_hash}-{get_inchikey(molecule, fixed_hydrogens=True)}"
+
+    @staticmethod
+    def _get_canonical_mapping(
+        canonical_order: Optional[Tuple[str, List[int]]],
+        reference_order: Optional[Tuple[str, List[int]]],
+    ) -> Optional[Dict[int, int]]:
+        """
+        Get the atom mapping from a molecule to the stored reference from their canonical orders.
+
+        Returns:
+            The mapping or `None` if the orders are missing or the molecules have different canonical smiles, in which
+            case the mapping has to be found with an isomorphism check.
+        """
+        if canonical_order is None or reference_order is None:
+            return None
+
+        smiles, ranks = canonical_order
+        reference_smiles, reference_ranks = reference_order
+        if smiles != reference_smiles:
+            return None
+
+        reference_atoms = [0] * len(reference_ranks)
+        for atom_index, rank in enumerate(reference_ranks):
+            reference_atoms[rank] = atom_index
+
+        return {
+            atom_index: reference_atoms[rank] for atom_index, rank in enumerate(ranks)
+        }
+
+    def compute_canonical_orders(self) -> None:
+        """
+        Compute the canonical order of every molecule which carries conformers or torsion indices, so that duplicates
+        can be aligned without an isomorphism check when this result is merged into another. This is ran by the
+        workers so that the parent process only has to do dictionary lookups.
+
+        Note:
+            This needs RDKit, without it the orders are not computed and merging falls back to an isomorphism check.
+        """
+        from openforcefield.utils.toolkits import RDKitToolkitWrapper
+
+        if not RDKitToolkitWrapper.is_available():
+            return
+
+        for molecule_hash, molecule in self._molecules.items():
+            if molecule_hash in self._canonical_orders:
+                continue
+            # packed molecules can be checked without rebuilding them
+            if molecule.n_conformers != 0 or "dihedrals" in molecule.properties:
+                self._canonical_orders[molecule_hash] = self._get_canonical_order(
+                    self._get_molecule(molecule_hash, include_conformers=False)
+                )
+
+    def update(self, result: "ComponentResult") -> None:
+        """
+        Merge another result into this one, reusing the molecule hashes and canonical orders it already holds. Packed
+        molecules are kept packed unless they have to be merged with a duplicate.
+
+        Parameters:
+            result: The result which should be merged into this one, for example the result of a chunk of molecules
+                processed by a worker.
+        """
+        # the hashes can only be reused if they were made the same way
+        same_hash = result.hash_method == self.hash_method
+        for molecule_hash, molecule in result._molecules.items():
+            self.add_molecule(
+                molecule,
+                molecule_hash=molecule_hash if same_hash else None,
+                canonical_order=result._canonical_orders.get(molecule_hash, None),
+            )
+        for molecule_hash, molecule in result._filtered.items():
+            self.filter_molecule(
+                molecule,
+                reason=result._filter_reasons.get(molecule_hash, None),
+                molecule_hash=molecule_hash if same_hash else None,
+            )
+
+    def filter_molecule(
+        self,
+        molecule: off.Molecule,
+        reason: Optional[str] = None,
+        molecule_hash: Optional[str] = None,
+    ):
         """
         Filter out a molecule that has not passed this workflow component. If the molecule is already in the pass list
         remove it and ensure it is only in the filtered list.
-        """
 
-        molecule_hash = molecule.to_inchikey(fixed_hydrogens=True)
+        Parameters:
+            molecule: The molecule which should be filtered.
+            reason: Why the molecule was filtered when this is not simply failing the component, for example the
+                component timing out or crashing on this molecule.
+            molecule_hash: The unique hash of the molecule if it has already been computed.
+        """
+
+        if molecule_hash is None:
+            molecule = unpack_molecule(molecule)
+            molecule_hash, _ = get_molecule_hash(molecule, hash_method=self.hash_method)
+        if self.hash_method == "graph" and molecule_hash in self._molecules:
+            # make sure the molecule which shares the hash is this molecule
+            molecule = unpack_molecule(molecule)
+            if not off.Molecule.are_isomorphic(
+                molecule, self._get_molecule(molecule_hash, include_conformers=False)
+            )[0]:
+                molecule_hash = self._get_collision_hash(molecule, molecule_hash)
         try:
             del self._molecules[molecule_hash]
 
@@ -254,8 +566,29 @@ class ComponentResult:
             pass
 
         finally:
-            if molecule not in self._filtered:
-                self._filtered[molecule_hash] = molecule
+            self._canonical_orders.pop(molecule_hash, None)
+            if not isinstance(molecule, MoleculeRecord):
+                molecule = pack_molecule(molecule)
+            self._filtered[molecule_hash] = molecule
+            if reason is not None:
+                self._filter_reasons[molecule_hash] = reason
+
+    def get_filter_reason(self, molecule: off.Molecule) -> Optional[str]:
+        """
+        Get the reason a molecule was filtered.
+
+        Parameters:
+            molecule: The filtered molecule.
+
+        Returns:
+            The reason the molecule was filtered or `None` if it simply failed the component.
+        """
+        if not self._filter_reasons:
+            return None
+
+        return self._filter_reasons.get(
+            get_molecule_hash(molecule, hash_method=self.hash_method)[0], None
+        )
 
     def __repr__(self):
         return f"ComponentResult(name={self.component_name}, molecules={self.n_molecules}, filtered={self.n_filtered})"
@@ -264,6 +597,28 @@ class ComponentResult:
         return f"<ComponentResult name='{self.component_name}' molecules='{self.n_molecules}' filtered='{self.n_filtered}'>"
 
 
+def _read_component_result(
+    file_range: Tuple[str, int, Optional[int]], hash_method: str = "inchikey"
+) -> ComponentResult:
+    """
+    Read a range of a molecule file into a de-duplicated component result, this is ran in a worker process.
+
+    Parameters:
+        file_range: The file path, start and end offset of the range.
+        hash_method: The key used to find duplicate molecules.
+    """
+    result = ComponentResult(
+        component_name="Deduplication",
+        component_description={},
+        component_provenance={},
+        molecules=read_molecule_range(*file_range),
+        verbose=False,
+        hash_method=hash_method,
+    )
+    result.compute_canonical_orders()
+    return result
+
+
 class BasicDataset(CommonBase):
     """
     The general qcfractal dataset class which contains all of the molecules and information about them prior to
@@ -393,7 +748,7 @@ class BasicDataset(CommonBase):
             molecule = off.Molecule.from_smiles(molecule, allow_undefined_stereo=True)
 
         # make a unique inchi key
-        inchi_key = molecule.to_inchikey(fixed_hydrogens=False)
+        inchi_key = get_inchikey(molecule, fixed_hydrogens=False)
         hits = []
         for entry in self.dataset.values():
             if inchi_key == entry.attributes.inchi_key:
@@ -462,18 +817,23 @@ class BasicDataset(CommonBase):
             * This method has been improved for better performance on large datasets and has been tested on an optimization dataset of over 10500 molecules.
             * This function does not calculate the total number of entries of the dataset see `n_records`
         """
+
+        def get_fixed_inchikey(entry: DatasetEntry) -> str:
+            # the entries are keyed by their mapped smiles so the molecule is only rebuilt the first time
+            return IDENTIFIER_CACHE.get(
+                f"mapped_smiles:{entry.attributes.canonical_isomeric_explicit_hydrogen_mapped_smiles}",
+                "fixed_inchikey",
+                lambda: entry.get_off_molecule(False).to_inchikey(fixed_hydrogens=True),
+            )
+
         molecules = {}
         for entry in self.dataset.values():
             inchikey = entry.attributes.inchi_key
             try:
                 like_mols = molecules[inchikey]
-                mol_to_add = entry.get_off_molecule(False).to_inchikey(
-                    fixed_hydrogens=True
-                )
+                mol_to_add = get_fixed_inchikey(entry)
                 for index in like_mols:
-                    if mol_to_add == self.dataset[index].get_off_molecule(
-                        False
-                    ).to_inchikey(fixed_hydrogens=True):
+                    if mol_to_add == get_fixed_inchikey(self.dataset[index]):
                         break
                 else:
                     molecules[inchikey].append(entry.index)
@@ -532,6 +892,7 @@ class BasicDataset(CommonBase):
         component_name: str,
         component_description: Dict[str, Any],
         component_provenance: Dict[str, str],
+        reasons: Optional[List[Optional[str]]] = None,
     ) -> None:
         """
         Filter a molecule or list of molecules by the component they failed.
@@ -545,6 +906,9 @@ class BasicDataset(CommonBase):
             The name of the component.
         component_provenance:
             The dictionary representation of the component provenance.
+        reasons:
+            The reason each molecule was filtered in the same order as the molecules, `None` entries are molecules
+            which simply failed the component.
         """
 
         if isinstance(molecules, off.Molecule):
@@ -552,11 +916,12 @@ class BasicDataset(CommonBase):
             molecules = [molecules]
 
         if component_name in self.filtered_molecules:
+            filter_data = self.filtered_molecules[component_name]
             filter_mols = [
                 molecule.to_smiles(isomeric=True, explicit_hydrogens=True)
                 for molecule in molecules
             ]
-            self.filtered_molecules[component_name].molecules.extend(filter_mols)
+            filter_data.molecules.extend(filter_mols)
         else:
 
             filter_data = FilterEntry(
@@ -568,6 +933,15 @@ class BasicDataset(CommonBase):
 
             self.filtered_molecules[filter_data.component_name] = filter_data
 
+        if reasons is not None:
+            # the new molecules are always at the end of the entry
+            new_molecules = filter_data.molecules[
+                len(filter_data.molecules) - len(molecules) :
+            ]
+            for smiles, reason in zip(new_molecules, reasons):
+                if reason is not None:
+                    filter_data.reasons[smiles] = reason
+
     def add_molecule(
         self,
         index: str,
@@ -607,9 +981,7 @@ class BasicDataset(CommonBase):
                 keywords=keywords or {},
                 **kwargs,
             )
-            self.dataset[index] = data_entry
-            # add any extra elements to the metadata
-            self.metadata.elements.update(data_entry.initial_molecules[0].symbols)
+            self.add_entry(data_entry)
 
         except qcel.exceptions.ValidationError:
             # the molecule has some qcschema issue and should be removed
@@ -623,6 +995,18 @@ class BasicDataset(CommonBase):
                 component_provenance=self.provenance,
             )
 
+    def add_entry(self, data_entry: DatasetEntry) -> None:
+        """
+        Add an entry which has already been made to the dataset under its index, for example an entry made by a worker
+        process when the dataset is built in parallel.
+
+        Parameters:
+            data_entry: The entry which should be added, this should be of the entry type of the dataset.
+        """
+        self.dataset[data_entry.index] = data_entry
+        # add any extra elements to the metadata
+        self.metadata.elements.update(data_entry.initial_molecules[0].symbols)
+
     def _get_missing_basis_coverage(
         self, raise_errors: bool = True
     ) -> Dict[str, Set[str]]:
@@ -82,12 +82,21 @@ class DatasetEntry(DatasetConfig):
 
         # now we need to process all of the initial molecules to make sure the cmiles is present
         # and force c1 symmetry
+        mapped_smiles = (
+            self.attributes.canonical_isomeric_explicit_hydrogen_mapped_smiles
+        )
         initial_molecules = []
         for mol in self.initial_molecules:
             extras = mol.extras or {}
-            extras[
-                "canonical_isomeric_explicit_hydrogen_mapped_smiles"
-            ] = self.attributes.canonical_isomeric_explicit_hydrogen_mapped_smiles
+            if (
+                extras.get("canonical_isomeric_explicit_hydrogen_mapped_smiles")
+                == mapped_smiles
+                and mol.fix_symmetry == "c1"
+            ):
+                # the molecule was already processed by another entry
+                initial_molecules.append(mol)
+                continue
+            extras["canonical_isomeric_explicit_hydrogen_mapped_smiles"] = mapped_smiles
             mol_data = mol.dict()
             mol_data["extras"] = extras
             # put into strict c1 symmetry
@@ -211,16 +220,43 @@ class TorsionDriveEntry(DatasetEntry):
         description="The torsiondrive keyword settings which can be used to overwrite the general global settings used in the dataset allowing for finner control.",
     )
 
-    def __init__(self, off_molecule: Optional[off.Molecule] = None, **kwargs):
+    def __init__(
+        self,
+        off_molecule: Optional[off.Molecule] = None,
+        graph_molecule: Optional[off.Molecule] = None,
+        linear_bonds: Optional[List[Tuple[int, int]]] = None,
+        **kwargs,
+    ):
+        """
+        Parameters:
+            off_molecule: The molecule whose conformers should be used as the initial molecules.
+            graph_molecule: The molecule made from the attributes of the entry used to check the dihedrals, this is
+                made if not given.
+            linear_bonds: The central bonds of the linear torsions in the molecule if they have already been found.
+        """
 
         super().__init__(off_molecule, **kwargs)
+        if graph_molecule is None:
+            graph_molecule = self.get_off_molecule(include_conformers=False)
         # now validate the torsions check proper first
-        off_molecule = self.get_off_molecule(include_conformers=False)
+        self._check_dihedrals(off_molecule=graph_molecule, linear_bonds=linear_bonds)
+
+    def _check_dihedrals(
+        self,
+        off_molecule: off.Molecule,
+        linear_bonds: Optional[List[Tuple[int, int]]] = None,
+    ) -> None:
+        """
+        Check that each dihedral is a valid proper or improper torsion of the molecule which does not drive a linear
+        bond.
 
-        # now validate the dihedrals
+        Parameters:
+            off_molecule: The molecule made from the attributes of the entry.
+            linear_bonds: The central bonds of the linear torsions in the molecule if they have already been found.
+        """
         for torsion in self.dihedrals:
             # check for linear torsions
-            check_linear_torsions(torsion, off_molecule)
+            check_linear_torsions(torsion, off_molecule, linear_bonds=linear_bonds)
             try:
                 check_torsion_connection(torsion=torsion, molecule=off_molecule)
             except DihedralConnectionError:
@@ -233,6 +269,46 @@ class TorsionDriveEntry(DatasetEntry):
                         f" proper/improper torsion."
                     )
 
+    @classmethod
+    def from_entry(
+        cls,
+        entry: DatasetEntry,
+        index: str,
+        dihedrals: List[Tuple[int, int, int, int]],
+        keywords: Optional[Dict[str, Any]] = None,
+        off_molecule: Optional[off.Molecule] = None,
+        linear_bonds: Optional[List[Tuple[int, int]]] = None,
+    ) -> "TorsionDriveEntry":
+        """
+        Make the entry for one torsion of a molecule from an entry which already holds its QCSchema molecules, so that
+        a molecule with many torsions only has its conformers converted once.
+
+        Parameters:
+            entry: An entry of the molecule whose initial molecules, attributes and extras should be used.
+            index: The index of the new entry.
+            dihedrals: The dihedrals which should be driven.
+            keywords: The torsiondrive keywords of the new entry.
+            off_molecule: The molecule made from the attributes of the entry, this is made if not given.
+            linear_bonds: The central bonds of the linear torsions in the molecule if they have already been found.
+
+        Returns:
+            The validated torsiondrive entry.
+
+        Raises:
+            LinearTorsionError: If a dihedral drives a linear bond.
+            DihedralConnectionError: If a dihedral is not a connected proper or improper torsion.
+        """
+        return cls(
+            index=index,
+            initial_molecules=list(entry.initial_molecules),
+            attributes=entry.attributes.copy(deep=True),
+            extras=dict(entry.extras),
+            keywords=keywords or {},
+            dihedrals=dihedrals,
+            graph_molecule=off_molecule,
+            linear_bonds=linear_bonds,
+        )
+
 
 class FilterEntry(DatasetConfig):
     """
@@ -253,6 +329,10 @@ class FilterEntry(DatasetConfig):
         description="A dictionary of the version information of all dependencies of the component.",
     )
     molecules: List[str]
+    reasons: Dict[str, str] = Field(
+        {},
+        description="The reason a molecule was filtered keyed by its smiles, this is only recorded when the molecule did not simply fail the component, for example when the component timed out or crashed.",
+    )
 
     def __init__(self, off_molecules: List[off.Molecule] = None, **kwargs):
         """
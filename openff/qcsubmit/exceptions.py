@@ -209,3 +209,12 @@ class DatasetRegisterError(QCSubmitException):
 
     error_type = "dataset_register_error"
     header = "Dataset Register Error"
+
+
+class InvalidExecutorError(QCSubmitException):
+    """
+    The requested executor type is not supported.
+    """
+
+    error_type = "invalid_executor_error"
+    header = "Invalid Executor Error"
@@ -0,0 +1,1408 @@
+"""
+Executors which run workflow components over molecules in parallel and can be kept alive for a whole workflow.
+"""
+import abc
+import concurrent.futures
+import hashlib
+import heapq
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from functools import partial
+from multiprocessing.connection import wait
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from openforcefield.topology import Molecule
+from pydantic import BaseModel, Field
+from qcelemental.util import which_import
+
+from openff.qcsubmit.cache import ResultCache
+from openff.qcsubmit.datasets import ComponentResult
+from openff.qcsubmit.exceptions import InvalidExecutorError
+from openff.qcsubmit.utils import (
+    MoleculeRecord,
+    chunk_generator,
+    pack_molecules,
+    unpack_molecules,
+)
+
+if TYPE_CHECKING:
+    import multiprocessing.connection
+
+    import distributed
+
+    from openff.qcsubmit.workflow_components import CustomWorkflowComponent
+
+
+def get_component_key(component: "CustomWorkflowComponent") -> str:
+    """
+    Create a key which identifies a workflow component and its current settings.
+
+    Parameters:
+        component: The workflow component which should be identified.
+
+    Returns:
+        A string made from the component name and a hash of its settings.
+    """
+    settings = f"{component.__class__.__name__}:{component.json()}".encode()
+    return f"{component.component_name}-{hashlib.sha1(settings).hexdigest()}"
+
+
+def get_lpt_chunks(
+    costs: List[float], n_workers: int, chunk_size: int
+) -> List[List[int]]:
+    """
+    Group molecules into chunks for longest processing time first scheduling.
+
+    The molecules are sorted by their estimated cost from largest to smallest and collected into chunks whose cost is
+    close to a quarter of the work each worker should get, so the most expensive molecules are sent on their own at the
+    start of the run while the cheap molecules at the end are batched together and fill in the gaps.
+
+    Parameters:
+        costs: The estimated cost of each molecule.
+        n_workers: The number of workers the chunks will be shared between.
+        chunk_size: The largest number of molecules in a chunk.
+
+    Returns:
+        The indices of the molecules in each chunk in the order they should be dispatched.
+    """
+    order = sorted(range(len(costs)), key=lambda i: costs[i], reverse=True)
+    target = sum(costs) / (max(n_workers, 1) * 4)
+
+    chunks, current, current_cost = [], [], 0.0
+    for index in order:
+        if current and (
+            current_cost + costs[index] > target or len(current) >= chunk_size
+        ):
+            chunks.append(current)
+            current, current_cost = [], 0.0
+        current.append(index)
+        current_cost += costs[index]
+
+    if current:
+        chunks.append(current)
+
+    return chunks
+
+
+def estimate_makespan(chunk_costs: Iterable[float], n_workers: int) -> float:
+    """
+    Estimate the time taken to run the chunks when each chunk is given to the first free worker in order.
+
+    Parameters:
+        chunk_costs: The estimated cost of each chunk in dispatch order.
+        n_workers: The number of workers.
+
+    Returns:
+        The estimated time the last worker finishes in the same units as the costs.
+    """
+    workers = [0.0] * max(n_workers, 1)
+    for cost in chunk_costs:
+        heapq.heappush(workers, heapq.heappop(workers) + cost)
+
+    return max(workers)
+
+
+class SchedulingReport(BaseModel):
+    """
+    A summary of the time saved by scheduling the most expensive molecules first rather than in input order.
+    """
+
+    n_workers: int = Field(..., description="The number of workers used.")
+    input_makespan: float = Field(
+        ...,
+        description="The estimated cost of running the molecules in input order.",
+    )
+    scheduled_makespan: float = Field(
+        ...,
+        description="The estimated cost of running the molecules largest first.",
+    )
+    wall_time: float = Field(
+        ..., description="The measured wall-clock time in seconds of the run."
+    )
+
+    @property
+    def time_saved(self) -> float:
+        """
+        Returns:
+            The estimated wall-clock time in seconds saved in the tail of the run compared with input order.
+        """
+        if self.scheduled_makespan <= 0:
+            return 0.0
+        return self.wall_time * (self.input_makespan / self.scheduled_makespan - 1)
+
+    @classmethod
+    def from_costs(
+        cls, costs: List[float], n_workers: int, chunk_size: int, wall_time: float
+    ) -> "SchedulingReport":
+        """
+        Build the report by simulating both schedules with the estimated costs of the molecules.
+
+        Parameters:
+            costs: The estimated cost of each molecule in input order.
+            n_workers: The number of workers used.
+            chunk_size: The chunk size used for the run.
+            wall_time: The measured wall-clock time in seconds of the scheduled run.
+        """
+        input_costs = [sum(chunk) for chunk in chunk_generator(costs, chunk_size)]
+        scheduled_costs = [
+            sum(costs[i] for i in chunk)
+            for chunk in get_lpt_chunks(costs, n_workers, chunk_size)
+        ]
+        return cls(
+            n_workers=n_workers,
+            input_makespan=estimate_makespan(input_costs, n_workers),
+            scheduled_makespan=estimate_makespan(scheduled_costs, n_workers),
+            wall_time=wall_time,
+        )
+
+
+class _WorkerState:
+    """
+    The workflow components known to a worker keyed by their task key, these are only initialised the first time a
+    task is run for them so that any expensive state is built once per worker and not once per task.
+    """
+
+    def __init__(self):
+        self.components: Dict[str, "CustomWorkflowComponent"] = {}
+        self.initialised: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+
+    def register(self, components: Dict[str, "CustomWorkflowComponent"]) -> None:
+        """
+        Replace the components known to this worker.
+        """
+        with self._lock:
+            self.components.clear()
+            self.initialised.clear()
+            self.components.update(components)
+
+    def get_component(
+        self, key: str, component: Optional["CustomWorkflowComponent"] = None
+    ) -> "CustomWorkflowComponent":
+        """
+        Get the initialised workflow component for the key, the component is initialised on first use.
+
+        Parameters:
+            key: The task key of the component.
+            component: The component which should be used if it was not registered with the worker.
+        """
+        with self._lock:
+            if key not in self.components:
+                self.components[key] = component
+
+            worker_component = self.components[key]
+            if not self.initialised.get(key, False):
+                worker_component._apply_init(worker_component._create_result())
+                self.initialised[key] = True
+
+        return worker_component
+
+    def reset(self, key: str) -> None:
+        """
+        Mark the component as not initialised so that it is set up again the next time a task is run for it.
+
+        Parameters:
+            key: The task key of the component.
+        """
+        with self._lock:
+            self.initialised.pop(key, None)
+
+    def finalize(self) -> None:
+        """
+        Clean up all of the initialised components and forget them.
+        """
+        with self._lock:
+            for key, initialised in self.initialised.items():
+                if initialised:
+                    component = self.components[key]
+                    component._apply_finalize(component._create_result())
+            self.components.clear()
+            self.initialised.clear()
+
+
+# the state of this worker process when it is used by a process pool
+_worker_state = _WorkerState()
+
+
+def _register_worker_components(
+    components: Dict[str, "CustomWorkflowComponent"]
+) -> None:
+    """
+    The worker initializer, store the workflow components this worker may be asked to run.
+    """
+    _worker_state.register(components)
+
+
+def _apply_component(
+    key: str,
+    component: Optional["CustomWorkflowComponent"],
+    molecules: List[Union[Molecule, MoleculeRecord]],
+    state: Optional[_WorkerState] = None,
+    cache: Optional[ResultCache] = None,
+) -> ComponentResult:
+    """
+    Run a chunk of molecules through the workflow component in a worker, packed molecules are rebuilt first.
+    """
+    state = state or _worker_state
+    worker_component = state.get_component(key=key, component=component)
+    return worker_component._apply_chunk(unpack_molecules(molecules), cache=cache)
+
+
+def _apply_components(
+    components: List[Tuple[str, Optional["CustomWorkflowComponent"]]],
+    molecules: List[Union[Molecule, MoleculeRecord]],
+    state: Optional[_WorkerState] = None,
+    cache: Optional[ResultCache] = None,
+) -> List[ComponentResult]:
+    """
+    Run a chunk of molecules through a chain of workflow components in a worker, the molecules which pass each
+    component are handed straight to the next component without being sent back to the parent.
+
+    Returns:
+        The result of each component, only the result of the final component holds the molecules which passed and the
+        others only hold the molecules they filtered.
+    """
+    state = state or _worker_state
+    molecules = unpack_molecules(molecules)
+    results = []
+    for key, component in components:
+        worker_component = state.get_component(key=key, component=component)
+        work = worker_component._apply_chunk(molecules, cache=cache)
+        molecules = work.molecules
+        results.append(work)
+
+    # the passed molecules are only needed from the last component
+    for work in results[:-1]:
+        work._molecules.clear()
+        work._canonical_orders.clear()
+
+    return results
+
+
+def _apply_branches(
+    branches: List[List[Tuple[str, Optional["CustomWorkflowComponent"]]]],
+    molecules: List[Union[Molecule, MoleculeRecord]],
+    state: Optional[_WorkerState] = None,
+    cache: Optional[ResultCache] = None,
+) -> List[List[ComponentResult]]:
+    """
+    Run a chunk of molecules through each branch of a workflow in a worker, every branch starts from its own copy of
+    the molecules so that the branches do not change each others input.
+
+    Returns:
+        The result of each component in each branch, as made by `_apply_components`.
+    """
+    results = []
+    for components in branches:
+        # packed molecules are rebuilt fresh for every branch
+        branch_molecules = [
+            molecule if isinstance(molecule, MoleculeRecord) else Molecule(molecule)
+            for molecule in molecules
+        ]
+        results.append(
+            _apply_components(components, branch_molecules, state=state, cache=cache)
+        )
+
+    return results
+
+
+def _map_function(
+    function: Callable[[List[Molecule]], List[Any]],
+    items: List[Tuple[int, Union[Molecule, MoleculeRecord]]],
+) -> List[Tuple[int, Any]]:
+    """
+    Call a function with a chunk of molecules in a worker and pair each returned value with the position of its
+    molecule in the input.
+    """
+    positions = [position for position, _ in items]
+    values = function(unpack_molecules([molecule for _, molecule in items]))
+    return list(zip(positions, values))
+
+
+def _get_memory_usage(pid: Optional[int] = None) -> Optional[float]:
+    """
+    Get the resident memory of a process in MB.
+
+    Parameters:
+        pid: The id of the process, None will use this process.
+
+    Returns:
+        The resident memory or `None` if it can not be found on this platform.
+    """
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _get_total_memory() -> Optional[float]:
+    """
+    Get the physical memory of this machine in MB or `None` if it can not be found on this platform.
+    """
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 1024 ** 2
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def _worker_main(
+    connection: "multiprocessing.connection.Connection",
+    components: Dict[str, "CustomWorkflowComponent"],
+    max_memory: Optional[float] = None,
+) -> None:
+    """
+    The main loop of a supervised worker process, tasks are received and results sent back over the connection until
+    the worker is told to stop or grows past its memory limit in which case it exits and is replaced.
+    """
+    _register_worker_components(components)
+
+    while True:
+        try:
+            task = connection.recv()
+        except (EOFError, OSError):
+            break
+
+        if task is None:
+            break
+
+        task_id, function, item = task
+        try:
+            connection.send((task_id, True, function(item)))
+        except Exception as error:
+            connection.send((task_id, False, f"{error.__class__.__name__}: {error}"))
+
+        if max_memory is not None:
+            memory = _get_memory_usage()
+            if memory is not None and memory > max_memory:
+                break
+
+    _worker_state.finalize()
+    connection.close()
+
+
+class WorkflowExecutor(abc.ABC):
+    """
+    The base class of all executors which run workflow components over chunks of molecules.
+
+    Executors can be used as context managers and kept running for a whole workflow, every executor has the same
+    interface so the backend can be changed without changing the workflow.
+    """
+
+    def __init__(
+        self,
+        processors: Optional[int] = None,
+        components: Optional[List["CustomWorkflowComponent"]] = None,
+        memory_budget: Optional[float] = None,
+    ):
+        """
+        Parameters:
+            processors: The number of workers, None will use all cores.
+            components: The workflow components the executor will run, where possible these are sent to each worker
+                once when it starts rather than with every task.
+            memory_budget: The total memory in MB the workers may use, this limits how many workers run components
+                which declare the memory they need. None will use the physical memory of the machine.
+        """
+        self.processors: int = processors or os.cpu_count()
+        self.memory_budget: Optional[float] = memory_budget or _get_total_memory()
+        self._components: Dict[str, "CustomWorkflowComponent"] = {
+            get_component_key(component): component for component in (components or [])
+        }
+
+    def __enter__(self) -> "WorkflowExecutor":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.shutdown()
+
+    @property
+    def n_workers(self) -> int:
+        """
+        Returns:
+            The number of workers available to the executor.
+        """
+        return self.processors
+
+    def get_max_workers(self, components: List["CustomWorkflowComponent"]) -> int:
+        """
+        Work out how many workers may run the components at once from the resource limits of each component.
+
+        Parameters:
+            components: The components which will be ran together.
+
+        Returns:
+            The number of workers which may be used at once.
+        """
+        max_workers = self.n_workers
+        for component in components:
+            limits = component.resource_limits
+            if limits.max_workers is not None:
+                max_workers = min(max_workers, limits.max_workers)
+            if limits.licence_seats is not None:
+                max_workers = min(max_workers, limits.licence_seats)
+            if limits.max_memory is not None and self.memory_budget is not None:
+                max_workers = min(
+                    max_workers, int(self.memory_budget // limits.max_memory)
+                )
+
+        return max(max_workers, 1)
+
+    @staticmethod
+    def _get_max_memory(components: List["CustomWorkflowComponent"]) -> Optional[float]:
+        """
+        Get the smallest per worker memory limit of the components.
+        """
+        limits = [
+            component.resource_limits.max_memory
+            for component in components
+            if component.resource_limits.max_memory is not None
+        ]
+        return min(limits) if limits else None
+
+    @property
+    @abc.abstractmethod
+    def is_running(self) -> bool:
+        """
+        Returns:
+            `True` if the executor has been started and not yet shut down.
+        """
+        ...
+
+    @abc.abstractmethod
+    def start(self) -> None:
+        """
+        Start the workers if they are not already running.
+        """
+        ...
+
+    @abc.abstractmethod
+    def shutdown(self) -> None:
+        """
+        Stop the workers and wait for them to exit.
+        """
+        ...
+
+    @abc.abstractmethod
+    def _map_unordered(
+        self,
+        task: Callable,
+        items: Iterable[List[Molecule]],
+        on_failure: Callable[[List[Molecule], str], Any],
+        max_workers: int,
+        max_memory: Optional[float] = None,
+    ) -> Iterator:
+        """
+        Run the task on each chunk of molecules using the workers and yield the results in the order they finish.
+
+        Parameters:
+            task: The function which should be called with each chunk.
+            items: The chunks of molecules.
+            on_failure: Makes the result for molecules the task failed on from the molecules and the reason, this is
+                only used by executors which can isolate failures.
+            max_workers: The most tasks which may run at once.
+            max_memory: The memory in MB each worker may use for these tasks, this is only used by executors which
+                can replace workers.
+        """
+        ...
+
+    def _get_payload(
+        self, component: "CustomWorkflowComponent"
+    ) -> Tuple[str, Optional["CustomWorkflowComponent"]]:
+        """
+        Get the task key of the component and the component to send with each task, this is `None` when the workers
+        already have the component.
+        """
+        key = get_component_key(component)
+        return key, None if key in self._components else component
+
+    def _create_task(self, function: Callable, *args, **kwargs) -> Callable:
+        """
+        Create the task function which is sent to the workers.
+        """
+        return partial(function, *args, **kwargs)
+
+    def _pack_chunk(self, molecules: List[Molecule]) -> List[MoleculeRecord]:
+        """
+        Pack a chunk of molecules into the compact form sent to the workers, the results are sent back packed in the
+        same way by `ComponentResult`.
+        """
+        return pack_molecules(molecules)
+
+    def _get_chunks(
+        self,
+        molecules: List[Molecule],
+        chunk_size: int,
+        n_workers: int,
+        costs: Optional[List[float]] = None,
+    ) -> Iterable[List[Union[Molecule, MoleculeRecord]]]:
+        """
+        Split the molecules into the chunks sent to the workers, in input order or largest first when the costs are
+        given. The chunks are packed lazily as they are dispatched.
+        """
+        if costs is None:
+            chunks = chunk_generator(molecules, chunk_size)
+        else:
+            chunks = (
+                [molecules[i] for i in chunk]
+                for chunk in get_lpt_chunks(costs, n_workers, chunk_size)
+            )
+
+        return (self._pack_chunk(chunk) for chunk in chunks)
+
+    def apply_component(
+        self,
+        component: "CustomWorkflowComponent",
+        molecules: List[Molecule],
+        chunk_size: int,
+        costs: Optional[List[float]] = None,
+        cache: Optional[ResultCache] = None,
+    ) -> Iterator[ComponentResult]:
+        """
+        Run the molecules through the workflow component in chunks, yielding the result of each chunk as soon as it
+        has finished.
+
+        Parameters:
+            component: The workflow component which should be applied.
+            molecules: The molecules to be processed by the component.
+            chunk_size: The number of molecules sent to a worker in each task.
+            costs: The estimated cost of each molecule, when given the most expensive molecules are dispatched first
+                in chunks of similar cost, otherwise the molecules are dispatched in input order.
+            cache: The cache of results for single molecules which the workers should use.
+
+        Returns:
+            An iterator over the results of each chunk in the order they finish.
+
+        Note:
+            The number of workers used at once and their memory are limited by the resource limits of the component.
+        """
+        self.start()
+        max_workers = self.get_max_workers([component])
+
+        key, payload = self._get_payload(component)
+        task = self._create_task(_apply_component, key, payload, cache=cache)
+
+        def on_failure(
+            failed: List[Union[Molecule, MoleculeRecord]], reason: str
+        ) -> ComponentResult:
+            result = component._create_result()
+            for molecule in unpack_molecules(failed):
+                result.filter_molecule(molecule, reason=reason)
+            return result
+
+        return self._map_unordered(
+            task,
+            self._get_chunks(molecules, chunk_size, max_workers, costs),
+            on_failure,
+            max_workers=max_workers,
+            max_memory=self._get_max_memory([component]),
+        )
+
+    def apply_components(
+        self,
+        components: List["CustomWorkflowComponent"],
+        molecules: List[Molecule],
+        chunk_size: int,
+        costs: Optional[List[float]] = None,
+        cache: Optional[ResultCache] = None,
+    ) -> Iterator[List[ComponentResult]]:
+        """
+        Run the molecules through a chain of workflow components in chunks, each chunk is passed through every
+        component inside a single worker and the result is yielded as soon as it has finished.
+
+        Parameters:
+            components: The workflow components which should be applied in order.
+            molecules: The molecules to be processed by the components.
+            chunk_size: The number of molecules sent to a worker in each task.
+            costs: The estimated cost of each molecule, when given the most expensive molecules are dispatched first
+                in chunks of similar cost, otherwise the molecules are dispatched in input order.
+            cache: The cache of results for single molecules which the workers should use.
+
+        Returns:
+            An iterator over the results of each component for each chunk in the order they finish, only the result of
+            the final component holds the molecules which passed, any molecules the chain failed on are filtered by the
+            first component with the reason.
+
+        Note:
+            The number of workers used at once and their memory are limited by the tightest resource limits of the
+            components.
+        """
+        self.start()
+        max_workers = self.get_max_workers(components)
+
+        payloads = [self._get_payload(component) for component in components]
+        task = self._create_task(_apply_components, payloads, cache=cache)
+
+        def on_failure(
+            failed: List[Union[Molecule, MoleculeRecord]], reason: str
+        ) -> List[ComponentResult]:
+            # we can not tell which component failed so record it against the first
+            results = [component._create_result() for component in components]
+            for molecule in unpack_molecules(failed):
+                results[0].filter_molecule(molecule, reason=reason)
+            return results
+
+        return self._map_unordered(
+            task,
+            self._get_chunks(molecules, chunk_size, max_workers, costs),
+            on_failure,
+            max_workers=max_workers,
+            max_memory=self._get_max_memory(components),
+        )
+
+    def apply_branches(
+        self,
+        branches: List[List["CustomWorkflowComponent"]],
+        molecules: List[Molecule],
+        chunk_size: int,
+        cache: Optional[ResultCache] = None,
+    ) -> Iterator[List[List[ComponentResult]]]:
+        """
+        Run the molecules through independent branches of a workflow at the same time, each chunk is passed through
+        the chain of components of every branch inside a single worker so that the branches share the workers rather
+        than running one after another.
+
+        Parameters:
+            branches: The chains of workflow components of each branch.
+            molecules: The molecules to be processed by every branch.
+            chunk_size: The number of molecules sent to a worker in each task.
+            cache: The cache of results for single molecules which the workers should use.
+
+        Returns:
+            An iterator over the results of each component of each branch for each chunk in the order they finish, any
+            molecules which failed are filtered by the first component of every branch with the reason.
+        """
+        self.start()
+        components = [component for branch in branches for component in branch]
+        max_workers = self.get_max_workers(components)
+
+        payloads = [
+            [self._get_payload(component) for component in branch]
+            for branch in branches
+        ]
+        task = self._create_task(_apply_branches, payloads, cache=cache)
+
+        def on_failure(
+            failed: List[Union[Molecule, MoleculeRecord]], reason: str
+        ) -> List[List[ComponentResult]]:
+            results = [
+                [component._create_result() for component in branch]
+                for branch in branches
+            ]
+            for molecule in unpack_molecules(failed):
+                for branch_results in results:
+                    branch_results[0].filter_molecule(molecule, reason=reason)
+            return results
+
+        return self._map_unordered(
+            task,
+            self._get_chunks(molecules, chunk_size, max_workers),
+            on_failure,
+            max_workers=max_workers,
+            max_memory=self._get_max_memory(components),
+        )
+
+    def finalize_component(
+        self, component: "CustomWorkflowComponent", result: ComponentResult
+    ) -> None:
+        """
+        Run the clean up of the workflow component on its merged result once every chunk sent to the workers has
+        finished, the workers only clean up their own copies of the component when the executor is shut down.
+
+        Parameters:
+            component: The workflow component which was applied.
+            result: The result of the component merged from every chunk.
+        """
+        # workers in this process use the component itself so make sure it is set
+        # up again before they next use it
+        self._get_worker_state().reset(get_component_key(component))
+        component._apply_finalize(result)
+
+    def _get_worker_state(self) -> _WorkerState:
+        """
+        Get the state of the workers which run in this process, such as threads of a pool passed to the executor.
+        """
+        return _worker_state
+
+    def map_molecules(
+        self,
+        function: Callable[[List[Molecule]], List[Any]],
+        molecules: List[Molecule],
+        chunk_size: int,
+    ) -> Iterator[Tuple[int, Any]]:
+        """
+        Run a function which returns one value per molecule over chunks of the molecules using the workers, so that
+        work outside of the workflow components, like making the dataset entries, can share the same workers.
+
+        Parameters:
+            function: A function which can be pickled, such as a module level function or a partial of one, which is
+                called with each chunk of molecules and returns a value for each molecule in order.
+            molecules: The molecules the function should be applied to.
+            chunk_size: The number of molecules sent to a worker in each task.
+
+        Returns:
+            An iterator over the position of each molecule in the input and its value, in the order the chunks finish.
+            The value is `None` for any molecule the worker failed on so that the caller can handle it.
+        """
+        self.start()
+
+        def get_chunks() -> Iterator[List[Tuple[int, Union[Molecule, MoleculeRecord]]]]:
+            for start in range(0, len(molecules), chunk_size):
+                chunk = molecules[start : start + chunk_size]
+                yield list(
+                    zip(range(start, start + len(chunk)), self._pack_chunk(chunk))
+                )
+
+        def on_failure(
+            failed: List[Tuple[int, Union[Molecule, MoleculeRecord]]], reason: str
+        ) -> List[Tuple[int, Any]]:
+            return [(position, None) for position, _ in failed]
+
+        for work in self._map_unordered(
+            partial(_map_function, function),
+            get_chunks(),
+            on_failure,
+            max_workers=self.n_workers,
+        ):
+            yield from work
+
+
+class _InProcessExecutor(WorkflowExecutor, abc.ABC):
+    """
+    A base class for executors whose workers share this process, the components are used directly and initialised
+    once for the executor rather than once per worker.
+    """
+
+    def __init__(
+        self,
+        processors: Optional[int] = None,
+        components: Optional[List["CustomWorkflowComponent"]] = None,
+        memory_budget: Optional[float] = None,
+    ):
+        super().__init__(
+            processors=processors, components=components, memory_budget=memory_budget
+        )
+        self._state = _WorkerState()
+
+    def _get_payload(
+        self, component: "CustomWorkflowComponent"
+    ) -> Tuple[str, Optional["CustomWorkflowComponent"]]:
+        return get_component_key(component), component
+
+    def _pack_chunk(self, molecules: List[Molecule]) -> List[Molecule]:
+        # the molecules never leave this process so there is nothing to gain
+        # from packing them
+        return molecules
+
+    def _create_task(self, function: Callable, *args, **kwargs) -> Callable:
+        return partial(function, *args, state=self._state, **kwargs)
+
+    def _get_worker_state(self) -> _WorkerState:
+        return self._state
+
+    def shutdown(self) -> None:
+        self._state.finalize()
+
+
+class SerialExecutor(_InProcessExecutor):
+    """
+    Run the workflow components one chunk at a time in this process, this is useful for debugging and for components
+    which are cheap enough that starting workers is not worth it.
+    """
+
+    def __init__(
+        self,
+        processors: Optional[int] = None,
+        components: Optional[List["CustomWorkflowComponent"]] = None,
+    ):
+        super().__init__(processors=1, components=components)
+        self._running = False
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    def start(self) -> None:
+        self._running = True
+
+    def shutdown(self) -> None:
+        super().shutdown()
+        self._running = False
+
+    def _map_unordered(
+        self,
+        task: Callable,
+        items: Iterable[List[Molecule]],
+        on_failure: Callable[[List[Molecule], str], Any],
+        max_workers: int,
+        max_memory: Optional[float] = None,
+    ) -> Iterator:
+        return map(task, items)
+
+
+class FuturesExecutor(WorkflowExecutor):
+    """
+    Run the workflow components using any `concurrent.futures.Executor` compatible pool.
+
+    The pool can be made by the executor or passed in, a pool which is passed in is not shut down with the executor.
+
+    Example:
+        Using an existing pool.
+
+        ```python
+        >>> from concurrent.futures import ProcessPoolExecutor
+        >>> from openff.qcsubmit.executors import FuturesExecutor
+        >>> pool = ProcessPoolExecutor(max_workers=4)
+        >>> with FuturesExecutor(processors=4, executor=pool) as executor:
+        ...     result = component.apply(molecules, executor=executor)
+        ```
+    """
+
+    def __init__(
+        self,
+        processors: Optional[int] = None,
+        components: Optional[List["CustomWorkflowComponent"]] = None,
+        executor: Optional[concurrent.futures.Executor] = None,
+        memory_budget: Optional[float] = None,
+    ):
+        """
+        Parameters:
+            processors: The number of workers, None will use all cores.
+            components: The workflow components the executor will run.
+            executor: An existing pool which should be used to run the tasks.
+            memory_budget: The total memory in MB the workers may use, None will use the physical memory.
+        """
+        super().__init__(
+            processors=processors, components=components, memory_budget=memory_budget
+        )
+        self._pool = executor
+        self._owns_pool = executor is None
+
+    @property
+    def is_running(self) -> bool:
+        return self._pool is not None
+
+    def _create_pool(self) -> concurrent.futures.Executor:
+        """
+        Create the pool used to run the tasks when one was not supplied.
+        """
+        return concurrent.futures.ProcessPoolExecutor(max_workers=self.processors)
+
+    def _get_payload(
+        self, component: "CustomWorkflowComponent"
+    ) -> Tuple[str, Optional["CustomWorkflowComponent"]]:
+        # we can not register components with an arbitrary pool so always send them
+        return get_component_key(component), component
+
+    def start(self) -> None:
+        if self._pool is None:
+            self._pool = self._create_pool()
+            self._owns_pool = True
+
+    def shutdown(self) -> None:
+        if self._pool is not None and self._owns_pool:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def _map_unordered(
+        self,
+        task: Callable,
+        items: Iterable[List[Molecule]],
+        on_failure: Callable[[List[Molecule], str], Any],
+        max_workers: int,
+        max_memory: Optional[float] = None,
+    ) -> Iterator:
+        # failed chunks are retried one molecule at a time before any new chunks
+        queue = deque()
+        items = iter(items)
+
+        def submit() -> None:
+            item = queue.popleft() if queue else next(items, None)
+            if item is not None:
+                running[self._pool.submit(task, item)] = item
+
+        # only keep as many tasks in the pool as may run at once
+        running: Dict[concurrent.futures.Future, List[Molecule]] = {}
+        for _ in range(max_workers):
+            submit()
+        while running:
+            finished, _ = concurrent.futures.wait(
+                running, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in finished:
+                item = running.pop(future)
+                try:
+                    value = future.result()
+                except Exception as error:
+                    if len(item) > 1:
+                        # find the molecules which caused the failure by running
+                        # them one at a time
+                        queue.extend([molecule] for molecule in item)
+                    else:
+                        yield on_failure(item, f"{error.__class__.__name__}: {error}")
+                else:
+                    yield value
+                # keep the pool full, including any retries of a failed chunk
+                for _ in range(max_workers - len(running)):
+                    submit()
+
+
+class ThreadExecutor(_InProcessExecutor, FuturesExecutor):
+    """
+    Run the workflow components using a pool of threads in this process.
+
+    Threads avoid the cost of sending molecules between processes but only run in parallel when the work releases the
+    GIL, such as long running toolkit calls.
+    """
+
+    def __init__(
+        self,
+        processors: Optional[int] = None,
+        components: Optional[List["CustomWorkflowComponent"]] = None,
+        memory_budget: Optional[float] = None,
+    ):
+        FuturesExecutor.__init__(
+            self,
+            processors=processors,
+            components=components,
+            memory_budget=memory_budget,
+        )
+        self._state = _WorkerState()
+
+    def _create_pool(self) -> concurrent.futures.Executor:
+        return concurrent.futures.ThreadPoolExecutor(max_workers=self.processors)
+
+    def shutdown(self) -> None:
+        FuturesExecutor.shutdown(self)
+        self._state.finalize()
+
+
+class _SupervisedWorker:
+    """
+    A worker process of the process executor and the task it is running.
+    """
+
+    def __init__(
+        self,
+        context: "multiprocessing.context.BaseContext",
+        components: Dict[str, "CustomWorkflowComponent"],
+        max_memory: Optional[float] = None,
+    ):
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main,
+            args=(child_connection, components, max_memory),
+            daemon=True,
+        )
+        self.process.start()
+        child_connection.close()
+        # the id, chunk and deadline of the running task
+        self.task: Optional[Tuple[int, List[Molecule], Optional[float]]] = None
+
+    def submit(
+        self,
+        task_id: int,
+        function: Callable,
+        item: List[Molecule],
+        timeout: Optional[float],
+    ) -> None:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        self.task = (task_id, item, deadline)
+        self.connection.send((task_id, function, item))
+
+    def stop(self, timeout: float = 5) -> None:
+        """
+        Ask the worker to exit and kill it if it does not.
+        """
+        if self.process.is_alive() and self.task is None:
+            try:
+                self.connection.send(None)
+            except (OSError, ValueError):
+                pass
+            self.process.join(timeout)
+        self.kill()
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self.connection.close()
+
+
+class ProcessExecutor(WorkflowExecutor):
+    """
+    A pool of worker processes which can be shared by every component in a workflow.
+
+    The pool is started once and kept warm for all of the components it is used with, each worker builds the expensive
+    state of a component, like force fields or toolkit wrappers set up in `_apply_init`, the first time it runs the
+    component and then reuses it for every following task.
+
+    The workers are supervised so that a molecule which hangs, crashes the toolkit or raises an error can not stall or
+    kill the workflow. A failed chunk is retried one molecule at a time and any molecule which fails on its own is
+    filtered with the reason recorded in the component result, the worker is replaced whenever it had to be killed.
+
+    Example:
+        Sharing one pool between components.
+
+        ```python
+        >>> from openff.qcsubmit.executors import ProcessExecutor
+        >>> from openff.qcsubmit.workflow_components import CoverageFilter, RotorFilter
+        >>> coverage, rotors = CoverageFilter(), RotorFilter()
+        >>> with ProcessExecutor(processors=4, components=[coverage, rotors]) as executor:
+        ...     result = coverage.apply(molecules, executor=executor)
+        ...     result = rotors.apply(result.molecules, executor=executor)
+        ```
+    """
+
+    def __init__(
+        self,
+        processors: Optional[int] = None,
+        components: Optional[List["CustomWorkflowComponent"]] = None,
+        timeout: Optional[float] = None,
+        max_memory: Optional[float] = None,
+        memory_budget: Optional[float] = None,
+    ):
+        """
+        Parameters:
+            processors: The number of worker processes, None will use all cores.
+            components: The workflow components the executor will run, these are sent to each worker once when it
+                starts rather than with every task.
+            timeout: The wall-clock time in seconds each molecule is allowed to take, a chunk may use the time of all
+                of its molecules. None means no limit.
+            max_memory: The resident memory in MB a worker may use, a worker above the limit is replaced. None means
+                no limit, components which declare their own memory limit use the smaller of the two.
+            memory_budget: The total memory in MB the workers may use, this limits how many workers run components
+                which declare the memory they need. None will use the physical memory of the machine.
+        """
+        super().__init__(
+            processors=processors, components=components, memory_budget=memory_budget
+        )
+        self.timeout: Optional[float] = timeout
+        self.max_memory: Optional[float] = max_memory
+        self._context = None
+        self._workers: List[_SupervisedWorker] = []
+        self._task_ids = itertools.count()
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._workers)
+
+    def start(self) -> None:
+        import multiprocessing
+
+        if not self._workers:
+            self._context = multiprocessing.get_context()
+            self._workers = [self._start_worker() for _ in range(self.processors)]
+
+    def shutdown(self) -> None:
+        for worker in self._workers:
+            worker.stop()
+        self._workers = []
+
+    def _start_worker(self) -> _SupervisedWorker:
+        return _SupervisedWorker(
+            context=self._context,
+            components=self._components,
+            max_memory=self.max_memory,
+        )
+
+    def _get_failure(
+        self, worker: _SupervisedWorker, max_memory: Optional[float] = None
+    ) -> Optional[str]:
+        """
+        Check if a busy worker has crashed, timed out or gone over the memory limit.
+
+        Parameters:
+            worker: The busy worker to check.
+            max_memory: The memory limit in MB of the running task.
+
+        Returns:
+            The reason the task failed or `None` if it is still running normally.
+        """
+        if not worker.process.is_alive():
+            return f"The worker crashed with exit code {worker.process.exitcode}."
+
+        _, _, deadline = worker.task
+        if deadline is not None and time.monotonic() > deadline:
+            return f"The molecule took longer than the timeout of {self.timeout}s."
+
+        if max_memory is not None:
+            memory = _get_memory_usage(worker.process.pid)
+            if memory is not None and memory > max_memory:
+                return f"The worker went over the memory limit of {max_memory} MB."
+
+        return None
+
+    def _map_unordered(
+        self,
+        task: Callable,
+        items: Iterable[List[Molecule]],
+        on_failure: Callable[[List[Molecule], str], Any],
+        max_workers: int,
+        max_memory: Optional[float] = None,
+    ) -> Iterator:
+        # chunks are only taken from the items as workers become free so they are packed
+        # lazily, the queue only holds the single molecules retried from failed chunks
+        items = iter(items)
+        queue = deque()
+        exhausted = False
+
+        def next_item() -> Optional[List[Molecule]]:
+            nonlocal exhausted
+            if queue:
+                return queue.popleft()
+            if not exhausted:
+                item = next(items, None)
+                if item is not None:
+                    return item
+                exhausted = True
+            return None
+
+        if self.max_memory is not None:
+            max_memory = min(max_memory or self.max_memory, self.max_memory)
+        poll_interval = None if self.timeout is None and max_memory is None else 1
+
+        try:
+            while (
+                not exhausted
+                or queue
+                or any(worker.task is not None for worker in self._workers)
+            ):
+
+                # replace any idle workers which have exited, like those over the
+                # memory limit
+                for i, worker in enumerate(self._workers):
+                    if worker.task is None and not worker.process.is_alive():
+                        worker.kill()
+                        self._workers[i] = self._start_worker()
+
+                n_busy = sum(1 for worker in self._workers if worker.task is not None)
+                for worker in self._workers:
+                    if worker.task is None and n_busy < max_workers:
+                        item = next_item()
+                        if item is None:
+                            break
+                        n_busy += 1
+                        worker.submit(
+                            task_id=next(self._task_ids),
+                            function=task,
+                            item=item,
+                            timeout=None
+                            if self.timeout is None
+                            else self.timeout * len(item),
+                        )
+
+                busy = [worker for worker in self._workers if worker.task is not None]
+                if not busy:
+                    # the items ran out before any more work was sent
+                    continue
+                ready = wait(
+                    [worker.connection for worker in busy]
+                    + [worker.process.sentinel for worker in busy],
+                    timeout=poll_interval,
+                )
+
+                for i, worker in enumerate(self._workers):
+                    if worker.task is None:
+                        continue
+
+                    _, item, _ = worker.task
+                    if worker.connection in ready or worker.connection.poll():
+                        try:
+                            _, success, value = worker.connection.recv()
+                        except (EOFError, OSError):
+                            reason = (
+                                self._get_failure(worker, max_memory)
+                                or "The worker crashed."
+                            )
+                        else:
+                            worker.task = None
+                            if success:
+                                yield value
+                                continue
+                            reason = value
+                    else:
+                        reason = self._get_failure(worker, max_memory)
+
+                    if reason is None:
+                        continue
+
+                    if worker.task is not None:
+                        # the worker is stuck or dead so replace it
+                        worker.task = None
+                        worker.kill()
+                        self._workers[i] = self._start_worker()
+
+                    if len(item) > 1:
+                        # find the molecules which caused the failure by running
+                        # them one at a time
+                        queue.extendleft([molecule] for molecule in reversed(item))
+                    else:
+                        yield on_failure(item, reason)
+        finally:
+            # drop any tasks which are still running if we stopped early
+            for i, worker in enumerate(self._workers):
+                if worker.task is not None:
+                    worker.task = None
+                    worker.kill()
+                    self._workers[i] = self._start_worker()
+
+
+class DaskExecutor(FuturesExecutor):
+    """
+    Run the workflow components on a dask distributed cluster.
+
+    A local cluster with one single threaded worker process per processor is started when no client is given, pass a
+    client to use an existing cluster which may span many machines.
+    """
+
+    def __init__(
+        self,
+        processors: Optional[int] = None,
+        components: Optional[List["CustomWorkflowComponent"]] = None,
+        client: Optional["distributed.Client"] = None,
+        memory_budget: Optional[float] = None,
+    ):
+        """
+        Parameters:
+            processors: The number of workers in the local cluster, None will use all cores.
+            components: The workflow components the executor will run.
+            client: The client of an existing cluster which should be used, this is not closed with the executor.
+            memory_budget: The total memory in MB the workers may use, None will use the physical memory.
+        """
+        which_import(
+            "distributed",
+            raise_error=True,
+            return_bool=True,
+            raise_msg="Please install via `conda install distributed -c conda-forge`.",
+        )
+        super().__init__(
+            processors=processors, components=components, memory_budget=memory_budget
+        )
+        self._pool = client
+        self._owns_pool = client is None
+
+    @property
+    def n_workers(self) -> int:
+        if self._pool is not None and not self._owns_pool:
+            return max(len(self._pool.scheduler_info()["workers"]), 1)
+        return self.processors
+
+    def _create_pool(self) -> "distributed.Client":
+        from distributed import Client, LocalCluster
+
+        cluster = LocalCluster(
+            n_workers=self.processors, threads_per_worker=1, processes=True
+        )
+        return Client(cluster)
+
+    def shutdown(self) -> None:
+        if self._pool is not None and self._owns_pool:
+            cluster = self._pool.cluster
+            self._pool.close()
+            cluster.close()
+            self._pool = None
+
+    def _map_unordered(
+        self,
+        task: Callable,
+        items: Iterable[List[Molecule]],
+        on_failure: Callable[[List[Molecule], str], Any],
+        max_workers: int,
+        max_memory: Optional[float] = None,
+    ) -> Iterator:
+        from distributed import as_completed
+
+        # failed chunks are retried one molecule at a time before any new chunks
+        queue = deque()
+        items = iter(items)
+        submitted = {}
+        running = as_completed()
+
+        def submit() -> None:
+            item = queue.popleft() if queue else next(items, None)
+            if item is not None:
+                future = self._pool.submit(task, item, pure=False)
+                submitted[future.key] = item
+                running.add(future)
+
+        # only keep as many tasks on the cluster as may run at once
+        for _ in range(max_workers):
+            submit()
+        for future in running:
+            item = submitted.pop(future.key)
+            try:
+                value = future.result()
+            except Exception as error:
+                if len(item) > 1:
+                    # find the molecules which caused the failure by running them
+                    # one at a time
+                    queue.extend([molecule] for molecule in item)
+                else:
+                    yield on_failure(item, f"{error.__class__.__name__}: {error}")
+            else:
+                yield value
+            # keep the cluster busy, including any retries of a failed chunk
+            for _ in range(max_workers - len(submitted)):
+                submit()
+
+
+executor_types: Dict[str, type] = {
+    "serial": SerialExecutor,
+    "threads": ThreadExecutor,
+    "processes": ProcessExecutor,
+    "dask": DaskExecutor,
+}
+
+
+def get_executor(
+    executor: Union[str, WorkflowExecutor, concurrent.futures.Executor],
+    processors: Optional[int] = None,
+    components: Optional[List["CustomWorkflowComponent"]] = None,
+) -> WorkflowExecutor:
+    """
+    Get a workflow executor from its name or wrap a `concurrent.futures` pool.
+
+    Parameters:
+        executor: The name of the executor type, one of `serial`, `threads`, `processes` or `dask`, an existing
+            workflow executor which is returned as is, or a `concurrent.futures.Executor` which should be wrapped.
+        processors: The number of workers, None will use all cores.
+        components: The workflow components the executor will run.
+
+    Returns:
+        The workflow executor.
+
+    Raises:
+        InvalidExecutorError: If the executor type is not supported.
+    """
+    if isinstance(executor, WorkflowExecutor):
+        return executor
+
+    if isinstance(executor, concurrent.futures.Executor):
+        return FuturesExecutor(
+            processors=processors, components=components, executor=executor
+        )
+
+    executor_type = executor_types.get(str(executor).lower(), None)
+    if executor_type is None:
+        raise InvalidExecutorError(
+            f"The executor {executor} is not supported, please chose from "
+            f"{list(executor_types.keys())}."
+        )
+
+    return executor_type(processors=processors, components=components)
@@ -1,19 +1,25 @@
+import hashlib
 import os
-from typing import Any, Dict, List, Optional, Tuple, Union
+import pickle
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
+import qcelemental as qcel
 import tqdm
 from openforcefield import topology as off
-from pydantic import Field, validator
+from pydantic import BaseModel, Field, validator
 from qcportal import FractalClient
 from qcportal.models.common_models import DriverEnum
 from typing_extensions import Literal
 
+from openff.qcsubmit.cache import ResultCache
 from openff.qcsubmit.common_structures import CommonBase, Metadata, MoleculeAttributes
 from openff.qcsubmit.datasets import (
     BasicDataset,
     ComponentResult,
+    DatasetEntry,
     OptimizationDataset,
     TorsiondriveDataset,
+    TorsionDriveEntry,
 )
 from openff.qcsubmit.exceptions import (
     ComponentRequirementError,
@@ -24,11 +30,243 @@ from openff.qcsubmit.exceptions import (
     MissingWorkflowComponentError,
     MolecularComplexError,
 )
+from openff.qcsubmit.executors import WorkflowExecutor, get_executor
 from openff.qcsubmit.procedures import GeometricProcedure
 from openff.qcsubmit.serializers import deserialize, serialize
+from openff.qcsubmit.utils import get_cmiles, iter_molecule_batches, sample_molecules
 from openff.qcsubmit.workflow_components import CustomWorkflowComponent, get_component
 
 
+def _create_dataset_entries(
+    molecules: List[off.Molecule],
+    factory: "BasicDatasetFactory",
+    provenance: Dict[str, str],
+) -> List[Optional[DatasetEntry]]:
+    """
+    Make the dataset entry of each molecule, this is ran in the workers so that the identifiers and QCSchema molecules
+    of a large dataset are made in parallel.
+
+    Parameters:
+        molecules: The chunk of molecules which passed the workflow.
+        factory: The factory making the dataset, used to make the identifiers and index of each molecule.
+        provenance: The provenance of the factory.
+
+    Returns:
+        The entry of each molecule in order, or `None` when an entry could not be made so that the molecule can be
+        handled in the parent, for example a molecular complex.
+    """
+    entry_class = factory._dataset_type._entry_class
+
+    entries = []
+    for molecule in molecules:
+        # order the molecule
+        order_mol = molecule.canonical_order_atoms()
+        attributes = factory.create_cmiles_metadata(molecule=order_mol)
+        attributes.provenance = dict(provenance)
+
+        # always put the cmiles in the extras from what we have just calculated to ensure correct order
+        extras = molecule.properties.get("extras", {})
+        keywords = molecule.properties.get("keywords", None)
+
+        try:
+            entries.append(
+                entry_class(
+                    off_molecule=order_mol,
+                    index=factory.create_index(molecule=order_mol),
+                    attributes=attributes,
+                    extras=extras or {},
+                    keywords=keywords or {},
+                )
+            )
+        except (MolecularComplexError, qcel.exceptions.ValidationError):
+            entries.append(None)
+
+    return entries
+
+
+def _create_torsiondrive_entries(
+    molecules: List[off.Molecule],
+    factory: "TorsiondriveDatasetFactory",
+    provenance: Dict[str, str],
+) -> List[Optional[List[Union[TorsionDriveEntry, type]]]]:
+    """
+    Make the torsiondrive entries of each molecule, this is ran in the workers so that large datasets are prepared in
+    parallel. The identifiers, QCSchema molecules and linear bonds of a molecule are only made once and shared by the
+    entries of all of its torsions.
+
+    Parameters:
+        molecules: The chunk of molecules which passed the workflow.
+        factory: The factory making the dataset, used to make the identifiers and index of each torsion.
+        provenance: The provenance of the factory, not used as the torsiondrive entries keep the workflow provenance.
+
+    Returns:
+        For each molecule in order a list with the entry of each torsion or the type of error raised when the torsion
+        is not valid, or `None` when the molecule should be handled in the parent, for example when a valid QCSchema
+        could not be made.
+    """
+    entries = []
+    for molecule in molecules:
+        extras = molecule.properties.get("extras", {})
+        keywords = molecule.properties.get("keywords", {})
+
+        # work out the index and keywords of each torsion
+        torsions = []
+        if "dihedrals" in molecule.properties:
+            entry_molecule = molecule
+            for dihedral in molecule.properties["dihedrals"].get_dihedrals:
+                molecule.properties["atom_map"] = dihedral.get_atom_map
+                torsions.append(
+                    (
+                        factory.create_index(molecule=molecule),
+                        dihedral.get_dihedrals,
+                        dict(keywords, dihedral_ranges=dihedral.get_scan_range),
+                    )
+                )
+                del molecule.properties["atom_map"]
+        else:
+            # the molecule has not had its atoms identified yet so process them here
+            entry_molecule = molecule.canonical_order_atoms()
+            for bond in entry_molecule.find_rotatable_bonds():
+                # create a torsion to hold as fixed using non-hydrogen atoms
+                torsion_index = factory._get_torsion_string(bond)
+                entry_molecule.properties["atom_map"] = dict(
+                    (atom, index) for index, atom in enumerate(torsion_index)
+                )
+                torsions.append(
+                    (
+                        factory.create_index(molecule=entry_molecule),
+                        [torsion_index],
+                        keywords,
+                    )
+                )
+                del entry_molecule.properties["atom_map"]
+
+        if not torsions:
+            entries.append([])
+            continue
+
+        attributes = factory.create_cmiles_metadata(molecule=entry_molecule)
+        try:
+            # convert and validate the conformers once for all of the torsions
+            molecule_entry = DatasetEntry(
+                off_molecule=entry_molecule,
+                index=torsions[0][0],
+                attributes=attributes,
+                extras=extras or {},
+                keywords={},
+            )
+        except MolecularComplexError:
+            entries.append([MolecularComplexError] * len(torsions))
+            continue
+        except qcel.exceptions.ValidationError:
+            entries.append(None)
+            continue
+
+        off_molecule = molecule_entry.get_off_molecule(include_conformers=False)
+        linear_bonds = factory._detect_linear_torsions(off_molecule)
+        torsion_entries = []
+        for index, dihedrals, torsion_keywords in torsions:
+            try:
+                torsion_entries.append(
+                    TorsionDriveEntry.from_entry(
+                        molecule_entry,
+                        index=index,
+                        dihedrals=dihedrals,
+                        keywords=torsion_keywords,
+                        off_molecule=off_molecule,
+                        linear_bonds=linear_bonds,
+                    )
+                )
+            except (DihedralConnectionError, LinearTorsionError) as error:
+                torsion_entries.append(type(error))
+        entries.append(torsion_entries)
+
+    return entries
+
+
+class ComponentEstimate(BaseModel):
+    """
+    The measured cost and selectivity of a workflow component on a sample of the input and its extrapolated run time.
+    """
+
+    component_name: str = Field(..., description="The name of the component.")
+    n_sampled: int = Field(
+        ..., description="The number of sampled molecules which reached the component."
+    )
+    n_passed: int = Field(
+        ..., description="The number of sampled molecules returned by the component."
+    )
+    sample_time: float = Field(
+        ...,
+        description="The wall-clock time in seconds to run the sample on one processor.",
+    )
+    n_workers: int = Field(
+        ..., description="The number of workers the component can use in the full run."
+    )
+    estimated_time: float = Field(
+        ..., description="The estimated wall-clock time in seconds of the full run."
+    )
+
+    @property
+    def pass_fraction(self) -> float:
+        """
+        Returns:
+            The number of molecules returned per molecule received, this can be larger than one for components which
+            make new molecules such as the enumerators.
+        """
+        if self.n_sampled == 0:
+            return 1.0
+        return self.n_passed / self.n_sampled
+
+    @property
+    def throughput(self) -> float:
+        """
+        Returns:
+            The number of molecules processed per second by one worker.
+        """
+        if self.sample_time <= 0:
+            return float("inf")
+        return self.n_sampled / self.sample_time
+
+
+class WorkflowEstimate(BaseModel):
+    """
+    A dry run of a dataset factory on a random sample of the input, the measured cost and selectivity of each component
+    are extrapolated to the full input to predict the run time and the size of the dataset.
+    """
+
+    n_input: int = Field(..., description="The number of input molecules.")
+    sample_size: int = Field(..., description="The number of molecules sampled.")
+    processors: int = Field(
+        ..., description="The number of processors the estimate is made for."
+    )
+    components: List[ComponentEstimate] = Field(
+        ...,
+        description="The estimate of each component in the order they were ran, components in a branch are named `branch/component`.",
+    )
+    preparation_time: float = Field(
+        ...,
+        description="The estimated wall-clock time in seconds to make the dataset entries from the molecules which pass the workflow.",
+    )
+    n_molecules: int = Field(
+        ..., description="The predicted number of unique molecules in the dataset."
+    )
+    n_records: int = Field(
+        ..., description="The predicted number of records the dataset will create."
+    )
+
+    @property
+    def wall_time(self) -> float:
+        """
+        Returns:
+            The estimated wall-clock time in seconds to make the dataset.
+        """
+        return (
+            sum(component.estimated_time for component in self.components)
+            + self.preparation_time
+        )
+
+
 class BasicDatasetFactory(CommonBase):
     """
     Basic dataset generator factory used to build work flows using workflow components before executing them to generate
@@ -46,12 +284,25 @@ class BasicDatasetFactory(CommonBase):
         {},
         description="The set of workflow components and their settings which will be executed in order on the input molecules to make the dataset.",
     )
+    workflow_branches: Dict[str, Dict[str, CustomWorkflowComponent]] = Field(
+        {},
+        description="Named branches of workflow components which are each executed in order on the molecules which pass the main workflow, the molecules from every branch are combined and de-duplicated to make the dataset.",
+    )
+    hash_method: Literal["inchikey", "smiles", "graph"] = Field(
+        "inchikey",
+        description="The key used to find duplicate molecules as they pass through the workflow, `inchikey` is the most compatible while the canonical `smiles` and numpy `graph` hashes are faster for large inputs.",
+    )
     _dataset_type: BasicDataset = BasicDataset
 
-    def _get_molecular_complex_info(self) -> Dict[str, Any]:
+    def _get_molecular_complex_info(
+        self, provenance: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
         """
         Make a molecular complex dummy filter
 
+        Parameters:
+            provenance: The provenance of the factory if it has already been computed.
+
         Returns:
             A dictionary to collect any molecules which are molecular complexes and should be removed.
         """
@@ -60,7 +311,7 @@ class BasicDatasetFactory(CommonBase):
             "component_description": {
                 "component_description": "Remove any molecules which are complexes.",
             },
-            "component_provenance": self.provenance(),
+            "component_provenance": provenance or self.provenance(),
             "molecules": [],
         }
 
@@ -99,6 +350,7 @@ class BasicDatasetFactory(CommonBase):
         Reset the workflow to by empty.
         """
         self.workflow = {}
+        self.workflow_branches = {}
 
     def add_workflow_component(
         self,
@@ -118,6 +370,74 @@ class BasicDatasetFactory(CommonBase):
             InvalidWorkflowComponentError: If an invalid workflow component is attempted to be added to the workflow.
 
         """
+        self._add_components(workflow=self.workflow, components=components)
+
+    def add_workflow_branch(
+        self,
+        branch_name: str,
+        components: Union[
+            List[CustomWorkflowComponent],
+            CustomWorkflowComponent,
+        ],
+    ) -> None:
+        """
+        Validate the workflow components and add them to the end of a branch of the workflow, the branch is made if it
+        does not exist.
+
+        Each branch is ran on the molecules which pass the main workflow so the shared steps are only ran once, the
+        branches are ran at the same time on the workers and their molecules are combined to make the dataset.
+
+        Parameters:
+            branch_name: The name of the branch the components should be added to.
+            components: A list of or an individual workflow component which are to be validated and added to the branch.
+
+        Raises:
+            InvalidWorkflowComponentError: If an invalid workflow component is attempted to be added to the branch.
+
+        Example:
+            Enumerating tautomers and stereoisomers separately after a shared filter.
+
+            ```python
+            >>> from openff.qcsubmit.factories import BasicDatasetFactory
+            >>> from openff.qcsubmit import workflow_components
+            >>> factory = BasicDatasetFactory()
+            >>> factory.add_workflow_component(workflow_components.ElementFilter())
+            >>> factory.add_workflow_branch("tautomers", workflow_components.EnumerateTautomers())
+            >>> factory.add_workflow_branch("stereoisomers", workflow_components.EnumerateStereoisomers())
+            ```
+        """
+        branch = self.workflow_branches.setdefault(branch_name, {})
+        self._add_components(workflow=branch, components=components)
+
+    def remove_workflow_branch(self, branch_name: str) -> None:
+        """
+        Remove a branch and all of its components from the workflow.
+
+        Parameters:
+            branch_name: The name of the branch which should be removed.
+
+        Raises:
+            MissingWorkflowComponentError: If there is no branch with this name in the workflow.
+        """
+
+        try:
+            del self.workflow_branches[branch_name]
+
+        except KeyError:
+            raise MissingWorkflowComponentError(
+                f"The requested branch {branch_name} "
+                f"could not be removed as it was not registered."
+            )
+
+    @staticmethod
+    def _add_components(
+        workflow: Dict[str, CustomWorkflowComponent],
+        components: Union[List[CustomWorkflowComponent], CustomWorkflowComponent],
+    ) -> None:
+        """
+        Validate the workflow components and insert them into the workflow or branch, components with a name which is
+        already used are renamed with a counter.
+        """
 
         if not isinstance(components, list):
             # we have one component make it into a list
@@ -132,8 +452,8 @@ class BasicDatasetFactory(CommonBase):
                         f"The component {component.component_name} could not be added to "
                         f"the workflow due to missing requirements"
                     ) from e
-                if component.component_name not in self.workflow.keys():
-                    self.workflow[component.component_name] = component
+                if component.component_name not in workflow.keys():
+                    workflow[component.component_name] = component
                 else:
                     # we should increment the name and add it to the workflow
                     if "@" in component.component_name:
@@ -142,7 +462,7 @@ class BasicDatasetFactory(CommonBase):
                         name, number = component.component_name, 0
                     # set the new name
                     component.component_name = f"{name}@{int(number) + 1}"
-                    self.workflow[component.component_name] = component
+                    workflow[component.component_name] = component
 
             else:
                 raise InvalidWorkflowComponentError(
@@ -210,12 +530,27 @@ class BasicDatasetFactory(CommonBase):
         if isinstance(workflow, str):
             workflow = deserialize(workflow)
 
+        branches = {}
         if isinstance(workflow, dict):
             # this should be a workflow dict that we can just load
             # if this is from the settings file make sure to unpack the dict first.
-            workflow = workflow.get("workflow", workflow)
+            if "workflow" in workflow:
+                branches = workflow.get("workflow_branches", None) or {}
+                workflow = workflow["workflow"]
 
         # load in the workflow
+        self.add_workflow_component(self._load_components(workflow))
+        for branch_name, branch in branches.items():
+            self.add_workflow_branch(
+                branch_name=branch_name, components=self._load_components(branch)
+            )
+
+    @staticmethod
+    def _load_components(workflow: Dict[str, Any]) -> List[CustomWorkflowComponent]:
+        """
+        Build the workflow components from their serialised settings keyed by the component name.
+        """
+        components = []
         for key, value in workflow.items():
             # check if this is not the first instance of the component
             if "@" in key:
@@ -223,7 +558,9 @@ class BasicDatasetFactory(CommonBase):
             else:
                 name = key
             component = get_component(name)
-            self.add_workflow_component(component.parse_obj(value))
+            components.append(component.parse_obj(value))
+
+        return components
 
     def export_workflow(self, file_name: str) -> None:
         """
@@ -236,8 +573,8 @@ class BasicDatasetFactory(CommonBase):
             UnsupportedFiletypeError: If the file type is not supported.
         """
 
-        # grab only the workflow
-        workflow = self.dict(include={"workflow"})
+        # grab only the workflow and its branches
+        workflow = self.dict(include={"workflow", "workflow_branches"})
         serialize(serializable=workflow, file_name=file_name)
 
     def export_settings(self, file_name: str) -> None:
@@ -279,6 +616,8 @@ class BasicDatasetFactory(CommonBase):
                 f"The input type could not be converted into a settings dictionary."
             )
 
+        branches = data.pop("workflow_branches", {})
+
         # now set the factory meta settings
         for key, value in data.items():
             if hasattr(self, key):
@@ -287,7 +626,10 @@ class BasicDatasetFactory(CommonBase):
                 continue
 
         # now we want to add the workflow back in
-        self.import_workflow(workflow=workflow, clear_existing=clear_workflow)
+        self.import_workflow(
+            workflow={"workflow": workflow, "workflow_branches": branches},
+            clear_existing=clear_workflow,
+        )
 
     def _get_collection(
         self, dataset_type: str, dataset_name: str, client: Union[str, FractalClient]
@@ -356,13 +698,17 @@ class BasicDatasetFactory(CommonBase):
         return response
 
     def _create_initial_component_result(
-        self, molecules: Union[str, off.Molecule, List[off.Molecule]]
+        self,
+        molecules: Union[str, off.Molecule, List[off.Molecule]],
+        processors: Optional[int] = 1,
     ) -> ComponentResult:
         """
         Create the initial component result which is used for de-duplication.
 
         Parameters:
             molecules: The input molecules which can be a file name or list of molecule instances
+            processors: The number of processes used to read and de-duplicate an input file or directory, None will
+                use all cores.
 
         Returns:
             The initial component result used to start the workflow.
@@ -376,6 +722,8 @@ class BasicDatasetFactory(CommonBase):
                     component_description={"component_name": self.factory_type},
                     component_provenance=self.provenance(),
                     input_file=molecules,
+                    processors=processors,
+                    hash_method=self.hash_method,
                 )
 
             elif os.path.isdir(molecules):
@@ -384,6 +732,8 @@ class BasicDatasetFactory(CommonBase):
                     component_description={"component_name": self.factory_type},
                     component_provenance=self.provenance(),
                     input_directory=molecules,
+                    processors=processors,
+                    hash_method=self.hash_method,
                 )
 
         elif isinstance(molecules, off.Molecule):
@@ -394,6 +744,7 @@ class BasicDatasetFactory(CommonBase):
                 molecules=[
                     molecules,
                 ],
+                hash_method=self.hash_method,
             )
 
         else:
@@ -402,10 +753,912 @@ class BasicDatasetFactory(CommonBase):
                 component_description={"component_name": self.factory_type},
                 component_provenance=self.provenance(),
                 molecules=molecules,
+                hash_method=self.hash_method,
             )
 
         return workflow_molecules
 
+    def _get_all_components(self) -> List[CustomWorkflowComponent]:
+        """
+        Get every component of the workflow followed by the components of each branch.
+        """
+        return list(self.workflow.values()) + [
+            component
+            for branch in self.workflow_branches.values()
+            for component in branch.values()
+        ]
+
+    def _set_hash_method(self) -> None:
+        """
+        Make every component of the workflow find duplicate molecules using the hash method of the factory, this must
+        be done before the components are sent to any workers.
+        """
+        for component in self._get_all_components():
+            component._hash_method = self.hash_method
+
+    def _create_executor(
+        self,
+        processors: Optional[int],
+        executor: Optional[Union[str, WorkflowExecutor]] = None,
+        preparation: bool = False,
+    ) -> Optional[WorkflowExecutor]:
+        """
+        Create a worker pool which is shared by all of the components in the workflow.
+
+        Parameters:
+            processors: The number of processors available to the workflow, None will use all cores.
+            executor: The name of the executor type which should be made or an existing executor which is returned
+                as is, None will use a pool of processes.
+            preparation: If the pool will also be used to make the dataset entries, in which case it is made even when
+                no workflow component can be ran in parallel.
+
+        Returns:
+            An executor set up with the workflow components or `None` if the workflow should be ran serially.
+        """
+        if isinstance(executor, WorkflowExecutor):
+            return executor
+
+        parallel_components = [
+            component
+            for component in self._get_all_components()
+            if component._properties.process_parallel
+        ]
+        if (not parallel_components and not preparation) or (
+            executor is None and processors == 1
+        ):
+            return None
+
+        return get_executor(
+            executor or "processes",
+            processors=processors,
+            components=parallel_components,
+        )
+
+    @staticmethod
+    def _get_workflow_segments(
+        components: List[CustomWorkflowComponent],
+    ) -> List[List[CustomWorkflowComponent]]:
+        """
+        Split the workflow into segments of components which can be fused and ran one molecule at a time inside a
+        worker.
+
+        A segment continues while its components do not produce duplicates, so that the molecules handed on to the next
+        component never need to be de-duplicated first, and ends after the first component which can produce duplicates
+        or which finalizes its merged result.
+        Components which can not be ran in parallel are always ran on their own and a new segment is started when the
+        resource limits change, so heavy components do not narrow the cheap components around them.
+
+        Parameters:
+            components: The workflow components in the order they should be executed.
+
+        Returns:
+            A list of the segments of components in order.
+        """
+
+        def get_limits(component: CustomWorkflowComponent) -> Dict[str, Any]:
+            return component.resource_limits.dict(
+                include={"max_workers", "max_memory", "licence_seats"}
+            )
+
+        segments, current = [], []
+        for component in components:
+            if not component._properties.process_parallel:
+                if current:
+                    segments.append(current)
+                    current = []
+                segments.append([component])
+                continue
+
+            if current and get_limits(component) != get_limits(current[-1]):
+                segments.append(current)
+                current = []
+
+            current.append(component)
+            # the next component needs de-duplicated or finalized input so it starts a new segment
+            if (
+                component._properties.produces_duplicates
+                or component._finalizes_result()
+            ):
+                segments.append(current)
+                current = []
+
+        if current:
+            segments.append(current)
+
+        return segments
+
+    def get_workflow_plan(
+        self, molecules: Optional[List[off.Molecule]] = None
+    ) -> List[CustomWorkflowComponent]:
+        """
+        Plan the order the workflow components should be executed in, so that cheap and selective filters run before
+        expensive components such as conformer generation and fewer molecules reach them.
+
+        Pure filters, which only look at the chemical graph, are moved in front of the components before them up to the
+        last component which changes the graph and are ordered by their cost per molecule removed. Every other
+        component keeps its place relative to the components which change the graph.
+
+        Parameters:
+            molecules: A small sample of the input molecules used to estimate the fraction of molecules each filter
+                removes, without a sample the filters are ordered by their cost alone.
+
+        Returns:
+            The workflow components in the order they should be executed.
+        """
+
+        def get_rank(component: CustomWorkflowComponent) -> float:
+            pass_fraction = 0.5
+            if molecules:
+                result = component.apply(
+                    molecules=molecules, processors=1, verbose=False
+                )
+                pass_fraction = result.n_molecules / max(
+                    result.n_molecules + result.n_filtered, 1
+                )
+            if pass_fraction >= 1:
+                return float("inf")
+            return component._properties.relative_cost / (1 - pass_fraction)
+
+        plan, filters, others = [], [], []
+        for component in self.workflow.values():
+            if component._is_pure_filter():
+                filters.append(component)
+            elif component._properties.changes_graph:
+                # filters can not be moved past this component
+                plan.extend(sorted(filters, key=get_rank) + others + [component])
+                filters, others = [], []
+            else:
+                others.append(component)
+
+        plan.extend(sorted(filters, key=get_rank) + others)
+        return plan
+
+    def _get_planned_components(
+        self,
+        molecules: Union[str, List[off.Molecule], off.Molecule],
+        sample_size: int = 20,
+    ) -> List[CustomWorkflowComponent]:
+        """
+        Plan the order of the workflow using a small sample read from the start of the input molecules.
+
+        Parameters:
+            molecules: The input molecules, a molecule file or a directory of molecule files.
+            sample_size: The number of molecules used to estimate the fraction of molecules each filter removes.
+        """
+        sample = next(iter_molecule_batches(molecules, batch_size=sample_size), [])
+        return self.get_workflow_plan(molecules=sample)
+
+    def estimate_workflow(
+        self,
+        molecules: Union[str, List[off.Molecule], off.Molecule],
+        sample_size: int = 50,
+        processors: Optional[int] = None,
+        seed: Optional[int] = None,
+        plan_workflow: bool = False,
+    ) -> WorkflowEstimate:
+        """
+        Dry run the workflow on a random sample of the input molecules to estimate how long making the dataset will
+        take and how large it will be, before committing the compute to `create_dataset`.
+
+        Each component is ran on one processor over the sample, its throughput is then scaled to the full input and
+        spread over the workers it may use given its resource limits. The dataset made from the sample is used to
+        predict the number of molecules and records.
+
+        Parameters:
+            molecules: The input molecules, a molecule file or a directory of molecule files. Only the sampled records
+                of SMILES and SDF files are parsed.
+            sample_size: The number of molecules which should be sampled.
+            processors: The number of processors the workflow will be ran with, None will use all cores.
+            seed: The seed used to draw the sample, so the estimate can be repeated.
+            plan_workflow: If the workflow should be estimated in the order planned by `get_workflow_plan`.
+
+        Returns:
+            The estimate of each component and of the whole dataset.
+
+        Note:
+            The estimate assumes the cost of a molecule does not depend on where it is in the input, the memory budget
+            of the executor and the overhead of starting workers are not included.
+        """
+        import time
+
+        self._set_hash_method()
+        sample, n_input = sample_molecules(
+            molecules=molecules, sample_size=sample_size, seed=seed
+        )
+        processors = processors or os.cpu_count() or 1
+        scale = n_input / max(len(sample), 1)
+
+        estimates = []
+
+        def run_components(
+            components: List[CustomWorkflowComponent],
+            component_molecules: List[off.Molecule],
+            prefix: str = "",
+        ) -> List[off.Molecule]:
+            for component in components:
+                start = time.perf_counter()
+                result = component.apply(
+                    molecules=component_molecules, processors=1, verbose=False
+                )
+                sample_time = time.perf_counter() - start
+
+                n_workers = 1
+                if component._properties.process_parallel:
+                    limits = component.resource_limits
+                    n_workers = min(
+                        processors,
+                        limits.max_workers or processors,
+                        limits.licence_seats or processors,
+                    )
+                estimates.append(
+                    ComponentEstimate(
+                        component_name=prefix + component.component_name,
+                        n_sampled=len(component_molecules),
+                        n_passed=result.n_molecules,
+                        sample_time=sample_time,
+                        n_workers=n_workers,
+                        estimated_time=sample_time * scale / n_workers,
+                    )
+                )
+                component_molecules = result.molecules
+            return component_molecules
+
+        if plan_workflow:
+            components = self.get_workflow_plan(molecules=sample)
+        else:
+            components = list(self.workflow.values())
+        workflow_molecules = run_components(components, sample)
+
+        if self.workflow_branches:
+            combined = ComponentResult(
+                component_name="WorkflowBranches",
+                component_description={},
+                component_provenance={},
+                hash_method=self.hash_method,
+            )
+            for branch_name, branch in self.workflow_branches.items():
+                branch_molecules = run_components(
+                    list(branch.values()),
+                    [off.Molecule(molecule) for molecule in workflow_molecules],
+                    prefix=f"{branch_name}/",
+                )
+                for molecule in branch_molecules:
+                    combined.add_molecule(molecule)
+            workflow_molecules = combined.molecules
+
+        # the dataset of the sample predicts the entries made per input molecule
+        factory = self.copy(update={"workflow": {}, "workflow_branches": {}})
+        start = time.perf_counter()
+        dataset = factory.create_dataset(
+            dataset_name="dry run",
+            molecules=workflow_molecules,
+            description="A dry run of the workflow on a sample of the input.",
+            tagline="A dry run of the workflow.",
+            processors=1,
+            verbose=False,
+        )
+        preparation_time = (time.perf_counter() - start) * scale / processors
+
+        return WorkflowEstimate(
+            n_input=n_input,
+            sample_size=len(sample),
+            processors=processors,
+            components=estimates,
+            preparation_time=preparation_time,
+            n_molecules=round(dataset.n_molecules * scale),
+            n_records=round(dataset.n_records * scale),
+        )
+
+    def _apply_fused_components(
+        self,
+        components: List[CustomWorkflowComponent],
+        molecules: List[off.Molecule],
+        executor: WorkflowExecutor,
+        verbose: bool = True,
+        schedule: str = "input",
+        cache: Optional[ResultCache] = None,
+    ) -> List[ComponentResult]:
+        """
+        Run the molecules through a fused segment of the workflow, each chunk of molecules flows through every
+        component inside one worker and only the filtered and final molecules are sent back.
+
+        Parameters:
+            components: The segment of workflow components which should be applied in order.
+            molecules: The molecules which should be processed.
+            executor: The running executor which should be used.
+            verbose: If True a progress bar for the segment will be shown.
+            schedule: The order the molecules are sent to the workers, `input` or `lpt` for largest first by the
+                combined estimated cost of the components.
+            cache: The cache of results for single molecules which each component should use.
+
+        Returns:
+            The component result of each component in the segment, only the final result holds the passed molecules.
+        """
+        results = [component._create_result() for component in components]
+
+        costs = None
+        if schedule == "lpt":
+            costs = [
+                sum(component._estimate_cost(molecule) for component in components)
+                for molecule in molecules
+            ]
+
+        chunk_size = CustomWorkflowComponent._get_chunk_size(
+            n_molecules=len(molecules),
+            n_workers=executor.get_max_workers(components),
+        )
+
+        with tqdm.tqdm(
+            total=len(molecules),
+            ncols=80,
+            desc="{:30s}".format(
+                "+".join(component.component_name for component in components)
+            ),
+            disable=not verbose,
+        ) as progress:
+            for work in executor.apply_components(
+                components=components,
+                molecules=molecules,
+                chunk_size=chunk_size,
+                costs=costs,
+                cache=cache,
+            ):
+                for result, stage_work in zip(results, work):
+                    result.update(stage_work)
+                # chunks hold at most chunk size molecules
+                progress.update(min(chunk_size, progress.total - progress.n))
+
+        for component, result in zip(components, results):
+            executor.finalize_component(component, result)
+
+        return results
+
+    def _get_checkpoint_fingerprint(
+        self,
+        workflow_molecules: ComponentResult,
+        components: Optional[List[CustomWorkflowComponent]] = None,
+    ) -> str:
+        """
+        Create a fingerprint of the factory settings and the input molecules, a checkpoint is only resumed when the
+        fingerprint matches so a changed workflow or input is always ran from the start.
+
+        Parameters:
+            workflow_molecules: The initial component result holding the input molecules.
+            components: The workflow components in the order they are executed, if this differs from the workflow.
+        """
+        hasher = hashlib.sha1(self.json().encode())
+        if components is not None:
+            hasher.update(
+                ",".join(component.component_name for component in components).encode()
+            )
+        for molecule_key in sorted(
+            ResultCache.get_molecule_key(molecule)
+            for molecule in workflow_molecules.molecules
+        ):
+            hasher.update(molecule_key.encode())
+        return hasher.hexdigest()
+
+    @staticmethod
+    def _save_checkpoint(
+        checkpoint_directory: str,
+        fingerprint: str,
+        n_completed: int,
+        workflow_molecules: ComponentResult,
+        dataset: BasicDataset,
+    ) -> None:
+        """
+        Save the progress of the workflow after a component has finished, the molecules are stored in their packed
+        form and the file is replaced atomically so a run which dies while saving keeps the previous checkpoint.
+
+        Parameters:
+            checkpoint_directory: The directory the checkpoint is saved in.
+            fingerprint: The fingerprint of the factory settings and input molecules.
+            n_completed: The number of workflow components which have finished.
+            workflow_molecules: The result of the last finished component.
+            dataset: The dataset holding the log of filtered molecules.
+        """
+        checkpoint = {
+            "fingerprint": fingerprint,
+            "n_completed": n_completed,
+            "workflow_molecules": workflow_molecules,
+            "filtered_molecules": dataset.filtered_molecules,
+        }
+        checkpoint_file = os.path.join(checkpoint_directory, "checkpoint.pkl")
+        with open(checkpoint_file + ".tmp", "wb") as output:
+            pickle.dump(checkpoint, output, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(checkpoint_file + ".tmp", checkpoint_file)
+
+    @staticmethod
+    def _load_checkpoint(
+        checkpoint_directory: str, fingerprint: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Load the last checkpoint saved in the directory.
+
+        Parameters:
+            checkpoint_directory: The directory the checkpoint was saved in.
+            fingerprint: The fingerprint of the current factory settings and input molecules.
+
+        Returns:
+            The checkpoint or `None` if there is no checkpoint made with the same settings and input molecules.
+        """
+        checkpoint_file = os.path.join(checkpoint_directory, "checkpoint.pkl")
+        try:
+            with open(checkpoint_file, "rb") as checkpoint_data:
+                checkpoint = pickle.load(checkpoint_data)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+        if checkpoint.get("fingerprint", None) != fingerprint:
+            return None
+
+        return checkpoint
+
+    def _run_workflow(
+        self,
+        workflow_molecules: ComponentResult,
+        dataset: BasicDataset,
+        processors: Optional[int] = None,
+        verbose: bool = True,
+        fuse_components: bool = False,
+        executor: Optional[Union[str, WorkflowExecutor]] = None,
+        schedule: str = "input",
+        cache: Optional[Union[str, ResultCache]] = None,
+        checkpoint_directory: Optional[str] = None,
+        components: Optional[List[CustomWorkflowComponent]] = None,
+    ) -> ComponentResult:
+        """
+        Run the molecules through each component of the workflow in order, recording any filtered molecules in the
+        dataset. A single pool of workers is kept alive for the whole workflow.
+
+        Parameters:
+            workflow_molecules: The initial component result holding the input molecules.
+            dataset: The dataset which the filtered molecules should be recorded in.
+            processors: The number of processors available to the workflow, None will use all cores.
+            verbose: If True a progress bar for each workflow component will be shown.
+            fuse_components: If runs of components which do not produce duplicates should be fused, so that each
+                molecule flows through the whole run inside one worker, this has no effect when running serially.
+            executor: The executor type or a running executor which should be used for the workflow, an executor
+                which is passed in is left running.
+            schedule: The order the molecules are sent to the workers, `input` or `lpt` for largest first.
+            cache: The cache or the directory of the cache of results for single molecules, molecules which were
+                processed by a component with the same settings before are not processed again.
+            checkpoint_directory: The directory the progress of the workflow is saved in after each component, a run
+                with the same settings and input molecules resumes from the last saved component.
+            components: The workflow components in the order they should be executed, None will use the order of the
+                workflow.
+
+        Returns:
+            The component result of the final workflow component, or the combined molecules of every branch when the
+            workflow has branches.
+        """
+        if not self.workflow and not self.workflow_branches:
+            return workflow_molecules
+
+        if isinstance(cache, str):
+            cache = ResultCache(directory=cache)
+
+        if components is None:
+            components = list(self.workflow.values())
+
+        # the branches are saved as one step after the main workflow
+        n_components, n_completed = len(components), 0
+        if checkpoint_directory is not None:
+            os.makedirs(checkpoint_directory, exist_ok=True)
+            fingerprint = self._get_checkpoint_fingerprint(
+                workflow_molecules, components=components
+            )
+            checkpoint = self._load_checkpoint(checkpoint_directory, fingerprint)
+            if checkpoint is not None:
+                n_completed = checkpoint["n_completed"]
+                workflow_molecules = checkpoint["workflow_molecules"]
+                dataset.filtered_molecules.update(checkpoint["filtered_molecules"])
+                components = components[n_completed:]
+                if verbose:
+                    print(
+                        f"Resuming the workflow from the checkpoint after {n_completed} components."
+                    )
+
+            # keep the result of each molecule so a component which dies part way through does not start again
+            if cache is None:
+                cache = ResultCache(
+                    directory=os.path.join(checkpoint_directory, "results"),
+                    max_size=None,
+                )
+
+        run_branches = bool(self.workflow_branches) and n_completed <= n_components
+        if not components and not run_branches:
+            return workflow_molecules
+
+        pool = self._create_executor(processors=processors, executor=executor)
+        if fuse_components and pool is not None:
+            segments = self._get_workflow_segments(components=components)
+        else:
+            segments = [[component] for component in components]
+
+        try:
+            for segment in segments:
+                if len(segment) == 1:
+                    results = [
+                        segment[0].apply(
+                            molecules=workflow_molecules.molecules,
+                            processors=processors,
+                            verbose=verbose,
+                            executor=pool,
+                            schedule=schedule,
+                            cache=cache,
+                        )
+                    ]
+                else:
+                    results = self._apply_fused_components(
+                        components=segment,
+                        molecules=workflow_molecules.molecules,
+                        executor=pool,
+                        verbose=verbose,
+                        schedule=schedule,
+                        cache=cache,
+                    )
+
+                for result in results:
+                    self._record_filtered(dataset=dataset, result=result)
+                workflow_molecules = results[-1]
+
+                if checkpoint_directory is not None:
+                    n_completed += len(segment)
+                    self._save_checkpoint(
+                        checkpoint_directory=checkpoint_directory,
+                        fingerprint=fingerprint,
+                        n_completed=n_completed,
+                        workflow_molecules=workflow_molecules,
+                        dataset=dataset,
+                    )
+
+            if run_branches:
+                workflow_molecules = self._run_workflow_branches(
+                    workflow_molecules=workflow_molecules,
+                    dataset=dataset,
+                    pool=pool,
+                    processors=processors,
+                    verbose=verbose,
+                    schedule=schedule,
+                    cache=cache,
+                )
+                if checkpoint_directory is not None:
+                    self._save_checkpoint(
+                        checkpoint_directory=checkpoint_directory,
+                        fingerprint=fingerprint,
+                        n_completed=n_components + 1,
+                        workflow_molecules=workflow_molecules,
+                        dataset=dataset,
+                    )
+        finally:
+            # only close the pool if we made it
+            if pool is not None and pool is not executor:
+                pool.shutdown()
+            if cache is not None:
+                cache.evict()
+
+        return workflow_molecules
+
+    @staticmethod
+    def _record_filtered(dataset: BasicDataset, result: ComponentResult) -> None:
+        """
+        Record the molecules filtered by a workflow component in the dataset.
+        """
+        dataset.filter_molecules(
+            molecules=result.filtered,
+            component_name=result.component_name,
+            component_description=result.component_description,
+            component_provenance=result.component_provenance,
+            reasons=[
+                result.get_filter_reason(molecule) for molecule in result.filtered
+            ],
+        )
+
+    def _run_workflow_branches(
+        self,
+        workflow_molecules: ComponentResult,
+        dataset: BasicDataset,
+        pool: Optional[WorkflowExecutor] = None,
+        processors: Optional[int] = None,
+        verbose: bool = True,
+        schedule: str = "input",
+        cache: Optional[ResultCache] = None,
+    ) -> ComponentResult:
+        """
+        Run the molecules which passed the main workflow through every branch and combine the molecules which pass each
+        branch, molecules made by more than one branch are de-duplicated with their conformers merged.
+
+        When a pool is running and every branch component can be ran in parallel the branches are ran at the same time,
+        each chunk of molecules flows through every branch inside one worker. Otherwise the branches are ran one after
+        another and each component uses the pool on its own.
+
+        Parameters:
+            workflow_molecules: The result of the main workflow.
+            dataset: The dataset which the filtered molecules should be recorded in.
+            pool: The running executor shared by the workflow or `None` when running serially.
+            processors: The number of processors available to the workflow.
+            verbose: If True a progress bar for the branches will be shown.
+            schedule: The order the molecules are sent to the workers when the branches are ran one after another.
+            cache: The cache of results for single molecules which each component should use.
+
+        Returns:
+            A component result holding the combined molecules of every branch.
+        """
+        branches = [list(branch.values()) for branch in self.workflow_branches.values()]
+        combined = ComponentResult(
+            component_name="WorkflowBranches",
+            component_description={
+                "component_description": "Combine the molecules from each branch of the workflow.",
+                "branches": ",".join(self.workflow_branches.keys()),
+            },
+            component_provenance=self.provenance(),
+            hash_method=self.hash_method,
+        )
+
+        # the branches are ran together only when no molecules are handed on from a
+        # component whose merged result must be finalized first
+        if pool is not None and all(
+            component._properties.process_parallel
+            and (component is branch[-1] or not component._finalizes_result())
+            for branch in branches
+            for component in branch
+        ):
+            results = [
+                [component._create_result() for component in branch]
+                for branch in branches
+            ]
+            molecules = workflow_molecules.molecules
+            chunk_size = CustomWorkflowComponent._get_chunk_size(
+                n_molecules=len(molecules),
+                n_workers=pool.get_max_workers(
+                    [component for branch in branches for component in branch]
+                ),
+            )
+            with tqdm.tqdm(
+                total=len(molecules),
+                ncols=80,
+                desc="{:30s}".format("WorkflowBranches"),
+                disable=not verbose,
+            ) as progress:
+                for work in pool.apply_branches(
+                    branches=branches,
+                    molecules=molecules,
+                    chunk_size=chunk_size,
+                    cache=cache,
+                ):
+                    for branch_results, branch_work in zip(results, work):
+                        for result, stage_work in zip(branch_results, branch_work):
+                            result.update(stage_work)
+                    progress.update(min(chunk_size, progress.total - progress.n))
+
+            for branch, branch_results in zip(branches, results):
+                for component, result in zip(branch, branch_results):
+                    pool.finalize_component(component, result)
+
+        else:
+            results = []
+            for branch in branches:
+                # each branch works on its own copy of the molecules
+                molecules = [
+                    off.Molecule(molecule) for molecule in workflow_molecules.molecules
+                ]
+                branch_results = []
+                for component in branch:
+                    result = component.apply(
+                        molecules=molecules,
+                        processors=processors,
+                        verbose=verbose,
+                        executor=pool,
+                        schedule=schedule,
+                        cache=cache,
+                    )
+                    molecules = result.molecules
+                    branch_results.append(result)
+                results.append(branch_results)
+
+        for branch_results in results:
+            for result in branch_results:
+                self._record_filtered(dataset=dataset, result=result)
+            for molecule in branch_results[-1].molecules:
+                combined.add_molecule(molecule)
+
+        return combined
+
+    def _iter_workflow_results(
+        self,
+        molecules: Union[str, List[off.Molecule], off.Molecule],
+        dataset: BasicDataset,
+        batch_size: Optional[int] = None,
+        processors: Optional[int] = None,
+        verbose: bool = True,
+        fuse_components: bool = False,
+        executor: Optional[Union[str, WorkflowExecutor]] = None,
+        schedule: str = "input",
+        cache: Optional[Union[str, ResultCache]] = None,
+        checkpoint_directory: Optional[str] = None,
+        components: Optional[List[CustomWorkflowComponent]] = None,
+    ) -> Iterator[ComponentResult]:
+        """
+        Run the input molecules through the workflow, in one go or streamed in batches which are read lazily from the
+        input so that only one batch is held in memory at a time.
+
+        Parameters:
+            molecules: The input molecules, a molecule file or a directory of molecule files.
+            dataset: The dataset which the filtered molecules should be recorded in.
+            batch_size: The number of input molecules in each batch, None will run all of the molecules at once.
+            processors: The number of processors available to the workflow, None will use all cores.
+            verbose: If True a progress bar for each workflow component will be shown.
+            fuse_components: If runs of components which do not produce duplicates should be fused.
+            executor: The executor type or a running executor which should be used for the workflow.
+            schedule: The order the molecules are sent to the workers, `input` or `lpt` for largest first.
+            cache: The cache or the directory of the cache of results for single molecules.
+            checkpoint_directory: The directory the progress of the workflow is saved in, when streaming only the
+                result of each molecule is saved so a rerun quickly skips over the finished batches.
+            components: The workflow components in the order they should be executed, None will use the order of the
+                workflow.
+
+        Returns:
+            An iterator over the result of the final workflow component for each batch.
+        """
+        if batch_size is None:
+            yield self._run_workflow(
+                workflow_molecules=self._create_initial_component_result(
+                    molecules=molecules, processors=processors
+                ),
+                dataset=dataset,
+                processors=processors,
+                verbose=verbose,
+                fuse_components=fuse_components,
+                executor=executor,
+                schedule=schedule,
+                cache=cache,
+                checkpoint_directory=checkpoint_directory,
+                components=components,
+            )
+            return
+
+        if isinstance(cache, str):
+            cache = ResultCache(directory=cache)
+        elif cache is None and checkpoint_directory is not None:
+            cache = ResultCache(
+                directory=os.path.join(checkpoint_directory, "results"), max_size=None
+            )
+
+        # keep one pool for every batch
+        pool = self._create_executor(processors=processors, executor=executor)
+        try:
+            for batch in iter_molecule_batches(molecules, batch_size=batch_size):
+                yield self._run_workflow(
+                    workflow_molecules=self._create_initial_component_result(
+                        molecules=batch
+                    ),
+                    dataset=dataset,
+                    processors=processors,
+                    verbose=verbose,
+                    fuse_components=fuse_components,
+                    executor=pool or executor,
+                    schedule=schedule,
+                    cache=cache,
+                    components=components,
+                )
+        finally:
+            if pool is not None and pool is not executor:
+                pool.shutdown()
+
+    def _iter_dataset_entries(
+        self,
+        molecules: List[off.Molecule],
+        provenance: Dict[str, str],
+        pool: Optional[WorkflowExecutor] = None,
+        verbose: bool = True,
+        entry_function: Callable = _create_dataset_entries,
+    ) -> Iterator[Tuple[off.Molecule, Any]]:
+        """
+        Make the dataset entry of each molecule which passed the workflow, using the workers when a pool is given. The
+        entries are given back in the order of the molecules so the dataset is the same however it is built.
+
+        Parameters:
+            molecules: The molecules which passed the workflow.
+            provenance: The provenance of the factory.
+            pool: The executor whose workers should make the entries, None will make them in this process as will a
+                pool which has not been started when there are only a few molecules.
+            verbose: If True a progress bar will be shown.
+            entry_function: The module level function which makes the entries of a chunk of molecules given this
+                factory and its provenance.
+
+        Returns:
+            An iterator over each molecule and its entry, the entry is `None` when it could not be made and the
+            molecule should be added in the usual way so that the reason is recorded.
+        """
+        from functools import partial
+
+        # the workflow is not needed to make the entries
+        factory = self.copy(update={"workflow": {}, "workflow_branches": {}})
+        create_entries = partial(entry_function, factory=factory, provenance=provenance)
+
+        with tqdm.tqdm(
+            total=len(molecules),
+            ncols=80,
+            desc="{:30s}".format("Preparation"),
+            disable=not verbose,
+        ) as progress:
+            # starting the workers is not worth it for a few molecules
+            if pool is None or (not pool.is_running and len(molecules) < 100):
+                for molecule in molecules:
+                    progress.update(1)
+                    yield molecule, create_entries([molecule])[0]
+                return
+
+            chunk_size = CustomWorkflowComponent._get_chunk_size(
+                n_molecules=len(molecules), n_workers=pool.n_workers
+            )
+            # hold entries which finish early until the molecules before them are done
+            finished, next_position = {}, 0
+            for position, entry in pool.map_molecules(
+                create_entries, molecules=molecules, chunk_size=chunk_size
+            ):
+                finished[position] = entry
+                while next_position in finished:
+                    progress.update(1)
+                    yield molecules[next_position], finished.pop(next_position)
+                    next_position += 1
+
+    @staticmethod
+    def _add_dataset_entry(
+        dataset: BasicDataset,
+        merge_duplicates: bool = False,
+        entry: Optional[DatasetEntry] = None,
+        **kwargs,
+    ) -> None:
+        """
+        Add a molecule to the dataset, when streaming a molecule may already have been added by an earlier batch in
+        which case the conformers of both entries are kept.
+
+        Parameters:
+            dataset: The dataset the molecule should be added to.
+            merge_duplicates: If an entry with the same index should be merged rather than replaced.
+            entry: An entry which has already been made for the molecule, if this is not given the entry is made from
+                the arguments of `add_molecule`.
+            kwargs: The arguments of the `add_molecule` method of the dataset.
+        """
+        index = entry.index if entry is not None else kwargs["index"]
+        previous = dataset.dataset.get(index, None)
+        if entry is not None:
+            dataset.add_entry(entry)
+        else:
+            dataset.add_molecule(**kwargs)
+        current = dataset.dataset.get(index, None)
+        if not merge_duplicates or previous is None or current is previous:
+            return
+
+        if (
+            previous.attributes.canonical_isomeric_explicit_hydrogen_mapped_smiles
+            == current.attributes.canonical_isomeric_explicit_hydrogen_mapped_smiles
+        ):
+            # the atoms are in the same order so the geometries can be compared directly
+            new_conformers = current.initial_molecules
+        else:
+            _, atom_map = off.Molecule.are_isomorphic(
+                current.get_off_molecule(include_conformers=False),
+                previous.get_off_molecule(include_conformers=False),
+                return_atom_map=True,
+            )
+            mapped_mol = current.get_off_molecule(include_conformers=True).remap(
+                mapping_dict=atom_map, current_to_new=True
+            )
+            new_conformers = [
+                mapped_mol.to_qcschema(
+                    conformer=i, extras=previous.initial_molecules[0].extras
+                )
+                for i in range(mapped_mol.n_conformers)
+            ]
+
+        for conformer in new_conformers:
+            if conformer not in previous.initial_molecules:
+                previous.initial_molecules.append(conformer)
+        dataset.dataset[previous.index] = previous
+
     def create_dataset(
         self,
         dataset_name: str,
@@ -415,6 +1668,13 @@ class BasicDatasetFactory(CommonBase):
         metadata: Optional[Metadata] = None,
         processors: Optional[int] = None,
         verbose: bool = True,
+        fuse_components: bool = False,
+        executor: Optional[Union[str, WorkflowExecutor]] = None,
+        schedule: str = "input",
+        cache: Optional[Union[str, ResultCache]] = None,
+        checkpoint_directory: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        plan_workflow: bool = False,
     ) -> BasicDataset:
         """
         Process the input molecules through the given workflow then create and populate the dataset class which acts as
@@ -431,6 +1691,28 @@ class BasicDatasetFactory(CommonBase):
                 after making the dataset.
             processors: The number of processors avilable to the workflow, note None will use all avilable processors.
             verbose: If True a progress bar for each workflow component will be shown.
+            fuse_components: If runs of workflow components which do not produce duplicates should be fused so each
+                molecule flows through the whole run inside one worker, de-duplication then only happens in front of
+                components which need it.
+            executor: The executor used to run the workflow, either the name of an executor type `serial`, `threads`,
+                `processes` or `dask`, or a running [WorkflowExecutor][qcsubmit.executors.WorkflowExecutor] which is
+                left running afterwards. None will use a pool of processes.
+            schedule: The order the molecules are sent to the workers, `input` keeps the input order while `lpt` sends
+                the most expensive molecules first by their estimated cost to cut the time spent waiting on the last
+                large molecules.
+            cache: A [ResultCache][qcsubmit.cache.ResultCache] or the directory of one, the result of each component
+                for each molecule is stored so rerunning the workflow with unchanged components only processes new
+                molecules.
+            checkpoint_directory: A directory the progress of the workflow is saved in after each component, along
+                with the result of each molecule as it finishes. A rerun with the same factory settings and molecules
+                resumes from the last saved point, remove the directory to start again from scratch.
+            batch_size: Stream the input through the workflow in batches of this many molecules, files are read lazily
+                so inputs larger than memory can be used. Molecules are de-duplicated within each batch and entries
+                for the same molecule from different batches are merged in the dataset. None will load and run all of
+                the molecules at once.
+            plan_workflow: If the workflow should be reordered before it is ran so that cheap and selective filters
+                run before expensive components, see `get_workflow_plan`. The order used is recorded in the dataset
+                provenance.
 
         Example:
             How to make a dataset from a list of molecules
@@ -458,71 +1740,99 @@ class BasicDatasetFactory(CommonBase):
         """
         # TODO set up a logging system to report the components
 
-        #  create an initial component result
-
-        workflow_molecules = self._create_initial_component_result(molecules=molecules)
+        # the provenance is the same for every molecule so only build it once
+        provenance = self.provenance()
+        self._set_hash_method()
 
         # create the dataset
         # first we need to instance the dataset and assign the metadata
-        object_meta = self.dict(exclude={"workflow"})
+        object_meta = self.dict(
+            exclude={"workflow", "workflow_branches", "hash_method"}
+        )
 
         # the only data missing is the collection name so add it here.
         object_meta["dataset_name"] = dataset_name
         object_meta["description"] = description
-        object_meta["provenance"] = self.provenance()
+        object_meta["provenance"] = provenance
+        components = None
+        if plan_workflow and self.workflow:
+            components = self._get_planned_components(molecules=molecules)
+            object_meta["provenance"] = dict(
+                provenance,
+                workflow_order=",".join(
+                    component.component_name for component in components
+                ),
+            )
         object_meta["dataset_tagline"] = tagline
         if metadata is not None:
             object_meta["metadata"] = metadata.dict()
         dataset = self._dataset_type.parse_obj(object_meta)
 
-        # if the workflow has components run it
-        if self.workflow:
-            for component in self.workflow.values():
-                workflow_molecules = component.apply(
+        # get a molecular complex filter
+        molecular_complex = self._get_molecular_complex_info(provenance=provenance)
+
+        # the workers are shared by the workflow and the preparation of the entries
+        pool = self._create_executor(
+            processors=processors, executor=executor, preparation=True
+        )
+        try:
+            # if the workflow has components run it, one batch at a time when streaming
+            for workflow_molecules in self._iter_workflow_results(
+                molecules=molecules,
+                dataset=dataset,
+                batch_size=batch_size,
+                processors=processors,
+                verbose=verbose,
+                fuse_components=fuse_components,
+                executor=pool or executor,
+                schedule=schedule,
+                cache=cache,
+                checkpoint_directory=checkpoint_directory,
+                components=components,
+            ):
+
+                # now make the entries in the workers and add them in order
+                for molecule, entry in self._iter_dataset_entries(
                     molecules=workflow_molecules.molecules,
-                    processors=processors,
+                    provenance=provenance,
+                    pool=pool,
                     verbose=verbose,
-                )
-
-                dataset.filter_molecules(
-                    molecules=workflow_molecules.filtered,
-                    component_name=workflow_molecules.component_name,
-                    component_description=workflow_molecules.component_description,
-                    component_provenance=workflow_molecules.component_provenance,
-                )
-
-        # get a molecular complex filter
-        molecular_complex = self._get_molecular_complex_info()
+                ):
+                    if entry is not None:
+                        self._add_dataset_entry(
+                            dataset,
+                            merge_duplicates=batch_size is not None,
+                            entry=entry,
+                        )
+                        continue
 
-        # now add the molecules to the correct attributes
-        for molecule in tqdm.tqdm(
-            workflow_molecules.molecules,
-            total=len(workflow_molecules.molecules),
-            ncols=80,
-            desc="{:30s}".format("Preparation"),
-            disable=not verbose,
-        ):
-            # order the molecule
-            order_mol = molecule.canonical_order_atoms()
-            attributes = self.create_cmiles_metadata(molecule=order_mol)
-            attributes.provenance = self.provenance()
+                    # the entry could not be made so add it the usual way to find out why
+                    order_mol = molecule.canonical_order_atoms()
+                    attributes = self.create_cmiles_metadata(molecule=order_mol)
+                    attributes.provenance = dict(provenance)
 
-            # always put the cmiles in the extras from what we have just calculated to ensure correct order
-            extras = molecule.properties.get("extras", {})
+                    # always put the cmiles in the extras from what we have just calculated to ensure correct order
+                    extras = molecule.properties.get("extras", {})
 
-            keywords = molecule.properties.get("keywords", None)
+                    keywords = molecule.properties.get("keywords", None)
 
-            # now submit the molecule
-            try:
-                dataset.add_molecule(
-                    index=self.create_index(molecule=order_mol),
-                    molecule=order_mol,
-                    attributes=attributes,
-                    extras=extras if bool(extras) else None,
-                    keywords=keywords,
-                )
-            except MolecularComplexError:
-                molecular_complex["molecules"].append(molecule)
+                    # now submit the molecule
+                    try:
+                        self._add_dataset_entry(
+                            dataset,
+                            merge_duplicates=batch_size is not None,
+                            index=self.create_index(molecule=order_mol),
+                            molecule=order_mol,
+                            attributes=attributes,
+                            extras=extras if bool(extras) else None,
+                            keywords=keywords,
+                        )
+                    except MolecularComplexError:
+                        molecular_complex["molecules"].append(molecule)
+        finally:
+            # only close the pool if we made it
+            if pool is not None and pool is not executor:
+                pool.shutdown()
 
         # add the complexes if there are any
         if molecular_complex["molecules"]:
@@ -551,29 +1861,12 @@ class BasicDatasetFactory(CommonBase):
             - `molecular_formula`
             - `standard_inchi`
             - `inchi_key`
-        """
 
-        cmiles = {
-            "canonical_smiles": molecule.to_smiles(
-                isomeric=False, explicit_hydrogens=False, mapped=False
-            ),
-            "canonical_isomeric_smiles": molecule.to_smiles(
-                isomeric=True, explicit_hydrogens=False, mapped=False
-            ),
-            "canonical_explicit_hydrogen_smiles": molecule.to_smiles(
-                isomeric=False, explicit_hydrogens=True, mapped=False
-            ),
-            "canonical_isomeric_explicit_hydrogen_smiles": molecule.to_smiles(
-                isomeric=True, explicit_hydrogens=True, mapped=False
-            ),
-            "canonical_isomeric_explicit_hydrogen_mapped_smiles": molecule.to_smiles(
-                isomeric=True, explicit_hydrogens=True, mapped=True
-            ),
-            "molecular_formula": molecule.hill_formula,
-            "standard_inchi": molecule.to_inchi(fixed_hydrogens=False),
-            "inchi_key": molecule.to_inchikey(fixed_hydrogens=False),
-        }
+            The mapped smiles follows any `atom_map` property of the molecule, see `get_cmiles` in `qcsubmit.utils`.
+        """
 
+        # make every identifier from a single conversion to the backend toolkit
+        cmiles = get_cmiles(molecule)
         return MoleculeAttributes(**cmiles)
 
     def create_index(self, molecule: off.Molecule) -> str:
@@ -730,6 +2023,13 @@ class TorsiondriveDatasetFactory(OptimizationDatasetFactory):
         metadata: Optional[Metadata] = None,
         processors: Optional[int] = None,
         verbose: bool = True,
+        fuse_components: bool = False,
+        executor: Optional[Union[str, WorkflowExecutor]] = None,
+        schedule: str = "input",
+        cache: Optional[Union[str, ResultCache]] = None,
+        checkpoint_directory: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        plan_workflow: bool = False,
     ) -> TorsiondriveDataset:
         """
         Process the input molecules through the given workflow then create and populate the torsiondrive
@@ -755,14 +2055,36 @@ class TorsiondriveDatasetFactory(OptimizationDatasetFactory):
                 after making the dataset.
             processors: The number of processors avilable to the workflow, note None will use all avilable processors.
             verbose: If True a progress bar for each workflow component will be shown.
+            fuse_components: If runs of workflow components which do not produce duplicates should be fused so each
+                molecule flows through the whole run inside one worker, de-duplication then only happens in front of
+                components which need it.
+            executor: The executor used to run the workflow, either the name of an executor type `serial`, `threads`,
+                `processes` or `dask`, or a running [WorkflowExecutor][qcsubmit.executors.WorkflowExecutor] which is
+                left running afterwards. None will use a pool of processes.
+            schedule: The order the molecules are sent to the workers, `input` keeps the input order while `lpt` sends
+                the most expensive molecules first by their estimated cost to cut the time spent waiting on the last
+                large molecules.
+            cache: A [ResultCache][qcsubmit.cache.ResultCache] or the directory of one, the result of each component
+                for each molecule is stored so rerunning the workflow with unchanged components only processes new
+                molecules.
+            checkpoint_directory: A directory the progress of the workflow is saved in after each component, along
+                with the result of each molecule as it finishes. A rerun with the same factory settings and molecules
+                resumes from the last saved point, remove the directory to start again from scratch.
+            batch_size: Stream the input through the workflow in batches of this many molecules, files are read lazily
+                so inputs larger than memory can be used. Molecules are de-duplicated within each batch and entries
+                for the same molecule from different batches are merged in the dataset. None will load and run all of
+                the molecules at once.
+            plan_workflow: If the workflow should be reordered before it is ran so that cheap and selective filters
+                run before expensive components, see `get_workflow_plan`. The order used is recorded in the dataset
+                provenance.
 
         Returns:
             A [DataSet][qcsubmit.datasets.TorsiondriveDataset] instance populated with the molecules that have passed
             through the workflow.
         """
 
-        # create the initial component result
-        workflow_molecules = self._create_initial_component_result(molecules=molecules)
+        # the provenance is the same for every filter so only build it once
+        provenance = self.provenance()
 
         # catch any linear torsions here
         linear_torsions = {
@@ -770,7 +2092,7 @@ class TorsiondriveDatasetFactory(OptimizationDatasetFactory):
             "component_description": {
                 "component_description": "Remove any molecules with a linear torsions selected to drive.",
             },
-            "component_provenance": self.provenance(),
+            "component_provenance": provenance,
             "molecules": [],
         }
 
@@ -779,111 +2101,94 @@ class TorsiondriveDatasetFactory(OptimizationDatasetFactory):
             "component_description": {
                 "component_description": "Remove any molecules with unconnected torsion indices highlighted to drive.",
             },
-            "component_provenance": self.provenance(),
+            "component_provenance": provenance,
             "molecules": [],
         }
 
-        molecular_complex = self._get_molecular_complex_info()
+        molecular_complex = self._get_molecular_complex_info(provenance=provenance)
+        self._set_hash_method()
 
         # first we need to instance the dataset and assign the metadata
-        object_meta = self.dict(exclude={"workflow"})
+        object_meta = self.dict(
+            exclude={"workflow", "workflow_branches", "hash_method"}
+        )
 
         # the only data missing is the collection name so add it here.
         object_meta["dataset_name"] = dataset_name
         object_meta["description"] = description
-        object_meta["provenance"] = self.provenance()
+        object_meta["provenance"] = provenance
+        components = None
+        if plan_workflow and self.workflow:
+            components = self._get_planned_components(molecules=molecules)
+            object_meta["provenance"] = dict(
+                provenance,
+                workflow_order=",".join(
+                    component.component_name for component in components
+                ),
+            )
         object_meta["dataset_tagline"] = tagline
         if metadata is not None:
             object_meta["metadata"] = metadata.dict()
         dataset = self._dataset_type(**object_meta)
 
-        # if the workflow has components run it
-        if self.workflow:
-            for component_name, component in self.workflow.items():
-                workflow_molecules = component.apply(
+        # molecules with torsions which can not be driven are recorded against the error raised
+        failures = {
+            DihedralConnectionError: unconnected_torsions["molecules"],
+            LinearTorsionError: linear_torsions["molecules"],
+            MolecularComplexError: molecular_complex["molecules"],
+        }
+
+        # the workers are shared by the workflow and the preparation of the entries
+        pool = self._create_executor(
+            processors=processors, executor=executor, preparation=True
+        )
+        try:
+            # if the workflow has components run it, one batch at a time when streaming
+            for workflow_molecules in self._iter_workflow_results(
+                molecules=molecules,
+                dataset=dataset,
+                batch_size=batch_size,
+                processors=processors,
+                verbose=verbose,
+                fuse_components=fuse_components,
+                executor=pool or executor,
+                schedule=schedule,
+                cache=cache,
+                checkpoint_directory=checkpoint_directory,
+                components=components,
+            ):
+
+                # now make the entries of every torsion in the workers and add them in order
+                for molecule, torsion_entries in self._iter_dataset_entries(
                     molecules=workflow_molecules.molecules,
-                    processors=processors,
+                    provenance=provenance,
+                    pool=pool,
                     verbose=verbose,
-                )
-
-                dataset.filter_molecules(
-                    molecules=workflow_molecules.filtered,
-                    component_name=workflow_molecules.component_name,
-                    component_description=workflow_molecules.component_description,
-                    component_provenance=workflow_molecules.component_provenance,
-                )
-
-        # now add the molecules to the correct attributes
-        for molecule in tqdm.tqdm(
-            workflow_molecules.molecules,
-            total=len(workflow_molecules.molecules),
-            ncols=80,
-            desc="{:30s}".format("Preparation"),
-            disable=not verbose,
-        ):
-            # check for extras and keywords
-            extras = molecule.properties.get("extras", {})
-            keywords = molecule.properties.get("keywords", {})
-
-            # make the general attributes
-            attributes = self.create_cmiles_metadata(molecule=molecule)
-            # attributes = cmiles.get_molecule_ids(molecule)
-
-            # now check for the dihedrals
-            if "dihedrals" in molecule.properties:
-                # first do 1-D torsions
-                for dihedral in molecule.properties["dihedrals"].get_dihedrals:
-                    # create the index
-                    molecule.properties["atom_map"] = dihedral.get_atom_map
-                    index = self.create_index(molecule=molecule)
-                    del molecule.properties["atom_map"]
-                    # get the dihedrals to scan
-                    dihedrals = dihedral.get_dihedrals
-
-                    keywords["dihedral_ranges"] = dihedral.get_scan_range
-                    try:
-                        dataset.add_molecule(
-                            index=index,
+                    entry_function=_create_torsiondrive_entries,
+                ):
+                    if torsion_entries is None:
+                        # the entries could not be made so add them the usual way to find out why
+                        self._add_molecule_torsions(
+                            dataset,
                             molecule=molecule,
-                            attributes=attributes,
-                            dihedrals=dihedrals,
-                            keywords=keywords,
-                            extras=extras,
+                            merge_duplicates=batch_size is not None,
+                            failures=failures,
                         )
-                    except DihedralConnectionError:
-                        unconnected_torsions["molecules"].append(molecule)
-                    except LinearTorsionError:
-                        linear_torsions["molecules"].append(molecule)
-                    except MolecularComplexError:
-                        molecular_complex["molecules"].append(molecule)
-
-            else:
-                # the molecule has not had its atoms identified yet so process them here
-                # order the molecule
-                order_mol = molecule.canonical_order_atoms()
-                rotatble_bonds = order_mol.find_rotatable_bonds()
-                attributes = self.create_cmiles_metadata(molecule=order_mol)
-                for bond in rotatble_bonds:
-                    # create a torsion to hold as fixed using non-hydrogen atoms
-                    torsion_index = self._get_torsion_string(bond)
-                    order_mol.properties["atom_map"] = dict(
-                        (atom, index) for index, atom in enumerate(torsion_index)
-                    )
-                    try:
-                        dataset.add_molecule(
-                            index=self.create_index(molecule=order_mol),
-                            molecule=order_mol,
-                            attributes=attributes,
-                            dihedrals=[torsion_index],
-                            extras=extras,
-                            keywords=keywords,
-                        )
-                    except DihedralConnectionError:
-                        unconnected_torsions["molecules"].append(molecule)
-                    except LinearTorsionError:
-                        linear_torsions["molecules"].append(molecule)
-                    except MolecularComplexError:
-                        molecular_complex["molecules"].append(molecule)
+                        continue
+
+                    for entry in torsion_entries:
+                        if isinstance(entry, type):
+                            failures[entry].append(molecule)
+                        else:
+                            self._add_dataset_entry(
+                                dataset,
+                                merge_duplicates=batch_size is not None,
+                                entry=entry,
+                            )
+        finally:
+            # only close the pool if we made it
+            if pool is not None and pool is not executor:
+                pool.shutdown()
 
         # now we need to filter the linear molecules
         dataset.filter_molecules(**linear_torsions)
@@ -895,6 +2200,90 @@ class TorsiondriveDatasetFactory(OptimizationDatasetFactory):
 
         return dataset
 
+    def _add_molecule_torsions(
+        self,
+        dataset: TorsiondriveDataset,
+        molecule: off.Molecule,
+        merge_duplicates: bool,
+        failures: Dict[type, List[off.Molecule]],
+    ) -> None:
+        """
+        Add an entry for each torsion of the molecule to the dataset in this process, the torsions are either those
+        tagged on the molecule or one for each rotatable bond.
+
+        Parameters:
+            dataset: The dataset the entries should be added to.
+            molecule: The molecule whose torsions should be added.
+            merge_duplicates: If entries with the same index should be merged rather than replaced.
+            failures: The molecules which failed for each type of torsion error, this is updated with the molecule for
+                each torsion which could not be added.
+        """
+        # check for extras and keywords
+        extras = molecule.properties.get("extras", {})
+        keywords = molecule.properties.get("keywords", {})
+
+        # now check for the dihedrals
+        if "dihedrals" in molecule.properties:
+            # make the general attributes
+            attributes = self.create_cmiles_metadata(molecule=molecule)
+            # first do 1-D torsions
+            for dihedral in molecule.properties["dihedrals"].get_dihedrals:
+                # create the index
+                molecule.properties["atom_map"] = dihedral.get_atom_map
+                index = self.create_index(molecule=molecule)
+                del molecule.properties["atom_map"]
+                # get the dihedrals to scan
+                dihedrals = dihedral.get_dihedrals
+
+                keywords["dihedral_ranges"] = dihedral.get_scan_range
+                try:
+                    self._add_dataset_entry(
+                        dataset,
+                        merge_duplicates=merge_duplicates,
+                        index=index,
+                        molecule=molecule,
+                        attributes=attributes,
+                        dihedrals=dihedrals,
+                        keywords=keywords,
+                        extras=extras,
+                    )
+                except (
+                    DihedralConnectionError,
+                    LinearTorsionError,
+                    MolecularComplexError,
+                ) as error:
+                    failures[type(error)].append(molecule)
+
+        else:
+            # the molecule has not had its atoms identified yet so process them here
+            # order the molecule
+            order_mol = molecule.canonical_order_atoms()
+            rotatble_bonds = order_mol.find_rotatable_bonds()
+            attributes = self.create_cmiles_metadata(molecule=order_mol)
+            for bond in rotatble_bonds:
+                # create a torsion to hold as fixed using non-hydrogen atoms
+                torsion_index = self._get_torsion_string(bond)
+                order_mol.properties["atom_map"] = dict(
+                    (atom, index) for index, atom in enumerate(torsion_index)
+                )
+                try:
+                    self._add_dataset_entry(
+                        dataset,
+                        merge_duplicates=merge_duplicates,
+                        index=self.create_index(molecule=order_mol),
+                        molecule=order_mol,
+                        attributes=attributes,
+                        dihedrals=[torsion_index],
+                        extras=extras,
+                        keywords=keywords,
+                    )
+                except (
+                    DihedralConnectionError,
+                    LinearTorsionError,
+                    MolecularComplexError,
+                ) as error:
+                    failures[type(error)].append(molecule)
+
     def _get_torsion_string(self, bond: off.Bond) -> Tuple[int, int, int, int]:
         """
         Create a torsion tuple which will be restrained in the torsiondrive.
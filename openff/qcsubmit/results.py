@@ -16,10 +16,46 @@ from qcportal.models import OptimizationRecord, ResultRecord
 from qcportal.models.common_models import DriverEnum
 from simtk import unit
 
-from openff.qcsubmit.common_structures import IndexCleaner, Metadata, ResultsConfig
+from openff.qcsubmit.common_structures import (
+    IndexCleaner,
+    Metadata,
+    MoleculeAttributes,
+    ResultsConfig,
+)
 from openff.qcsubmit.exceptions import UnsupportedFiletypeError
 from openff.qcsubmit.procedures import GeometricProcedure
 from openff.qcsubmit.serializers import deserialize, serialize
+from openff.qcsubmit.utils import get_bulk_cmiles
+
+
+def _get_dataset_attributes(
+    results: Dict[str, Union["BasicResult", "TorsionDriveResult"]]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Get the attributes each result should be added to a new dataset with. Results from older collections can be
+    missing some of the cmiles identifiers, these are made in this process from the mapped smiles of the results using
+    the shared identifier cache, so each molecule is only converted once. The stored identifiers are kept as they
+    match the archive records.
+
+    Parameters:
+        results: The results of the collection keyed by their index.
+
+    Returns:
+        The attributes of each result keyed by its index.
+    """
+    required = set(MoleculeAttributes.__fields__)
+    attributes = {index: dict(result.attributes) for index, result in results.items()}
+    incomplete = [
+        index
+        for index, result_attributes in attributes.items()
+        if not required.issubset(result_attributes)
+        and "canonical_isomeric_explicit_hydrogen_mapped_smiles" in result_attributes
+    ]
+    cmiles = get_bulk_cmiles([results[index].molecule for index in incomplete])
+    for index, identifiers in zip(incomplete, cmiles):
+        attributes[index] = dict(identifiers, **attributes[index])
+
+    return attributes
 
 
 class SingleResult(ResultsConfig):
@@ -1001,12 +1037,13 @@ class OptimizationCollectionResult(BasicCollectionResult):
             spec_description=self.spec_description,
         )
 
+        attributes = _get_dataset_attributes(self.collection)
         for common_index, entries in self.collection.items():
             for result in entries.entries:
                 dataset.add_molecule(
                     index=result.index,
                     molecule=result.get_final_molecule(),
-                    attributes=entries.attributes,
+                    attributes=attributes[common_index],
                     keywords=result.keywords,
                 )
 
@@ -1068,12 +1105,13 @@ class OptimizationCollectionResult(BasicCollectionResult):
         )
 
         # now we need to add the molecules
+        attributes = _get_dataset_attributes(self.collection)
         for common_index, entries in self.collection.items():
             for result in entries.entries:
                 dataset.add_molecule(
                     index=result.index,
                     molecule=result.get_final_molecule(),
-                    attributes=entries.attributes,
+                    attributes=attributes[common_index],
                     keywords=result.keywords,
                 )
 
@@ -1525,10 +1563,11 @@ class TorsionDriveCollectionResult(OptimizationCollectionResult):
             spec_description=self.spec_description,
         )
         # now we need to fill the dataset
-        for result in self.collection.values():
-            attributes = result.attributes
+        dataset_attributes = _get_dataset_attributes(self.collection)
+        for name, result in self.collection.items():
+            attributes = dataset_attributes[name]
             # now we need to add a new optimization for each of the geometries in the torsiondrive
-            index = result.attributes["canonical_isomeric_smiles"]
+            index = attributes["canonical_isomeric_smiles"]
             for i, optimization in enumerate(result.optimization.values()):
                 dataset.add_molecule(
                     index=index + f"_{i}",
@@ -1596,11 +1635,12 @@ class TorsionDriveCollectionResult(OptimizationCollectionResult):
         )
 
         # now we need to fill the dataset
-        for result in self.collection.values():
+        attributes = _get_dataset_attributes(self.collection)
+        for name, result in self.collection.items():
             dataset.add_molecule(
-                index=result.attributes["canonical_isomeric_smiles"],
+                index=attributes[name]["canonical_isomeric_smiles"],
                 molecule=result.get_torsiondrive(),
-                attributes=result.attributes,
+                attributes=attributes[name],
             )
 
         return dataset
@@ -1661,13 +1701,14 @@ class TorsionDriveCollectionResult(OptimizationCollectionResult):
         )
 
         # now we need to fill in the dataset data
+        attributes = _get_dataset_attributes(self.collection)
         for index, result in self.collection.items():
             # get the torsion drive trajectory onto the molecule
             tdrive_mol = result.get_torsiondrive()
             dataset.add_molecule(
                 index=index,
                 molecule=tdrive_mol,
-                attributes=result.attributes,
+                attributes=attributes[index],
                 dihedrals=result.dihedrals,
             )
         return dataset
@@ -0,0 +1,148 @@
+"""
+Tests for the on-disk cache of workflow component results.
+"""
+import os
+
+import numpy as np
+import pytest
+from openforcefield.topology import Molecule
+from simtk import unit
+
+from openff.qcsubmit.cache import ResultCache
+from openff.qcsubmit.common_structures import TorsionIndexer
+from openff.qcsubmit.testing import temp_directory
+from openff.qcsubmit.workflow_components import MolecularWeightFilter
+
+
+def test_molecule_key():
+    """
+    Make sure the molecule key only changes when the input to a component would change.
+    """
+
+    molecule = Molecule.from_smiles("CCO")
+    key = ResultCache.get_molecule_key(molecule)
+    assert key == ResultCache.get_molecule_key(Molecule.from_smiles("CCO"))
+    assert key != ResultCache.get_molecule_key(Molecule.from_smiles("CCN"))
+
+    molecule.add_conformer(np.zeros((molecule.n_atoms, 3)) * unit.angstrom)
+    conformer_key = ResultCache.get_molecule_key(molecule)
+    assert conformer_key != key
+
+    indexer = TorsionIndexer()
+    indexer.add_torsion(torsion=(0, 1, 2, 8), scan_range=None)
+    molecule.properties["dihedrals"] = indexer
+    assert ResultCache.get_molecule_key(molecule) != conformer_key
+
+
+def test_component_key():
+    """
+    Make sure the component key changes with the settings and provenance of the component.
+    """
+
+    weight = MolecularWeightFilter()
+    key = ResultCache.get_component_key(weight.dict(), weight.provenance())
+    assert key == ResultCache.get_component_key(weight.dict(), weight.provenance())
+
+    weight.maximum_weight = 100
+    assert key != ResultCache.get_component_key(weight.dict(), weight.provenance())
+    assert key != ResultCache.get_component_key(weight.dict(), {"qcsubmit": "0"})
+
+
+@pytest.mark.parametrize("processors", [1, 2])
+def test_component_apply_cache(monkeypatch, processors):
+    """
+    Make sure a rerun of a component only processes molecules which are not in the cache and gives the same result.
+    """
+
+    molecules = [Molecule.from_smiles(smiles) for smiles in ["C", "CC", "CCCCCCCCCC"]]
+    weight = MolecularWeightFilter(minimum_weight=0, maximum_weight=100)
+
+    with temp_directory():
+        cache = ResultCache(directory="cache")
+        result = weight.apply(molecules, processors=processors, verbose=False, cache=cache)
+        assert result.n_molecules == 2
+        assert result.n_filtered == 1
+
+        processed = []
+        apply = MolecularWeightFilter._apply
+
+        def record_apply(self, molecules):
+            processed.extend(molecule.to_smiles() for molecule in molecules)
+            return apply(self, molecules)
+
+        # this only sees the molecules processed in this process
+        monkeypatch.setattr(MolecularWeightFilter, "_apply", record_apply)
+        new_molecule = Molecule.from_smiles("CCO")
+        cached_result = weight.apply(molecules + [new_molecule], processors=1, verbose=False, cache="cache")
+        assert processed == [new_molecule.to_smiles()]
+        assert cached_result.n_molecules == 3
+        assert cached_result.n_filtered == 1
+        assert set(molecule.to_smiles() for molecule in cached_result.molecules) == set(
+            molecule.to_smiles() for molecule in result.molecules + [new_molecule]
+        )
+
+        # changing the settings should not use the old results
+        processed.clear()
+        weight.maximum_weight = 200
+        assert weight.apply(molecules, processors=1, verbose=False, cache=cache).n_filtered == 0
+        assert len(processed) == 3
+
+
+def test_cache_evict():
+    """
+    Make sure the least recently used results are removed first once the cache is full.
+    """
+
+    weight = MolecularWeightFilter()
+    molecules = [Molecule.from_smiles(smiles) for smiles in ["C", "CC", "CCC"]]
+
+    with temp_directory():
+        cache = ResultCache(directory="cache", max_size=None)
+        component_key = ResultCache.get_component_key(weight.dict(), weight.provenance())
+        molecule_keys = [ResultCache.get_molecule_key(molecule) for molecule in molecules]
+        for i, (molecule, molecule_key) in enumerate(zip(molecules, molecule_keys)):
+            cache.put(component_key, molecule_key, weight._apply([molecule]))
+            os.utime(cache._get_path(component_key, molecule_key), (i, i))
+
+        # using the oldest result makes it the most recent
+        assert cache.get(component_key, molecule_keys[0]).n_molecules == 1
+        assert cache.evict() == 0
+
+        entry_size = os.path.getsize(cache._get_path(component_key, molecule_keys[1]))
+        cache.max_size = (cache.size * 1024 ** 2 - entry_size + 1) / 1024 ** 2
+        assert cache.evict() == 1
+        assert cache.get(component_key, molecule_keys[1]) is None
+        assert cache.get(component_key, molecule_keys[0]) is not None
+        assert cache.get(component_key, molecule_keys[2]) is not None
+
+        cache.clear()
+        assert cache.size == 0
+
+
+def test_cache_put_round_trip():
+    """
+    Make sure storing a result does not change it and the molecules are rebuilt when the result is read back.
+    """
+
+    weight = MolecularWeightFilter()
+    molecule = Molecule.from_smiles("CCO")
+    molecule.generate_conformers(n_conformers=1)
+    result = weight._apply([molecule])
+    description = dict(result.component_description)
+    provenance = dict(result.component_provenance)
+
+    with temp_directory():
+        cache = ResultCache(directory="cache", max_size=None)
+        component_key = ResultCache.get_component_key(weight.dict(), weight.provenance())
+        molecule_key = ResultCache.get_molecule_key(molecule)
+        cache.put(component_key, molecule_key, result)
+
+        assert result.component_description == description
+        assert result.component_provenance == provenance
+        assert result.n_molecules == 1
+
+        cached_result = cache.get(component_key, molecule_key)
+        assert cached_result.component_description == {}
+        assert cached_result.n_molecules == 1
+        assert cached_result.molecules[0] == molecule
+        assert cached_result.n_conformers == 1
@@ -2,6 +2,7 @@
 Unit test for the vairous dataset classes in the package.
 """
 
+import pickle
 from typing import Tuple
 
 import numpy as np
@@ -15,9 +16,11 @@ from openff.qcsubmit.constraints import Constraints, PositionConstraintSet
 from openff.qcsubmit.datasets import (
     BasicDataset,
     ComponentResult,
+    DatasetEntry,
     OptimizationDataset,
     OptimizationEntry,
     TorsiondriveDataset,
+    TorsionDriveEntry,
     list_datasets,
     load_dataset,
     register_dataset,
@@ -39,8 +42,20 @@ from openff.qcsubmit.exceptions import (
 from openff.qcsubmit.factories import BasicDatasetFactory
 from openff.qcsubmit.testing import temp_directory
 from openff.qcsubmit.utils import (
+    IDENTIFIER_CACHE,
+    IdentifierCache,
+    MoleculeRecord,
+    MoleculeView,
     condense_molecules,
+    get_bulk_cmiles,
     get_data,
+    get_graph_hash,
+    get_graph_key,
+    get_molecule_file_ranges,
+    pack_molecule,
+    read_molecule_range,
+    sample_molecules,
+    unpack_molecule,
     update_specification_and_metadata,
 )
 from openff.qcsubmit.validators import (
@@ -224,6 +239,159 @@ def test_componetresult_input_file(file_name):
     assert result.n_molecules > 0
 
 
+def test_get_molecule_file_ranges():
+    """
+    Make sure splitting a file into byte ranges reads every molecule exactly once.
+    """
+    molecules = Molecule.from_file(get_data("linear_molecules.sdf"), "sdf")
+    ranges = get_molecule_file_ranges(get_data("linear_molecules.sdf"), range_size=200)
+    assert len(ranges) > 1
+
+    split_molecules = []
+    for file_range in ranges:
+        range_molecules = read_molecule_range(*file_range)
+        if isinstance(range_molecules, Molecule):
+            range_molecules = [range_molecules]
+        split_molecules.extend(range_molecules)
+
+    assert [molecule.to_smiles() for molecule in split_molecules] == [
+        molecule.to_smiles() for molecule in molecules
+    ]
+
+
+def test_identifier_cache():
+    """
+    Make sure identifiers are only made once per molecule graph and that the least recently used molecules are removed
+    once the cache is full.
+    """
+    cache = IdentifierCache(max_size=2)
+    ethanol, methanol, water = (Molecule.from_smiles(smiles) for smiles in ["CCO", "CO", "O"])
+    keys = [get_graph_key(molecule) for molecule in [ethanol, methanol, water]]
+    assert len(set(keys)) == 3
+    # keys are namespaced by kind so they can not collide with mapped smiles keys
+    assert all(key.startswith("graph:") for key in keys)
+    # the key does not depend on the conformers
+    conformer = Molecule(ethanol)
+    conformer.generate_conformers(n_conformers=1)
+    assert get_graph_key(conformer) == keys[0]
+
+    assert cache.get(keys[0], "inchikey", lambda: ethanol.to_inchikey()) == ethanol.to_inchikey()
+    assert cache.get(keys[0], "inchikey", lambda: "not used") == ethanol.to_inchikey()
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.hit_rate == 0.5
+
+    cache.get(keys[1], "inchikey", lambda: methanol.to_inchikey())
+    cache.get(keys[2], "inchikey", lambda: water.to_inchikey())
+    assert len(cache) == 2
+    assert cache.get(keys[0], "inchikey") is None
+
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.hit_rate == 0
+
+
+def test_component_result_identifier_cache():
+    """
+    Make sure the InChIKeys used to de-duplicate molecules are shared between component results.
+    """
+    IDENTIFIER_CACHE.clear()
+    molecules = [Molecule.from_smiles(smiles) for smiles in ["CCO", "CO"]]
+    for name in ["first", "second"]:
+        ComponentResult(component_name=name, component_description={}, component_provenance={}, molecules=molecules)
+
+    assert IDENTIFIER_CACHE.misses == 2
+    assert IDENTIFIER_CACHE.hits == 2
+
+
+@pytest.mark.parametrize("processors", [1, 2])
+def test_get_bulk_cmiles(processors):
+    """
+    Make sure the identifiers made from a single conversion match those of the molecule methods in input order.
+    """
+    molecules = Molecule.from_file(get_data("tautomers_small.smi"), "smi", allow_undefined_stereo=True)
+
+    bulk_cmiles = get_bulk_cmiles(molecules, processors=processors)
+    for molecule, cmiles in zip(molecules, bulk_cmiles):
+        expected = {
+            "canonical_smiles": molecule.to_smiles(isomeric=False, explicit_hydrogens=False, mapped=False),
+            "canonical_isomeric_smiles": molecule.to_smiles(isomeric=True, explicit_hydrogens=False, mapped=False),
+            "canonical_explicit_hydrogen_smiles": molecule.to_smiles(
+                isomeric=False, explicit_hydrogens=True, mapped=False
+            ),
+            "canonical_isomeric_explicit_hydrogen_smiles": molecule.to_smiles(
+                isomeric=True, explicit_hydrogens=True, mapped=False
+            ),
+            "canonical_isomeric_explicit_hydrogen_mapped_smiles": molecule.to_smiles(
+                isomeric=True, explicit_hydrogens=True, mapped=True
+            ),
+            "molecular_formula": molecule.hill_formula,
+            "standard_inchi": molecule.to_inchi(fixed_hydrogens=False),
+            "inchi_key": molecule.to_inchikey(fixed_hydrogens=False),
+        }
+        assert cmiles == expected
+
+    # an atom map on the molecule should only change the mapped smiles
+    molecule = Molecule(molecules[0])
+    molecule.properties["atom_map"] = {0: 1, 1: 2}
+    expected = dict(
+        bulk_cmiles[0],
+        canonical_isomeric_explicit_hydrogen_mapped_smiles=molecule.to_smiles(
+            isomeric=True, explicit_hydrogens=True, mapped=True
+        ),
+    )
+    assert get_bulk_cmiles([molecule])[0] == expected
+    assert get_bulk_cmiles([molecule, molecules[1]], processors=processors)[0] == expected
+
+
+@pytest.mark.parametrize("file_name", [
+    pytest.param("tautomers_small.smi", id="SMI file"),
+    pytest.param("linear_molecules.sdf", id="SDF file"),
+])
+def test_sample_molecules(file_name):
+    """
+    Make sure a sample of a molecule file is repeatable, keeps the input order and counts every molecule.
+    """
+    molecules = Molecule.from_file(get_data(file_name), allow_undefined_stereo=True)
+    smiles = [molecule.to_smiles() for molecule in molecules]
+
+    sample, n_input = sample_molecules(get_data(file_name), sample_size=3, seed=3)
+    assert n_input == len(molecules)
+    assert len(sample) == 3
+    positions = [smiles.index(molecule.to_smiles()) for molecule in sample]
+    assert positions == sorted(positions)
+
+    repeat, _ = sample_molecules(get_data(file_name), sample_size=3, seed=3)
+    assert [molecule.to_smiles() for molecule in repeat] == [molecule.to_smiles() for molecule in sample]
+
+    # a sample larger than the input is the whole input
+    sample, n_input = sample_molecules(molecules, sample_size=n_input + 5)
+    assert [molecule.to_smiles() for molecule in sample] == smiles
+
+
+@pytest.mark.parametrize("file_name", [
+    pytest.param("tautomers_small.smi", id="SMI file"),
+    pytest.param("linear_molecules.sdf", id="SDF file"),
+    pytest.param("butane_conformers.pdb", id="PDB file"),
+])
+def test_componentresult_input_file_parallel(file_name):
+    """
+    Make sure loading an input file with many processes gives the same molecules as a single process.
+    """
+    results = [
+        ComponentResult(component_name="Test",
+                        component_description={},
+                        component_provenance={},
+                        input_file=get_data(file_name),
+                        processors=processors,
+                        verbose=False)
+        for processors in [1, 2]
+    ]
+    assert results[0].n_molecules == results[1].n_molecules
+    assert [molecule.to_smiles() for molecule in results[0].molecules] == [
+        molecule.to_smiles() for molecule in results[1].molecules
+    ]
+
+
 def test_componentresult_deduplication_coordinates():
     """
     Test the component results ability to deduplicate molecules with coordinates.
@@ -277,6 +445,241 @@ def test_componentresult_deduplication_diff_coords(duplicates):
                     assert molecule.conformers[i].tolist() != molecule.conformers[j].tolist()
 
 
+def test_componentresult_deduplication_remapped_coords():
+    """
+    Make sure the conformers of a duplicate with a different atom order are moved into the order of the stored molecule
+    and that conformers within the tolerance are treated as the same.
+    """
+
+    result = ComponentResult(component_name="Test deduplication", component_description={},
+                             component_provenance={}, conformer_tolerance=1e-3)
+
+    molecule = Molecule.from_smiles("CC(=O)NC")
+    molecule.generate_conformers(n_conformers=1)
+    result.add_molecule(molecule)
+
+    reverse = {i: molecule.n_atoms - 1 - i for i in range(molecule.n_atoms)}
+    remapped = molecule.remap(reverse, current_to_new=True)
+    # the same conformer within the tolerance and a new conformer
+    remapped._conformers = [
+        remapped.conformers[0] + 5e-4 * unit.angstrom,
+        remapped.conformers[0] + 1 * unit.angstrom,
+    ]
+    result.add_molecule(remapped)
+
+    reference = result.molecules[0]
+    assert reference.n_conformers == 2
+    expected = molecule.conformers[0].value_in_unit(unit.angstrom) + 1
+    assert np.allclose(reference.conformers[1].value_in_unit(unit.angstrom), expected)
+
+
+def test_componentresult_canonical_mapping():
+    """
+    Make sure the atom mapping made from the canonical orders of two molecules is a valid isomorphism.
+    """
+
+    molecule = Molecule.from_smiles("CC(=O)NC")
+    reverse = {i: molecule.n_atoms - 1 - i for i in range(molecule.n_atoms)}
+    remapped = molecule.remap(reverse, current_to_new=True)
+
+    reference_order = ComponentResult._get_canonical_order(molecule)
+    atom_map = ComponentResult._get_canonical_mapping(
+        ComponentResult._get_canonical_order(remapped), reference_order
+    )
+
+    assert sorted(atom_map.values()) == list(range(molecule.n_atoms))
+    for atom_index, reference_index in atom_map.items():
+        assert remapped.atoms[atom_index].atomic_number == molecule.atoms[reference_index].atomic_number
+    for bond in remapped.bonds:
+        reference_bond = molecule.get_bond_between(atom_map[bond.atom1_index], atom_map[bond.atom2_index])
+        assert reference_bond.bond_order == bond.bond_order
+
+    # molecules with different canonical smiles can not be aligned this way
+    assert ComponentResult._get_canonical_mapping(("C", [0]), reference_order) is None
+    assert ComponentResult._get_canonical_mapping(None, reference_order) is None
+
+
+def test_get_graph_hash():
+    """
+    Make sure the graph hash does not depend on the atom order and can tell apart isomers and stereoisomers.
+    """
+    molecule = Molecule.from_smiles("CC(=O)NC")
+    reverse = {i: molecule.n_atoms - 1 - i for i in range(molecule.n_atoms)}
+    remapped = molecule.remap(reverse, current_to_new=True)
+    assert get_graph_hash(molecule) == get_graph_hash(remapped)
+
+    assert get_graph_hash(Molecule.from_smiles("CCO")) != get_graph_hash(Molecule.from_smiles("COC"))
+    assert get_graph_hash(Molecule.from_smiles("C/C=C/C")) != get_graph_hash(Molecule.from_smiles("C/C=C\\C"))
+
+
+@pytest.mark.parametrize("hash_method", ["inchikey", "smiles", "graph"])
+def test_componentresult_hash_method(hash_method):
+    """
+    Make sure each hash method finds the same duplicates and condenses their conformers, even when the duplicates have a
+    different atom order.
+    """
+    result = ComponentResult(
+        component_name="Test deduplication",
+        component_description={},
+        component_provenance={},
+        hash_method=hash_method,
+    )
+
+    duplicates = 2
+    molecules = duplicated_molecules(include_conformers=False, duplicates=duplicates)
+    for i, molecule in enumerate(molecules):
+        if i % 2:
+            reverse = {j: molecule.n_atoms - 1 - j for j in range(molecule.n_atoms)}
+            molecule = molecule.remap(reverse, current_to_new=True)
+        molecule.add_conformer(np.random.rand(molecule.n_atoms, 3) * unit.angstrom)
+        result.add_molecule(molecule)
+
+    assert result.n_molecules == len(molecules) / duplicates
+    for molecule in result.molecules:
+        assert molecule.n_conformers == duplicates
+
+    # filtered molecules are found with the same key
+    result.filter_molecule(Molecule.from_smiles("CCO"))
+    assert result.n_molecules == len(molecules) / duplicates - 1
+    assert result.n_filtered == 1
+
+
+def test_componentresult_hash_method_error():
+    """
+    Make sure an error is raised when an unknown hash method is requested.
+    """
+    with pytest.raises(ValueError):
+        ComponentResult(
+            component_name="Test deduplication",
+            component_description={},
+            component_provenance={},
+            hash_method="fingerprint",
+        )
+
+
+def test_componentresult_update(monkeypatch):
+    """
+    Make sure results computed in workers can be merged using their hashes and canonical orders without any isomorphism
+    checks.
+    """
+
+    results = []
+    for _ in range(2):
+        result = ComponentResult(component_name="Test merge", component_description={}, component_provenance={})
+        for molecule in duplicated_molecules(include_conformers=False, duplicates=1):
+            molecule.add_conformer(np.random.rand(molecule.n_atoms, 3) * unit.angstrom)
+            result.add_molecule(molecule)
+        result.filter_molecule(Molecule.from_smiles("N"), reason="The worker crashed.")
+        result.compute_canonical_orders()
+        results.append(result)
+
+    def no_isomorphism(*args, **kwargs):
+        raise AssertionError("An isomorphism check should not be needed.")
+
+    monkeypatch.setattr(Molecule, "are_isomorphic", no_isomorphism)
+    monkeypatch.setattr(Molecule, "to_inchikey", no_isomorphism)
+
+    merged = ComponentResult(component_name="Test merge", component_description={}, component_provenance={})
+    for result in results:
+        merged.update(result)
+
+    assert merged.n_molecules == 4
+    assert merged.n_conformers == 8
+    assert merged.n_filtered == 1
+    assert list(merged._filter_reasons.values()) == ["The worker crashed."]
+
+
+def test_pack_molecule_round_trip():
+    """
+    Make sure a molecule survives being packed into its compact form with its conformers, charges and torsions.
+    """
+
+    molecule = Molecule.from_smiles("C/C=C/[C@@H](O)[O-]")
+    molecule.generate_conformers(n_conformers=3)
+    molecule.partial_charges = np.linspace(-1, 0, molecule.n_atoms) * unit.elementary_charge
+    torsion_indexer = TorsionIndexer()
+    torsion_indexer.add_torsion(torsion=(0, 1, 2, 3), scan_range=None)
+    molecule.properties["dihedrals"] = torsion_indexer
+
+    record = pack_molecule(molecule)
+    assert record.conformers.dtype == np.float64
+    assert record.conformers.shape == (molecule.n_conformers, molecule.n_atoms, 3)
+    assert record.n_conformers == molecule.n_conformers
+
+    unpacked = unpack_molecule(pickle.loads(pickle.dumps(record)))
+    assert unpacked == molecule
+    assert unpacked.to_smiles() == molecule.to_smiles()
+    assert unpacked.n_conformers == molecule.n_conformers
+    for conformer, reference in zip(unpacked.conformers, molecule.conformers):
+        assert np.allclose(conformer.value_in_unit(unit.angstrom), reference.value_in_unit(unit.angstrom))
+    assert np.allclose(
+        unpacked.partial_charges.value_in_unit(unit.elementary_charge),
+        molecule.partial_charges.value_in_unit(unit.elementary_charge),
+    )
+    assert unpacked.properties["dihedrals"].torsions == torsion_indexer.torsions
+
+
+def test_componentresult_pickle_packed(monkeypatch):
+    """
+    Make sure a pickled result holds its molecules packed and they are only rebuilt when they are needed.
+    """
+
+    result = ComponentResult(component_name="Test pickle", component_description={}, component_provenance={})
+    for molecule in duplicated_molecules(include_conformers=True, duplicates=1):
+        result.add_molecule(molecule)
+    result.filter_molecule(Molecule.from_smiles("N"), reason="The worker crashed.")
+
+    received = pickle.loads(pickle.dumps(result))
+    assert all(isinstance(molecule, MoleculeRecord) for molecule in received._molecules.values())
+    assert received.n_molecules == result.n_molecules
+    assert received.n_conformers == result.n_conformers
+
+    # merging unique molecules should not rebuild them
+    merged = ComponentResult(component_name="Test pickle", component_description={}, component_provenance={})
+    merged.update(received)
+    assert all(isinstance(molecule, MoleculeRecord) for molecule in merged._molecules.values())
+    assert merged.get_filter_reason(Molecule.from_smiles("N")) == "The worker crashed."
+
+    for molecule, reference in zip(merged.molecules, result.molecules):
+        assert molecule == reference
+        assert molecule.n_conformers == reference.n_conformers
+    # accessing the molecules should not unpack the store
+    assert all(isinstance(molecule, MoleculeRecord) for molecule in merged._molecules.values())
+
+
+def test_componentresult_molecule_view():
+    """
+    Make sure the molecules of a result are held as records and exposed through a lazy view.
+    """
+
+    result = ComponentResult(component_name="Test view", component_description={}, component_provenance={})
+    molecules = duplicated_molecules(include_conformers=True, duplicates=1)
+    for molecule in molecules:
+        result.add_molecule(molecule)
+    result.filter_molecule(Molecule.from_smiles("N"))
+
+    assert all(isinstance(molecule, MoleculeRecord) for molecule in result._molecules.values())
+    assert all(isinstance(molecule, MoleculeRecord) for molecule in result._filtered.values())
+    # each record keeps its conformers in one array
+    for record in result._molecules.values():
+        assert record.conformers.shape == (record.n_conformers, len(record.atomic_numbers), 3)
+
+    view = result.molecules
+    assert isinstance(view, MoleculeView)
+    assert len(view) == len(molecules)
+    assert view == molecules
+    assert isinstance(view[1:], MoleculeView)
+    assert view[1:] == molecules[1:]
+    assert view[-1].n_conformers == molecules[-1].n_conformers
+    assert len(view + [Molecule.from_smiles("C")]) == len(molecules) + 1
+    assert result.filtered == [Molecule.from_smiles("N")]
+
+    # the view is not changed by later updates to the result
+    result.filter_molecule(molecules[0])
+    assert len(view) == len(molecules)
+    assert len(result.molecules) == len(molecules) - 1
+
+
 def test_componentresult_deduplication_iso():
     """
     Make sure that duplicates are correctly handled when the inchikey matches but standard isomorphism fails
@@ -434,6 +837,32 @@ def test_torsiondrive_unqiue_settings():
     assert dataset.dataset["test"].keywords.dihedral_ranges != dataset.dihedral_ranges
 
 
+def test_torsiondrive_entry_from_entry():
+    """
+    Make sure entries made from a shared molecule entry match entries made directly and are still fully validated.
+    """
+    from openff.qcsubmit.factories import TorsiondriveDatasetFactory
+    molecule = Molecule.from_smiles("CO")
+    molecule.generate_conformers(n_conformers=1)
+    dihedral = TorsiondriveDatasetFactory()._get_torsion_string(molecule.find_rotatable_bonds()[0])
+    attributes = get_cmiles(molecule)
+    entry = DatasetEntry(off_molecule=molecule, index="CO", attributes=attributes, extras={}, keywords={})
+    keywords = {"grid_spacing": [5], "dihedral_ranges": [(-50, 50)]}
+
+    td_entry = TorsionDriveEntry.from_entry(entry, index="CO", dihedrals=[dihedral], keywords=keywords)
+    expected = TorsionDriveEntry(off_molecule=molecule, index="CO", attributes=attributes, extras={},
+                                 keywords=keywords, dihedrals=[dihedral])
+    assert td_entry == expected
+
+    # the dihedrals must be connected, have four atoms and the scan ranges two limits
+    with pytest.raises(DihedralConnectionError):
+        TorsionDriveEntry.from_entry(entry, index="CO", dihedrals=[(0, 1, 1, 1)])
+    with pytest.raises(ValidationError):
+        TorsionDriveEntry.from_entry(entry, index="CO", dihedrals=[dihedral[:3]])
+    with pytest.raises(ValidationError):
+        TorsionDriveEntry.from_entry(entry, index="CO", dihedrals=[dihedral], keywords={"dihedral_ranges": [(-50,)]})
+
+
 @pytest.mark.parametrize("constraint_settings", [
     pytest.param(("distance", [0, 1], None), id="distance correct order"),
     pytest.param(("angle", [0, 1, 2], None), id="angle correct order"),
@@ -1186,6 +1615,33 @@ def test_dataset_add_filter_molecules():
     assert len(filtered.molecules) == 2
 
 
+def test_dataset_filter_molecules_reasons():
+    """
+    Test that the reason a molecule was filtered is carried from the component result to the dataset.
+    """
+    result = ComponentResult(
+        component_name="test",
+        component_description={},
+        component_provenance={},
+    )
+    methane = Molecule.from_smiles("C")
+    ethane = Molecule.from_smiles("CC")
+    result.filter_molecule(methane)
+    result.filter_molecule(ethane, reason="The worker crashed.")
+    assert result.get_filter_reason(methane) is None
+    assert result.get_filter_reason(ethane) == "The worker crashed."
+
+    dataset = BasicDataset()
+    dataset.filter_molecules(molecules=result.filtered,
+                             component_name=result.component_name,
+                             component_description={},
+                             component_provenance={},
+                             reasons=[result.get_filter_reason(molecule) for molecule in result.filtered])
+    filtered = dataset.filtered_molecules["test"]
+    assert len(filtered.molecules) == 2
+    assert filtered.reasons == {ethane.to_smiles(isomeric=True, explicit_hydrogens=True): "The worker crashed."}
+
+
 @pytest.mark.parametrize("dataset_type", [
     pytest.param(BasicDataset, id="BasicDataset"), pytest.param(OptimizationDataset, id="OptimizationDataset"),
     pytest.param(TorsiondriveDataset, id="TorsiondriveDataset")
@@ -0,0 +1,380 @@
+"""
+Tests for the executors used to run workflow components in parallel.
+"""
+
+import os
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import pytest
+from openforcefield.topology import Molecule
+
+from openff.qcsubmit import workflow_components
+from openff.qcsubmit.common_structures import ComponentProperties
+from openff.qcsubmit.datasets import ComponentResult
+from openff.qcsubmit.exceptions import InvalidExecutorError
+from openff.qcsubmit.executors import (
+    FuturesExecutor,
+    ProcessExecutor,
+    SchedulingReport,
+    SerialExecutor,
+    ThreadExecutor,
+    estimate_makespan,
+    get_component_key,
+    get_executor,
+    get_lpt_chunks,
+)
+from openff.qcsubmit.utils import get_data
+from openff.qcsubmit.workflow_components import CustomWorkflowComponent
+
+
+class FaultyComponent(CustomWorkflowComponent):
+    """
+    A component which hangs, crashes or raises an error on propane and passes every other molecule.
+    """
+
+    component_name = "FaultyComponent"
+    component_description = "Fail on propane."
+    component_fail_message = "The component failed."
+    _properties = ComponentProperties(process_parallel=True, produces_duplicates=False)
+
+    fault: str = "hang"
+
+    def _apply(self, molecules: List[Molecule]) -> ComponentResult:
+        result = self._create_result()
+        for molecule in molecules:
+            if molecule.to_smiles(explicit_hydrogens=False) == "CCC":
+                if self.fault == "hang":
+                    time.sleep(600)
+                elif self.fault == "crash":
+                    os.kill(os.getpid(), signal.SIGSEGV)
+                else:
+                    raise ValueError("Propane is not allowed.")
+            result.add_molecule(molecule)
+
+        return result
+
+    def provenance(self) -> Dict:
+        return {"test": "version1"}
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return True
+
+
+class LargestOnlyComponent(CustomWorkflowComponent):
+    """
+    A component which passes every molecule and only keeps the largest once the result of every chunk is merged.
+    """
+
+    component_name = "LargestOnlyComponent"
+    component_description = "Keep the largest molecule."
+    component_fail_message = "The molecule is not the largest."
+    _properties = ComponentProperties(process_parallel=True, produces_duplicates=False)
+
+    def _apply_init(self, result: ComponentResult) -> None:
+        self._cache["min_atoms"] = 1
+
+    def _apply(self, molecules: List[Molecule]) -> ComponentResult:
+        result = self._create_result()
+        for molecule in molecules:
+            # this fails when the component was not set up
+            if molecule.n_atoms >= self._cache["min_atoms"]:
+                result.add_molecule(molecule)
+
+        return result
+
+    def _apply_finalize(self, result: ComponentResult) -> None:
+        molecules = list(result.molecules)
+        largest = max(molecules, key=lambda molecule: molecule.n_atoms)
+        for molecule in molecules:
+            if molecule is not largest:
+                result.filter_molecule(molecule, reason="smaller")
+        super()._apply_finalize(result)
+
+    def provenance(self) -> Dict:
+        return {"test": "version1"}
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return True
+
+
+def get_tautomers():
+    """
+    Get a set of molecules that all have tautomers
+    """
+
+    mols = Molecule.from_file(get_data("tautomers_small.smi"), allow_undefined_stereo=True)
+
+    return mols
+
+
+def test_component_key_changes_with_settings():
+    """
+    Make sure the component key depends on the settings of the component so stale workers are never reused.
+    """
+
+    weight = workflow_components.MolecularWeightFilter()
+    key = get_component_key(weight)
+    assert key == get_component_key(workflow_components.MolecularWeightFilter())
+
+    weight.maximum_weight = 80
+    assert key != get_component_key(weight)
+    assert get_component_key(weight).startswith(weight.component_name)
+
+
+def test_process_executor_shared_pool():
+    """
+    Make sure one running pool can be used by several components and gives the same results as running serially.
+    """
+
+    weight = workflow_components.MolecularWeightFilter(minimum_weight=0, maximum_weight=80)
+    elements = workflow_components.ElementFilter(allowed_elements=["H", "C", "N"])
+
+    molecules = get_tautomers()
+
+    serial_weight = weight.apply(molecules, processors=1, verbose=False)
+    serial_elements = elements.apply(serial_weight.molecules, processors=1, verbose=False)
+
+    with ProcessExecutor(processors=2, components=[weight, elements]) as executor:
+        pool = executor._pool
+        result = weight.apply(molecules, verbose=False, executor=executor)
+        assert executor._pool is pool
+        result = elements.apply(result.molecules, verbose=False, executor=executor)
+        assert executor._pool is pool
+
+    assert executor.is_running is False
+    assert result.n_molecules == serial_elements.n_molecules
+    assert result.n_filtered == serial_elements.n_filtered
+
+
+def test_process_executor_unregistered_component():
+    """
+    Make sure a component which was not given to the executor when it started is sent to the workers with the tasks.
+    """
+
+    weight = workflow_components.MolecularWeightFilter(minimum_weight=0, maximum_weight=80)
+
+    with ProcessExecutor(processors=2) as executor:
+        result = weight.apply(get_tautomers(), verbose=False, executor=executor)
+
+    assert result.n_molecules == 14
+    assert result.n_filtered == 36
+
+
+@pytest.mark.parametrize(
+    "executor_type, executor_class",
+    [
+        pytest.param("serial", SerialExecutor, id="serial"),
+        pytest.param("threads", ThreadExecutor, id="threads"),
+        pytest.param("processes", ProcessExecutor, id="processes"),
+    ],
+)
+def test_executor_backends(executor_type, executor_class):
+    """
+    Make sure each executor backend gives the same result when used by name or as a running executor.
+    """
+
+    weight = workflow_components.MolecularWeightFilter(minimum_weight=0, maximum_weight=80)
+    molecules = get_tautomers()
+
+    result = weight.apply(molecules, processors=2, verbose=False, executor=executor_type)
+    assert result.n_molecules == 14
+    assert result.n_filtered == 36
+
+    executor = get_executor(executor_type, processors=2, components=[weight])
+    assert isinstance(executor, executor_class)
+    with executor:
+        result = weight.apply(molecules, verbose=False, executor=executor)
+        assert executor.is_running is True
+    assert executor.is_running is False
+
+    assert result.n_molecules == 14
+    assert result.n_filtered == 36
+
+
+def test_futures_executor_existing_pool():
+    """
+    Make sure a concurrent.futures pool can be used and is not shut down by the executor.
+    """
+
+    weight = workflow_components.MolecularWeightFilter(minimum_weight=0, maximum_weight=80)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        executor = get_executor(pool, processors=2)
+        assert isinstance(executor, FuturesExecutor)
+        with executor:
+            result = weight.apply(get_tautomers(), verbose=False, executor=executor)
+        assert executor.is_running is True
+
+    assert result.n_molecules == 14
+    assert result.n_filtered == 36
+
+
+def test_get_executor_invalid():
+    """
+    Make sure an error is raised when an unknown executor type is requested.
+    """
+
+    with pytest.raises(InvalidExecutorError):
+        get_executor("mpi")
+
+
+@pytest.mark.parametrize(
+    "fault, reason",
+    [
+        pytest.param("hang", "timeout", id="hang"),
+        pytest.param("crash", "crashed", id="crash"),
+        pytest.param("error", "ValueError", id="error"),
+    ],
+)
+def test_process_executor_isolates_failures(fault, reason):
+    """
+    Make sure a molecule which hangs, crashes the worker or raises an error is filtered with a reason and the rest of the
+    molecules are still processed.
+    """
+
+    component = FaultyComponent(fault=fault)
+    molecules = [Molecule.from_smiles(smiles) for smiles in ["C", "CC", "CCC", "CCCC", "CCCCC"]]
+
+    with ProcessExecutor(processors=2, components=[component], timeout=5) as executor:
+        result = component.apply(molecules, verbose=False, chunk_size=2, executor=executor)
+        # the broken worker should have been replaced
+        assert len(executor._workers) == 2
+        assert all(worker.process.is_alive() for worker in executor._workers)
+
+    assert result.n_molecules == 4
+    assert result.n_filtered == 1
+    assert reason in result.get_filter_reason(result.filtered[0])
+    assert result.get_filter_reason(result.molecules[0]) is None
+
+
+def test_thread_executor_isolates_failures():
+    """
+    Make sure a molecule which raises an error in a thread pool is filtered with a reason rather than stopping the whole
+    component.
+    """
+
+    component = FaultyComponent(fault="error")
+    molecules = [Molecule.from_smiles(smiles) for smiles in ["C", "CC", "CCC", "CCCC", "CCCCC"]]
+
+    with ThreadExecutor(processors=2, components=[component]) as executor:
+        result = component.apply(molecules, verbose=False, chunk_size=2, executor=executor)
+
+    assert result.n_molecules == 4
+    assert result.n_filtered == 1
+    assert "ValueError" in result.get_filter_reason(result.filtered[0])
+
+
+@pytest.mark.parametrize(
+    "executor_type",
+    [
+        pytest.param("serial", id="serial"),
+        pytest.param("threads", id="threads"),
+        pytest.param("processes", id="processes"),
+        pytest.param("futures", id="futures"),
+        pytest.param("dask", id="dask"),
+    ],
+)
+def test_executor_finalize_merged_result(executor_type):
+    """
+    Make sure the finalize hook of a component runs on the merged result with every executor, and that the component
+    can be applied again with the same executor afterwards.
+    """
+    if executor_type == "dask":
+        pytest.importorskip("distributed")
+
+    component = LargestOnlyComponent()
+    molecules = [Molecule.from_smiles(smiles) for smiles in ["C", "CC", "CCC", "CCCC", "CCCCC"]]
+
+    pool = ThreadPoolExecutor(max_workers=2) if executor_type == "futures" else None
+    executor = get_executor(pool or executor_type, processors=2, components=[component])
+    try:
+        with executor:
+            for _ in range(2):
+                result = component.apply(molecules, verbose=False, chunk_size=2, executor=executor)
+                assert result.n_molecules == 1
+                assert result.n_filtered == 4
+                assert result.molecules[0].to_smiles(explicit_hydrogens=False) == "CCCCC"
+                assert all(result.get_filter_reason(molecule) == "smaller" for molecule in result.filtered)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+
+def test_get_lpt_chunks():
+    """
+    Make sure the most expensive molecules are sent first on their own and the cheap molecules are batched.
+    """
+
+    costs = [1] * 30 + [20, 25]
+    chunks = get_lpt_chunks(costs, n_workers=4, chunk_size=8)
+
+    assert chunks[0] == [31]
+    assert chunks[1] == [30]
+    assert all(len(chunk) <= 8 for chunk in chunks)
+    assert sorted(i for chunk in chunks for i in chunk) == list(range(32))
+
+
+def test_estimate_makespan():
+    """
+    Make sure the makespan is worked out by giving each chunk to the first free worker.
+    """
+
+    assert estimate_makespan([1, 1, 1, 1], n_workers=2) == 2
+    assert estimate_makespan([1, 1, 1, 5], n_workers=2) == 6
+    assert estimate_makespan([5, 1, 1, 1], n_workers=2) == 5
+
+
+def test_scheduling_report():
+    """
+    Make sure the time saved is estimated from the simulated schedules.
+    """
+
+    costs = [1] * 30 + [20, 25]
+    report = SchedulingReport.from_costs(costs, n_workers=4, chunk_size=8, wall_time=10)
+
+    assert report.input_makespan == 51
+    assert report.scheduled_makespan == 25
+    assert report.time_saved == pytest.approx(10.4)
+
+
+def test_get_max_workers():
+    """
+    Make sure the number of workers used for a component respects its worker, licence and memory limits.
+    """
+
+    weight = workflow_components.MolecularWeightFilter()
+    elements = workflow_components.ElementFilter()
+    executor = ThreadExecutor(processors=8, memory_budget=1000)
+
+    assert executor.get_max_workers([weight, elements]) == 8
+
+    weight.set_resource_limits(max_workers=6)
+    assert executor.get_max_workers([weight]) == 6
+
+    elements.set_resource_limits(licence_seats=4)
+    assert executor.get_max_workers([weight, elements]) == 4
+
+    elements.set_resource_limits(max_memory=400)
+    assert executor.get_max_workers([weight, elements]) == 2
+
+    # a component always gets at least one worker
+    elements.set_resource_limits(max_memory=4000)
+    assert executor.get_max_workers([elements]) == 1
+
+
+def test_thread_executor_respects_limits():
+    """
+    Make sure a component limited to fewer workers still gives the same result.
+    """
+
+    weight = workflow_components.MolecularWeightFilter(minimum_weight=0, maximum_weight=80)
+    weight.set_resource_limits(max_workers=1)
+
+    result = weight.apply(get_tautomers(), processors=4, verbose=False, executor="threads")
+    assert result.n_molecules == 14
+    assert result.n_filtered == 36
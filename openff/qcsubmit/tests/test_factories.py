@@ -5,10 +5,12 @@ Tests for building and running workflows, exporting and importing settings.
 import pytest
 from openforcefield.topology import Molecule
 from pydantic import ValidationError
+from simtk import unit
 
 from openff.qcsubmit import workflow_components
 from openff.qcsubmit.datasets import (
     BasicDataset,
+    ComponentResult,
     OptimizationDataset,
     TorsiondriveDataset,
 )
@@ -16,14 +18,25 @@ from openff.qcsubmit.exceptions import (
     DatasetInputError,
     DriverError,
     InvalidWorkflowComponentError,
+    MissingWorkflowComponentError,
 )
+from openff.qcsubmit.executors import ProcessExecutor, ThreadExecutor
 from openff.qcsubmit.factories import (
     BasicDatasetFactory,
     OptimizationDatasetFactory,
     TorsiondriveDatasetFactory,
 )
 from openff.qcsubmit.testing import temp_directory
-from openff.qcsubmit.utils import get_data
+from openff.qcsubmit.utils import get_data, iter_molecule_batches
+
+
+class FinalizedElementFilter(workflow_components.ElementFilter):
+    """
+    An element filter with a finalize hook, which must see the merged result before the next component runs.
+    """
+
+    def _apply_finalize(self, result: ComponentResult) -> None:
+        super()._apply_finalize(result)
 
 
 def test_scf_properties_assignment():
@@ -372,6 +385,68 @@ def test_export_workflow_only(file_type, factory_type):
             assert "tag" not in data
 
 
+@pytest.mark.parametrize("file_type", [pytest.param("json", id="json"), pytest.param("yaml", id="yaml")])
+def test_export_import_workflow_branches(file_type):
+    """
+    Make sure the branches of a workflow are exported and imported with the workflow and settings.
+    """
+
+    factory = BasicDatasetFactory()
+    factory.add_workflow_component(workflow_components.ElementFilter())
+    factory.add_workflow_branch("tautomers", workflow_components.EnumerateTautomers(max_tautomers=5))
+    conformer_gen = workflow_components.StandardConformerGenerator(max_conformers=2)
+    factory.add_workflow_branch("stereoisomers", [workflow_components.EnumerateStereoisomers(), conformer_gen])
+
+    with temp_directory():
+        factory.export_workflow("workflow." + file_type)
+        factory2 = BasicDatasetFactory()
+        factory2.import_workflow("workflow." + file_type)
+        assert factory2.workflow.keys() == factory.workflow.keys()
+        assert factory2.workflow_branches["stereoisomers"]["StandardConformerGenerator"].max_conformers == 2
+        assert factory2.dict() == factory.dict()
+
+        factory.export_settings("settings." + file_type)
+        factory3 = BasicDatasetFactory()
+        factory3.import_settings("settings." + file_type)
+        assert factory3.dict() == factory.dict()
+
+    factory.remove_workflow_branch("tautomers")
+    assert list(factory.workflow_branches.keys()) == ["stereoisomers"]
+    with pytest.raises(MissingWorkflowComponentError):
+        factory.remove_workflow_branch("tautomers")
+
+
+@pytest.mark.parametrize("executor", [
+    pytest.param(None, id="no executor"),
+    pytest.param("serial", id="serial"),
+    pytest.param("threads", id="threads"),
+])
+def test_create_dataset_workflow_branches(executor):
+    """
+    Make sure the molecules from each branch are combined and de-duplicated in the dataset.
+    """
+
+    mols = [Molecule.from_smiles(smiles, allow_undefined_stereo=True) for smiles in ["CC(O)CC", "Oc1ccccn1", "CCl"]]
+
+    def make_dataset(branch_components):
+        factory = BasicDatasetFactory()
+        factory.add_workflow_component(workflow_components.MolecularWeightFilter(minimum_weight=60))
+        for name, component in branch_components.items():
+            factory.add_workflow_branch(name, component)
+        return factory.create_dataset(dataset_name="test name", molecules=mols, description="Force field test",
+                                      tagline="A test dataset", processors=1, verbose=False, executor=executor)
+
+    tautomers = make_dataset({"tautomers": workflow_components.EnumerateTautomers()})
+    stereoisomers = make_dataset({"stereoisomers": workflow_components.EnumerateStereoisomers()})
+    both = make_dataset({"tautomers": workflow_components.EnumerateTautomers(),
+                         "stereoisomers": workflow_components.EnumerateStereoisomers()})
+
+    assert set(both.dataset.keys()) == set(tautomers.dataset.keys()) | set(stereoisomers.dataset.keys())
+    # the shared filter is only ran once
+    assert len(both.filtered_molecules["MolecularWeightFilter"].molecules) == 1
+    assert "workflow_branches" not in both.dict()
+
+
 @pytest.mark.parametrize("factory_type", [
     pytest.param(BasicDatasetFactory, id="BasicDatasetFactory"),
     pytest.param(OptimizationDatasetFactory, id="OptimizationDatasetFactory"),
@@ -545,3 +620,388 @@ def test_create_dataset(factory_dataset_type):
     assert dataset.dataset != {}
     assert dataset.filtered != {}
     assert element_filter.component_name in dataset.filtered_molecules
+
+
+def test_workflow_segments():
+    """
+    Make sure the workflow is split so that only components which do not produce duplicates are fused together.
+    """
+
+    efilter = workflow_components.ElementFilter()
+    weight = workflow_components.MolecularWeightFilter()
+    tautomers = workflow_components.EnumerateTautomers()
+    conformers = workflow_components.StandardConformerGenerator()
+
+    segments = BasicDatasetFactory._get_workflow_segments([efilter, weight, tautomers, conformers])
+    assert segments == [[efilter, weight, tautomers], [conformers]]
+
+    segments = BasicDatasetFactory._get_workflow_segments([tautomers, efilter])
+    assert segments == [[tautomers], [efilter]]
+
+    # components with different resource limits are not fused
+    weight.set_resource_limits(max_workers=1)
+    segments = BasicDatasetFactory._get_workflow_segments([efilter, weight, tautomers])
+    assert segments == [[efilter], [weight], [tautomers]]
+
+
+def test_workflow_segments_finalize():
+    """
+    Make sure a segment ends after a component which finalizes its merged result.
+    """
+
+    efilter = FinalizedElementFilter()
+    weight = workflow_components.MolecularWeightFilter()
+    tautomers = workflow_components.EnumerateTautomers()
+
+    assert efilter._finalizes_result() is True
+    assert weight._finalizes_result() is False
+
+    segments = BasicDatasetFactory._get_workflow_segments([weight, efilter, tautomers])
+    assert segments == [[weight, efilter], [tautomers]]
+
+
+def test_create_dataset_fused():
+    """
+    Make sure fusing the workflow components gives the same dataset as running each component in turn.
+    """
+
+    factory = BasicDatasetFactory()
+    element_filter = workflow_components.ElementFilter()
+    element_filter.allowed_elements = [1, 6, 8, 7]
+    factory.add_workflow_component(element_filter)
+    weight_filter = workflow_components.MolecularWeightFilter(minimum_weight=0, maximum_weight=80)
+    factory.add_workflow_component(weight_filter)
+    conformer_generator = workflow_components.StandardConformerGenerator(max_conformers=1)
+    factory.add_workflow_component(conformer_generator)
+
+    mols = Molecule.from_file(get_data("tautomers_small.smi"), "smi", allow_undefined_stereo=True)
+
+    dataset = factory.create_dataset(dataset_name="test name", molecules=mols, description="Force field test",
+                                     tagline="A test dataset", processors=2, verbose=False)
+    fused_dataset = factory.create_dataset(dataset_name="test name", molecules=mols, description="Force field test",
+                                           tagline="A test dataset", processors=2, verbose=False,
+                                           fuse_components=True)
+
+    assert set(dataset.dataset.keys()) == set(fused_dataset.dataset.keys())
+    assert list(dataset.filtered_molecules.keys()) == list(fused_dataset.filtered_molecules.keys())
+    for component_name, filter_entry in dataset.filtered_molecules.items():
+        assert sorted(filter_entry.molecules) == sorted(fused_dataset.filtered_molecules[component_name].molecules)
+
+
+@pytest.mark.parametrize(
+    "fuse_components",
+    [pytest.param(False, id="not fused"), pytest.param(True, id="fused")],
+)
+def test_create_dataset_executor(fuse_components):
+    """
+    Make sure a dataset can be made with a named executor and that a running executor is left running.
+    """
+
+    factory = BasicDatasetFactory()
+    weight_filter = workflow_components.MolecularWeightFilter(minimum_weight=0, maximum_weight=80)
+    factory.add_workflow_component(weight_filter)
+    element_filter = workflow_components.ElementFilter(allowed_elements=["H", "C", "N", "O"])
+    factory.add_workflow_component(element_filter)
+
+    mols = Molecule.from_file(get_data("tautomers_small.smi"), "smi", allow_undefined_stereo=True)
+
+    serial_dataset = factory.create_dataset(dataset_name="test name", molecules=mols, description="Force field test",
+                                            tagline="A test dataset", processors=1, verbose=False)
+    threaded_dataset = factory.create_dataset(dataset_name="test name", molecules=mols, description="Force field test",
+                                              tagline="A test dataset", processors=2, verbose=False,
+                                              fuse_components=fuse_components, executor="threads")
+    assert set(serial_dataset.dataset.keys()) == set(threaded_dataset.dataset.keys())
+
+    with ThreadExecutor(processors=2) as executor:
+        dataset = factory.create_dataset(dataset_name="test name", molecules=mols, description="Force field test",
+                                         tagline="A test dataset", verbose=False, fuse_components=fuse_components,
+                                         executor=executor)
+        assert executor.is_running is True
+
+    assert set(serial_dataset.dataset.keys()) == set(dataset.dataset.keys())
+
+
+def test_create_dataset_checkpoint(monkeypatch):
+    """
+    Make sure a workflow which dies part way through resumes from the last finished component.
+    """
+
+    factory = BasicDatasetFactory()
+    weight_filter = workflow_components.MolecularWeightFilter(minimum_weight=0, maximum_weight=80)
+    factory.add_workflow_component(weight_filter)
+    element_filter = workflow_components.ElementFilter(allowed_elements=["H", "C", "N", "O"])
+    factory.add_workflow_component(element_filter)
+
+    mols = Molecule.from_file(get_data("tautomers_small.smi"), "smi", allow_undefined_stereo=True)
+    expected = factory.create_dataset(dataset_name="test name", molecules=mols, description="Force field test",
+                                      tagline="A test dataset", processors=1, verbose=False)
+
+    def crash(*args, **kwargs):
+        raise RuntimeError("The workflow died.")
+
+    with temp_directory():
+        with monkeypatch.context() as patch:
+            patch.setattr(workflow_components.ElementFilter, "apply", crash)
+            with pytest.raises(RuntimeError):
+                factory.create_dataset(dataset_name="test name", molecules=mols, description="Force field test",
+                                       tagline="A test dataset", processors=1, verbose=False,
+                                       checkpoint_directory="checkpoint")
+
+        # the weight filter finished so it should not be ran again
+        monkeypatch.setattr(workflow_components.MolecularWeightFilter, "apply", crash)
+        dataset = factory.create_dataset(dataset_name="test name", molecules=mols, description="Force field test",
+                                         tagline="A test dataset", processors=1, verbose=False,
+                                         checkpoint_directory="checkpoint")
+        assert set(dataset.dataset.keys()) == set(expected.dataset.keys())
+        assert dataset.n_filtered == expected.n_filtered
+        assert set(dataset.filtered_molecules.keys()) == set(expected.filtered_molecules.keys())
+
+        # a changed workflow should not use the checkpoint
+        factory.remove_workflow_component("ElementFilter")
+        with pytest.raises(RuntimeError):
+            factory.create_dataset(dataset_name="test name", molecules=mols, description="Force field test",
+                                   tagline="A test dataset", processors=1, verbose=False,
+                                   checkpoint_directory="checkpoint")
+
+
+@pytest.mark.parametrize("executor", [
+    pytest.param("threads", id="threads"),
+    pytest.param("processes", id="processes"),
+])
+def test_create_dataset_parallel_preparation(executor):
+    """
+    Make sure making the dataset entries in the workers gives the same dataset in the same order.
+    """
+
+    factory = BasicDatasetFactory()
+    factory.add_workflow_component(workflow_components.MolecularWeightFilter(minimum_weight=0, maximum_weight=200))
+
+    mols = Molecule.from_file(get_data("tautomers_small.smi"), "smi", allow_undefined_stereo=True)
+    expected = factory.create_dataset(dataset_name="test name", molecules=mols, description="Force field test",
+                                      tagline="A test dataset", processors=1, verbose=False)
+    dataset = factory.create_dataset(dataset_name="test name", molecules=mols, description="Force field test",
+                                     tagline="A test dataset", processors=2, verbose=False, executor=executor)
+
+    assert list(dataset.dataset.keys()) == list(expected.dataset.keys())
+    for index, entry in expected.dataset.items():
+        assert dataset.dataset[index].attributes == entry.attributes
+        assert len(dataset.dataset[index].initial_molecules) == len(entry.initial_molecules)
+    assert dataset.metadata.elements == expected.metadata.elements
+
+
+@pytest.mark.parametrize("executor", [
+    pytest.param("threads", id="threads"),
+    pytest.param("processes", id="processes"),
+])
+def test_create_torsiondrive_dataset_parallel_preparation(executor):
+    """
+    Make sure making the torsiondrive entries in the workers gives the same entries and removes the same linear
+    torsions as making them in serial.
+    """
+
+    factory = TorsiondriveDatasetFactory()
+    factory.add_workflow_component(workflow_components.StandardConformerGenerator(max_conformers=1))
+
+    mols = Molecule.from_file(get_data("tautomers_small.smi"), "smi", allow_undefined_stereo=True)
+    mols.extend(Molecule.from_file(get_data("linear_molecules.sdf"), "sdf", allow_undefined_stereo=True))
+    expected = factory.create_dataset(dataset_name="test name", molecules=mols, description="Force field test",
+                                      tagline="A test dataset", processors=1, verbose=False)
+    dataset = factory.create_dataset(dataset_name="test name", molecules=mols, description="Force field test",
+                                     tagline="A test dataset", processors=2, verbose=False, executor=executor)
+
+    assert list(dataset.dataset.keys()) == list(expected.dataset.keys())
+    for index, entry in expected.dataset.items():
+        assert dataset.dataset[index].dihedrals == entry.dihedrals
+        assert dataset.dataset[index].keywords == entry.keywords
+        assert dataset.dataset[index].attributes == entry.attributes
+        # the torsion atom map should not leak into the attributes which rebuild the molecule
+        off_molecule = dataset.dataset[index].get_off_molecule(include_conformers=False)
+        assert off_molecule.n_atoms == len(entry.initial_molecules[0].symbols)
+    assert dataset.n_filtered == expected.n_filtered
+    assert len(dataset.filtered_molecules["LinearTorsionRemoval"].molecules) == len(
+        expected.filtered_molecules["LinearTorsionRemoval"].molecules
+    )
+
+
+def test_create_executor_default():
+    """
+    Make sure a pool of workers is started by default, unless a single processor is asked for.
+    """
+
+    factory = BasicDatasetFactory()
+    factory.add_workflow_component(workflow_components.StandardConformerGenerator(max_conformers=1))
+
+    assert factory._create_executor(processors=1) is None
+
+    for processors in [None, 2]:
+        pool = factory._create_executor(processors=processors)
+        try:
+            assert isinstance(pool, ProcessExecutor)
+        finally:
+            pool.shutdown()
+
+
+def test_estimate_workflow():
+    """
+    Make sure the dry run estimate measures each component and predicts the size of the dataset, when the whole input
+    is sampled the prediction should be exact.
+    """
+
+    factory = OptimizationDatasetFactory()
+    factory.add_workflow_component(workflow_components.MolecularWeightFilter(minimum_weight=0, maximum_weight=100))
+    factory.add_workflow_component(workflow_components.StandardConformerGenerator(max_conformers=2))
+
+    input_file = get_data("tautomers_small.smi")
+    mols = Molecule.from_file(input_file, "smi", allow_undefined_stereo=True)
+    expected = factory.create_dataset(dataset_name="test name", molecules=mols, description="Force field test",
+                                      tagline="A test dataset", processors=1, verbose=False)
+
+    estimate = factory.estimate_workflow(molecules=input_file, sample_size=len(mols), processors=4, seed=1)
+    assert estimate.n_input == len(mols)
+    assert estimate.sample_size == len(mols)
+    assert [component.component_name for component in estimate.components] == [
+        "MolecularWeightFilter", "StandardConformerGenerator"
+    ]
+    weight_estimate = estimate.components[0]
+    assert weight_estimate.n_sampled == len(mols)
+    assert weight_estimate.n_passed == expected.n_molecules
+    assert weight_estimate.n_workers == 4
+    assert estimate.n_molecules == expected.n_molecules
+    assert estimate.n_records == expected.n_records
+    assert estimate.wall_time > 0
+
+    # a smaller sample is scaled up to the whole input
+    estimate = factory.estimate_workflow(molecules=mols, sample_size=2, processors=1, seed=1)
+    assert estimate.n_input == len(mols)
+    assert estimate.sample_size == 2
+    assert estimate.components[0].n_sampled == 2
+
+
+def test_get_workflow_plan():
+    """
+    Make sure pure filters are moved in front of expensive components but never past components which change the
+    molecular graph.
+    """
+
+    factory = BasicDatasetFactory()
+    factory.clear_workflow()
+    factory.add_workflow_component(workflow_components.StandardConformerGenerator())
+    factory.add_workflow_component(workflow_components.RotorFilter(maximum_rotors=1))
+    factory.add_workflow_component(workflow_components.ElementFilter())
+    factory.add_workflow_component(workflow_components.EnumerateTautomers())
+    factory.add_workflow_component(workflow_components.MolecularWeightFilter())
+
+    # without a sample the filters are ordered by cost
+    plan = [component.component_name for component in factory.get_workflow_plan()]
+    assert plan == ["ElementFilter", "RotorFilter", "StandardConformerGenerator", "EnumerateTautomers",
+                    "MolecularWeightFilter"]
+
+    # the element filter removes nothing from the sample so the rotor filter should go first
+    sample = [Molecule.from_smiles(smiles) for smiles in ["CCCCCC", "CCCCCCCC", "CC", "CCO"]]
+    plan = [component.component_name for component in factory.get_workflow_plan(molecules=sample)]
+    assert plan == ["RotorFilter", "ElementFilter", "StandardConformerGenerator", "EnumerateTautomers",
+                    "MolecularWeightFilter"]
+
+
+def test_get_workflow_plan_tag_dihedrals():
+    """
+    Make sure a coverage filter which tags the dihedrals of the molecules is not moved by the planner.
+    """
+
+    factory = BasicDatasetFactory()
+    factory.clear_workflow()
+    factory.add_workflow_component(workflow_components.StandardConformerGenerator())
+    coverage = workflow_components.CoverageFilter()
+    factory.add_workflow_component(coverage)
+
+    assert coverage._is_pure_filter() is True
+    plan = [component.component_name for component in factory.get_workflow_plan()]
+    assert plan == ["CoverageFilter", "StandardConformerGenerator"]
+
+    coverage.tag_dihedrals = True
+    assert coverage._is_pure_filter() is False
+    plan = [component.component_name for component in factory.get_workflow_plan()]
+    assert plan == ["StandardConformerGenerator", "CoverageFilter"]
+
+
+def test_create_dataset_plan_workflow():
+    """
+    Make sure planning the workflow gives the same dataset and records the order used.
+    """
+
+    factory = BasicDatasetFactory()
+    factory.clear_workflow()
+    conformer_generator = workflow_components.StandardConformerGenerator(max_conformers=1)
+    factory.add_workflow_component(conformer_generator)
+    factory.add_workflow_component(workflow_components.MolecularWeightFilter(minimum_weight=0, maximum_weight=80))
+
+    mols = Molecule.from_file(get_data("tautomers_small.smi"), "smi", allow_undefined_stereo=True)
+    expected = factory.create_dataset(dataset_name="test name", molecules=mols, description="Force field test",
+                                      tagline="A test dataset", processors=1, verbose=False)
+    assert "workflow_order" not in expected.provenance
+
+    dataset = factory.create_dataset(dataset_name="test name", molecules=mols, description="Force field test",
+                                     tagline="A test dataset", processors=1, verbose=False, plan_workflow=True)
+    assert dataset.provenance["workflow_order"] == "MolecularWeightFilter,StandardConformerGenerator"
+    assert set(dataset.dataset.keys()) == set(expected.dataset.keys())
+    assert dataset.n_filtered == expected.n_filtered
+
+
+@pytest.mark.parametrize("file_name, batch_size", [
+    pytest.param("tautomers_small.smi", 10, id="smi"),
+    pytest.param("linear_molecules.sdf", 5, id="sdf"),
+])
+def test_iter_molecule_batches(file_name, batch_size):
+    """
+    Make sure molecule files are read lazily in batches and give the same molecules as reading the whole file.
+    """
+
+    file_path = get_data(file_name)
+    expected = Molecule.from_file(file_path, allow_undefined_stereo=True)
+
+    batches = list(iter_molecule_batches(file_path, batch_size=batch_size))
+    assert all(len(batch) == batch_size for batch in batches[:-1])
+    molecules = [molecule for batch in batches for molecule in batch]
+    assert [molecule.to_smiles() for molecule in molecules] == [molecule.to_smiles() for molecule in expected]
+
+
+@pytest.mark.parametrize("factory_type", [
+    pytest.param(BasicDatasetFactory, id="BasicDatasetFactory"),
+    pytest.param(OptimizationDatasetFactory, id="OptimizationDatasetFactory"),
+])
+def test_create_dataset_streaming(factory_type):
+    """
+    Make sure streaming the input in batches gives the same dataset as loading it all at once.
+    """
+
+    factory = factory_type()
+    element_filter = workflow_components.ElementFilter(allowed_elements=["H", "C", "N"])
+    factory.add_workflow_component(element_filter)
+
+    file_path = get_data("tautomers_small.smi")
+    expected = factory.create_dataset(dataset_name="test name", molecules=file_path, description="Force field test",
+                                      tagline="A test dataset", processors=1, verbose=False)
+    dataset = factory.create_dataset(dataset_name="test name", molecules=file_path, description="Force field test",
+                                     tagline="A test dataset", processors=1, verbose=False, batch_size=7)
+    assert set(dataset.dataset.keys()) == set(expected.dataset.keys())
+    assert dataset.n_filtered == expected.n_filtered
+
+
+def test_create_dataset_streaming_duplicates():
+    """
+    Make sure the same molecule in different batches gives one entry holding the conformers of both.
+    """
+
+    factory = BasicDatasetFactory()
+    molecules = []
+    for shift in [0, 1]:
+        molecule = Molecule.from_file(get_data("ethanol.sdf"), "sdf")
+        molecule._conformers[0] = molecule.conformers[0] + shift * unit.angstrom
+        molecules.append(molecule)
+    # the second copy has its atoms in a different order
+    molecules[1] = molecules[1].remap({i: molecules[1].n_atoms - 1 - i for i in range(molecules[1].n_atoms)})
+
+    dataset = factory.create_dataset(dataset_name="test name", molecules=molecules, description="Force field test",
+                                     tagline="A test dataset", processors=1, verbose=False, batch_size=1)
+    assert len(dataset.dataset) == 1
+    assert dataset.n_records == 2
@@ -6,6 +6,7 @@ from typing import Dict, List
 import pytest
 from openforcefield.topology import Molecule
 from openforcefield.utils.toolkits import OpenEyeToolkitWrapper, RDKitToolkitWrapper
+from pydantic import ValidationError
 
 from openff.qcsubmit import workflow_components
 from openff.qcsubmit.datasets import ComponentResult
@@ -289,6 +290,186 @@ def test_weight_filter_apply():
     assert result.n_filtered == 36
 
 
+def test_weight_filter_exact_weights():
+    """
+    Make sure the weight filter uses the rdkit exact weights, including charged molecules.
+    """
+    from rdkit.Chem import Descriptors
+
+    molecules = [Molecule.from_smiles(smiles) for smiles in ["C", "[NH4+]", "CC(=O)[O-]", "c1ccccc1Br", "[Na+].[Cl-]"]]
+    for molecule in molecules:
+        exact_weight = Descriptors.ExactMolWt(molecule.to_rdkit())
+        weight = workflow_components.MolecularWeightFilter(minimum_weight=int(exact_weight), maximum_weight=1000)
+        assert weight.apply(molecules=[molecule], processors=1, verbose=False).n_molecules == 1
+        weight.minimum_weight = int(exact_weight) + 1
+        assert weight.apply(molecules=[molecule], processors=1, verbose=False).n_filtered == 1
+
+
+def test_get_atomic_numbers_empty_molecule():
+    """
+    Make sure the atoms of a batch are matched to the right molecules when some molecules have no atoms.
+    """
+    from openff.qcsubmit.workflow_components.filters import _get_atomic_numbers
+
+    molecules = [Molecule(), Molecule.from_smiles("O"), Molecule(), Molecule.from_smiles("[Na+]")]
+    atomic_numbers, molecule_indices = _get_atomic_numbers(molecules)
+    assert atomic_numbers.tolist() == [8, 1, 1, 11]
+    assert molecule_indices.tolist() == [1, 1, 1, 3]
+
+
+@pytest.mark.parametrize("processors", [1, 2])
+def test_apply_batch(monkeypatch, processors):
+    """
+    Make sure components which declare a batch size are given batches and give the same result as one molecule at a
+    time.
+    """
+
+    molecules = get_container(get_tautomers()).molecules
+    element_filter = workflow_components.ElementFilter(allowed_elements=["H", "C", "N"])
+    n_expected = sum(
+        1 for molecule in molecules if all(atom.atomic_number in [1, 6, 7] for atom in molecule.atoms)
+    )
+
+    batch_sizes = []
+    apply_batch = workflow_components.ElementFilter._apply_batch
+
+    def record_apply_batch(self, batch):
+        batch_sizes.append(len(batch))
+        return apply_batch(self, batch)
+
+    monkeypatch.setattr(workflow_components.ElementFilter, "_apply_batch", record_apply_batch)
+    result = element_filter.apply(molecules, processors=processors, verbose=False)
+    assert result.n_molecules == n_expected
+    assert result.n_filtered == len(molecules) - n_expected
+    if processors == 1:
+        # the workers only record the batches in their own process
+        assert batch_sizes == [len(molecules)]
+
+
+@pytest.mark.parametrize("chunk_size", [
+    pytest.param(None, id="auto chunk size"),
+    pytest.param(1, id="chunk size 1"),
+    pytest.param(7, id="chunk size 7"),
+])
+def test_weight_filter_apply_parallel(chunk_size):
+    """
+    Make sure the results are the same when the molecules are processed in chunks across processes.
+    """
+
+    weight = workflow_components.MolecularWeightFilter()
+    weight.minimum_weight = 0
+    weight.maximum_weight = 80
+
+    molecules = get_tautomers()
+
+    result = weight.apply(molecules, processors=2, chunk_size=chunk_size, verbose=False)
+    assert result.n_molecules == 14
+    assert result.n_filtered == 36
+
+
+@pytest.mark.parametrize("n_molecules, n_workers, expected", [
+    pytest.param(1, 4, 1, id="less molecules than workers"),
+    pytest.param(160, 4, 10, id="exact split"),
+    pytest.param(161, 4, 11, id="remainder"),
+    pytest.param(0, 4, 1, id="no molecules"),
+])
+def test_get_chunk_size(n_molecules, n_workers, expected):
+    """
+    Make sure the automatic chunk size gives roughly four chunks per worker.
+    """
+
+    assert CustomWorkflowComponent._get_chunk_size(n_molecules=n_molecules, n_workers=n_workers) == expected
+
+
+def test_weight_filter_apply_lpt():
+    """
+    Make sure scheduling the largest molecules first gives the same result as input order and reports the saving.
+    """
+
+    weight = workflow_components.MolecularWeightFilter(minimum_weight=0, maximum_weight=80)
+    molecules = get_tautomers()
+
+    result = weight.apply(molecules, processors=2, verbose=False, schedule="lpt")
+    assert result.n_molecules == 14
+    assert result.n_filtered == 36
+    report = result.scheduling_report
+    assert report.n_workers == 2
+    assert report.scheduled_makespan <= report.input_makespan
+    assert report.time_saved >= 0
+
+    assert weight.apply(molecules, processors=2, verbose=False).scheduling_report is None
+
+    with pytest.raises(ValueError):
+        weight.apply(molecules, processors=2, verbose=False, schedule="random")
+
+
+def test_component_result_info_cached(monkeypatch):
+    """
+    Make sure the provenance of a component is only built once per run and rebuilt when its settings change.
+    """
+
+    weight = workflow_components.MolecularWeightFilter()
+    provenance = weight.provenance
+    calls = []
+
+    def counting_provenance(self):
+        calls.append(1)
+        return provenance()
+
+    monkeypatch.setattr(workflow_components.MolecularWeightFilter, "provenance", counting_provenance)
+
+    result = weight.apply(get_tautomers(), processors=1, verbose=False)
+    assert len(calls) == 1
+    assert result.component_provenance == provenance()
+    assert result.component_description == weight.dict()
+
+    weight.maximum_weight = 80
+    result = weight.apply(get_tautomers(), processors=1, verbose=False)
+    assert len(calls) == 2
+    assert result.component_description["maximum_weight"] == 80
+
+
+def test_component_resource_limits():
+    """
+    Make sure the resource limits of a component can be overridden on an instance without changing the class.
+    """
+
+    weight = workflow_components.MolecularWeightFilter()
+    assert weight.resource_limits == weight._properties
+    assert weight.resource_limits.max_workers is None
+
+    weight.set_resource_limits(max_workers=2, licence_seats=1)
+    weight.set_resource_limits(max_memory=500)
+    limits = weight.resource_limits
+    assert limits.max_workers == 2
+    assert limits.licence_seats == 1
+    assert limits.max_memory == 500
+    assert limits.process_parallel == weight._properties.process_parallel
+    assert workflow_components.MolecularWeightFilter().resource_limits.max_workers is None
+
+    with pytest.raises(ValidationError):
+        weight.set_resource_limits(max_workers=0)
+
+
+def test_estimate_cost():
+    """
+    Make sure the default cost estimate grows with the size, flexibility and stereochemistry of the molecule.
+    """
+
+    weight = workflow_components.MolecularWeightFilter()
+    ethane = weight._estimate_cost(Molecule.from_smiles("CC"))
+    butane = weight._estimate_cost(Molecule.from_smiles("CCCC"))
+    cyclobutane = weight._estimate_cost(Molecule.from_smiles("C1CCC1"))
+    chiral = weight._estimate_cost(Molecule.from_smiles("C[C@H](N)CC"))
+
+    assert ethane == 2
+    # one rotatable bond
+    assert butane == 8
+    # no rotatable bonds in the ring
+    assert cyclobutane == 4
+    assert chiral > weight._estimate_cost(Molecule.from_smiles("CC(N)CC", allow_undefined_stereo=True))
+
+
 @pytest.mark.parametrize(
     "data",
     [
@@ -1,5 +1,20 @@
-from typing import Dict, Generator, List, Union
+import os
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
+import numpy as np
 from openforcefield import topology as off
 from openforcefield.utils.toolkits import (
     RDKitToolkitWrapper,
@@ -101,6 +116,436 @@ def chunk_generator(iterable: List, chunk_size: int) -> Generator[List, None, No
         yield iterable[i : i + chunk_size]
 
 
+class MoleculeRecord(NamedTuple):
+    """
+    A compact copy of a molecule used to send it between processes.
+
+    The graph is held in a few small numpy arrays and all conformers in one contiguous float64 array in angstrom, which
+    pickles as a handful of raw buffers rather than a python object for every atom, bond and conformer.
+    """
+
+    name: str
+    atomic_numbers: np.ndarray
+    formal_charges: np.ndarray
+    is_aromatic: np.ndarray
+    atom_stereo: Optional[List[Optional[str]]]
+    atom_names: Optional[List[str]]
+    bonds: np.ndarray
+    bond_orders: np.ndarray
+    bond_aromatic: np.ndarray
+    bond_stereo: Optional[List[Optional[str]]]
+    fractional_bond_orders: Optional[np.ndarray]
+    conformers: Optional[np.ndarray]
+    partial_charges: Optional[np.ndarray]
+    properties: Dict[str, Any]
+
+    @property
+    def n_conformers(self) -> int:
+        """
+        Returns:
+            The number of conformers held by the record.
+        """
+        return 0 if self.conformers is None else self.conformers.shape[0]
+
+
+def _get_value(quantity: Any, value_unit: Any) -> Any:
+    """
+    Strip the unit from a quantity, plain numbers are returned as they are.
+    """
+    if hasattr(quantity, "value_in_unit"):
+        return quantity.value_in_unit(value_unit)
+    return quantity
+
+
+def pack_molecule(molecule: off.Molecule) -> MoleculeRecord:
+    """
+    Pack a molecule into a compact record which can be sent cheaply between processes.
+
+    Parameters:
+        molecule: The molecule which should be packed.
+
+    Returns:
+        The record which can be turned back into the molecule with `unpack_molecule`.
+    """
+    from simtk import unit
+
+    atoms, bonds = molecule.atoms, molecule.bonds
+
+    atom_stereo = [atom.stereochemistry for atom in atoms]
+    atom_names = [atom.name for atom in atoms]
+    bond_stereo = [bond.stereochemistry for bond in bonds]
+    fractional_bond_orders = [bond.fractional_bond_order for bond in bonds]
+
+    if molecule.n_conformers != 0:
+        conformers = np.array(
+            [
+                conformer.value_in_unit(unit.angstrom)
+                for conformer in molecule.conformers
+            ],
+            dtype=np.float64,
+        )
+    else:
+        conformers = None
+
+    if molecule.partial_charges is not None:
+        partial_charges = np.asarray(
+            molecule.partial_charges.value_in_unit(unit.elementary_charge),
+            dtype=np.float64,
+        )
+    else:
+        partial_charges = None
+
+    return MoleculeRecord(
+        name=molecule.name,
+        atomic_numbers=np.array([atom.atomic_number for atom in atoms], dtype=np.int16),
+        formal_charges=np.array(
+            [_get_value(atom.formal_charge, unit.elementary_charge) for atom in atoms],
+            dtype=np.int8,
+        ),
+        is_aromatic=np.array([atom.is_aromatic for atom in atoms], dtype=bool),
+        atom_stereo=atom_stereo if any(atom_stereo) else None,
+        atom_names=atom_names if any(atom_names) else None,
+        bonds=np.array(
+            [(bond.atom1_index, bond.atom2_index) for bond in bonds], dtype=np.int32
+        ).reshape(-1, 2),
+        bond_orders=np.array([bond.bond_order for bond in bonds], dtype=np.int8),
+        bond_aromatic=np.array([bond.is_aromatic for bond in bonds], dtype=bool),
+        bond_stereo=bond_stereo if any(bond_stereo) else None,
+        fractional_bond_orders=np.array(fractional_bond_orders, dtype=np.float64)
+        if any(order is not None for order in fractional_bond_orders)
+        else None,
+        conformers=conformers,
+        partial_charges=partial_charges,
+        properties=dict(molecule.properties),
+    )
+
+
+def unpack_molecule(record: Union[MoleculeRecord, off.Molecule]) -> off.Molecule:
+    """
+    Rebuild a molecule from its compact record, this does not need a toolkit and keeps the atom order.
+
+    Parameters:
+        record: The packed molecule, molecules which are not packed are returned as they are.
+
+    Returns:
+        The molecule.
+    """
+    from simtk import unit
+
+    if not isinstance(record, MoleculeRecord):
+        return record
+
+    molecule = off.Molecule()
+    molecule.name = record.name
+    for i in range(len(record.atomic_numbers)):
+        molecule.add_atom(
+            atomic_number=int(record.atomic_numbers[i]),
+            formal_charge=int(record.formal_charges[i]),
+            is_aromatic=bool(record.is_aromatic[i]),
+            stereochemistry=record.atom_stereo[i] if record.atom_stereo else None,
+            name=record.atom_names[i] if record.atom_names else None,
+        )
+
+    for i, (atom1, atom2) in enumerate(record.bonds):
+        fractional_bond_order = None
+        if record.fractional_bond_orders is not None and not np.isnan(
+            record.fractional_bond_orders[i]
+        ):
+            fractional_bond_order = float(record.fractional_bond_orders[i])
+        molecule.add_bond(
+            atom1=int(atom1),
+            atom2=int(atom2),
+            bond_order=int(record.bond_orders[i]),
+            is_aromatic=bool(record.bond_aromatic[i]),
+            stereochemistry=record.bond_stereo[i] if record.bond_stereo else None,
+            fractional_bond_order=fractional_bond_order,
+        )
+
+    if record.conformers is not None:
+        for conformer in record.conformers:
+            molecule.add_conformer(unit.Quantity(conformer, unit.angstrom))
+
+    if record.partial_charges is not None:
+        molecule.partial_charges = unit.Quantity(
+            record.partial_charges, unit.elementary_charge
+        )
+
+    molecule.properties.update(record.properties)
+    return molecule
+
+
+class MoleculeView(Sequence):
+    """
+    A read only sequence over molecules held as compact records, each molecule is only rebuilt when it is accessed so
+    iterating over a large set of molecules does not hold them all in memory at once.
+
+    Note:
+        The molecules are rebuilt on every access so changes made to them are not kept by the view.
+    """
+
+    __slots__ = ["records"]
+
+    def __init__(self, records: List[Union[off.Molecule, MoleculeRecord]]):
+        self.records = records
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[off.Molecule, "MoleculeView"]:
+        if isinstance(index, slice):
+            return MoleculeView(self.records[index])
+        return unpack_molecule(self.records[index])
+
+    def __iter__(self) -> Iterator[off.Molecule]:
+        return (unpack_molecule(record) for record in self.records)
+
+    def __add__(self, other: Iterable[off.Molecule]) -> List[off.Molecule]:
+        return list(self) + list(other)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, (list, tuple, MoleculeView)):
+            return NotImplemented
+        return len(self) == len(other) and all(
+            molecule == other_molecule for molecule, other_molecule in zip(self, other)
+        )
+
+    def __repr__(self) -> str:
+        return f"MoleculeView(n_molecules={len(self)})"
+
+
+def pack_molecules(
+    molecules: Union[List[Union[off.Molecule, MoleculeRecord]], MoleculeView]
+) -> List[MoleculeRecord]:
+    """
+    Pack a list of molecules, records which are already packed are passed through.
+    """
+    if isinstance(molecules, MoleculeView):
+        # take the records directly rather than rebuilding the molecules
+        molecules = molecules.records
+    return [
+        molecule if isinstance(molecule, MoleculeRecord) else pack_molecule(molecule)
+        for molecule in molecules
+    ]
+
+
+def unpack_molecules(
+    records: List[Union[off.Molecule, MoleculeRecord]]
+) -> List[off.Molecule]:
+    """
+    Rebuild a list of packed molecules, molecules which are not packed are passed through.
+    """
+    return [unpack_molecule(record) for record in records]
+
+
+def _get_streaming_format(file_path: str) -> Optional[str]:
+    """
+    Get the format of a molecule file which can be read in records without loading the whole file, or `None` if the
+    file has to be read in one go.
+    """
+    extension = os.path.splitext(file_path)[-1].lower()
+    if extension in [".smi", ".smiles"]:
+        return "smi"
+    if extension in [".sdf", ".sd", ".mol"]:
+        return "sdf"
+    return None
+
+
+def _read_molecule_records(
+    file_path: str, file_format: str, records: List[str]
+) -> List[off.Molecule]:
+    """
+    Parse a batch of records from a molecule file with the toolkit by writing them to a temporary file of the same
+    format.
+    """
+    import tempfile
+
+    handle, temp_path = tempfile.mkstemp(suffix=f".{file_format}")
+    try:
+        with os.fdopen(handle, "w") as batch_file:
+            batch_file.write("".join(records))
+        molecules = off.Molecule.from_file(
+            file_path=temp_path, file_format=file_format, allow_undefined_stereo=True
+        )
+    finally:
+        os.remove(temp_path)
+
+    if not isinstance(molecules, list):
+        molecules = [molecules]
+    return molecules
+
+
+def iter_molecule_file(
+    file_path: str, batch_size: int
+) -> Generator[List[off.Molecule], None, None]:
+    """
+    Lazily read the molecules in a file in batches so that only one batch is held in memory.
+
+    Parameters:
+        file_path: The molecule file, SMILES and SDF files are read a batch of records at a time while other formats
+            have to be loaded in one go by the toolkit and are then split into batches.
+        batch_size: The number of molecules in each batch.
+    """
+    file_format = _get_streaming_format(file_path)
+    if file_format is None:
+        molecules = off.Molecule.from_file(
+            file_path=file_path, allow_undefined_stereo=True
+        )
+        if not isinstance(molecules, list):
+            molecules = [molecules]
+        yield from chunk_generator(molecules, batch_size)
+        return
+
+    with open(file_path) as molecule_file:
+        records = []
+        for record in _iter_records(molecule_file, file_format):
+            records.append(record)
+            if len(records) == batch_size:
+                yield _read_molecule_records(file_path, file_format, records)
+                records = []
+
+        if records:
+            yield _read_molecule_records(file_path, file_format, records)
+
+
+def _iter_records(lines: Iterable[str], file_format: str) -> Generator[str, None, None]:
+    """
+    Split the lines of a SMILES or SDF file into the text of each molecule record.
+    """
+    record = []
+    for line in lines:
+        if file_format == "smi":
+            if line.strip():
+                yield line if line.endswith("\n") else line + "\n"
+        else:
+            record.append(line)
+            if line.strip() == "$$$$":
+                yield "".join(record)
+                record = []
+
+    # an sdf file does not need to end with a record separator
+    if "".join(record).strip():
+        yield "".join(record)
+
+
+def get_molecule_file_ranges(
+    file_path: str, range_size: int
+) -> List[Tuple[str, int, Optional[int]]]:
+    """
+    Split a molecule file into byte ranges which start and end on record boundaries, so that the ranges can be read
+    in parallel.
+
+    Parameters:
+        file_path: The molecule file, only SMILES and SDF files can be split.
+        range_size: The rough size in bytes of each range.
+
+    Returns:
+        The file path, start and end offset of each range, files which can not be split are given as a single range
+        with no end.
+    """
+    file_format = _get_streaming_format(file_path)
+    if file_format is None:
+        return [(file_path, 0, None)]
+
+    file_size = os.path.getsize(file_path)
+    boundaries = [0]
+    with open(file_path, "rb") as molecule_file:
+        offset = range_size
+        while offset < file_size:
+            molecule_file.seek(offset)
+            if file_format == "smi":
+                # move to the start of the next line
+                molecule_file.readline()
+            else:
+                # move past the end of the next record
+                for line in iter(molecule_file.readline, b""):
+                    if line.strip() == b"$$$$":
+                        break
+            boundary = molecule_file.tell()
+            if boundary >= file_size:
+                break
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+            offset = max(boundary, offset) + range_size
+
+    boundaries.append(file_size)
+    return [(file_path, start, end) for start, end in zip(boundaries, boundaries[1:])]
+
+
+def read_molecule_range(
+    file_path: str, start: int = 0, end: Optional[int] = None
+) -> List[off.Molecule]:
+    """
+    Read the molecules in a byte range of a molecule file made by `get_molecule_file_ranges`.
+
+    Parameters:
+        file_path: The molecule file.
+        start: The offset of the first record in the range.
+        end: The offset after the last record in the range, None will read the whole file with the toolkit.
+    """
+    if end is None:
+        molecules = off.Molecule.from_file(
+            file_path=file_path, allow_undefined_stereo=True
+        )
+        return molecules if isinstance(molecules, list) else [molecules]
+
+    with open(file_path, "rb") as molecule_file:
+        molecule_file.seek(start)
+        text = molecule_file.read(end - start).decode()
+
+    file_format = _get_streaming_format(file_path)
+    records = list(_iter_records(text.splitlines(keepends=True), file_format))
+    if not records:
+        return []
+    return _read_molecule_records(file_path, file_format, records)
+
+
+def _get_file_paths(molecules: str) -> List[str]:
+    """
+    Get the molecule files of a workflow input which is either a single file or a directory of files.
+    """
+    if os.path.isdir(molecules):
+        return [
+            os.path.join(molecules, file_name)
+            for file_name in sorted(os.listdir(molecules))
+        ]
+    return [molecules]
+
+
+def iter_molecule_batches(
+    molecules: Union[str, off.Molecule, List[off.Molecule]], batch_size: int
+) -> Generator[List[off.Molecule], None, None]:
+    """
+    Split the input of a workflow into batches of molecules, files are read lazily so that inputs larger than memory
+    can be streamed through a workflow.
+
+    Parameters:
+        molecules: A molecule, a list of molecules, a molecule file or a directory of molecule files.
+        batch_size: The number of molecules in each batch.
+    """
+    import itertools
+
+    if isinstance(molecules, off.Molecule):
+        molecules = [molecules]
+
+    if not isinstance(molecules, str):
+        yield from chunk_generator(molecules, batch_size)
+        return
+
+    stream = (
+        molecule
+        for file_path in _get_file_paths(molecules)
+        for batch in iter_molecule_file(file_path, batch_size)
+        for molecule in batch
+    )
+    while True:
+        batch = list(itertools.islice(stream, batch_size))
+        if not batch:
+            break
+        yield batch
+
+
 def update_specification_and_metadata(
     dataset: Union["BasicDataset", "OptimizationDataset", "TorsiondriveDataset"], client
 ) -> Union["BasicDataset", "OptimizationDataset", "TorsiondriveDataset"]:
@@ -163,3 +608,579 @@ def update_specification_and_metadata(
             )
 
     return dataset
+
+
+def sample_molecules(
+    molecules: Union[str, off.Molecule, List[off.Molecule]],
+    sample_size: int,
+    seed: Optional[int] = None,
+) -> Tuple[List[off.Molecule], int]:
+    """
+    Draw a random sample from the input of a workflow, SMILES and SDF files are only scanned as text and just the
+    sampled records are parsed so large files can be sampled cheaply.
+
+    Parameters:
+        molecules: A molecule, a list of molecules, a molecule file or a directory of molecule files.
+        sample_size: The largest number of molecules which should be drawn.
+        seed: The seed of the random number generator, used to draw the same sample again.
+
+    Returns:
+        The sampled molecules in input order and the total number of input molecules.
+    """
+    import random
+
+    rng = random.Random(seed)
+
+    if isinstance(molecules, off.Molecule):
+        molecules = [molecules]
+
+    if not isinstance(molecules, str):
+        positions = sorted(
+            rng.sample(range(len(molecules)), min(sample_size, len(molecules)))
+        )
+        return [molecules[position] for position in positions], len(molecules)
+
+    # reservoir sample the records holding their position so the sample keeps the input order
+    reservoir = []
+    n_input = 0
+
+    def add_item(item: Tuple[str, Optional[str], Any]) -> None:
+        nonlocal n_input
+        if len(reservoir) < sample_size:
+            reservoir.append((n_input, item))
+        else:
+            position = rng.randint(0, n_input)
+            if position < sample_size:
+                reservoir[position] = (n_input, item)
+        n_input += 1
+
+    for file_path in _get_file_paths(molecules):
+        file_format = _get_streaming_format(file_path)
+        if file_format is None:
+            for molecule in read_molecule_range(file_path):
+                add_item((file_path, None, molecule))
+        else:
+            with open(file_path) as molecule_file:
+                for record in _iter_records(molecule_file, file_format):
+                    add_item((file_path, file_format, record))
+
+    sample = []
+    for _, (file_path, file_format, item) in sorted(reservoir, key=lambda x: x[0]):
+        if file_format is None:
+            sample.append(item)
+        else:
+            sample.extend(_read_molecule_records(file_path, file_format, [item]))
+
+    return sample, n_input
+
+
+def _get_cmiles_toolkit() -> Optional[str]:
+    """
+    Get the name of the toolkit the openforcefield toolkit would use to make smiles and inchi, so that the identifiers
+    made from a single conversion match those of the molecule methods.
+    """
+    from openforcefield.utils.toolkits import (
+        GLOBAL_TOOLKIT_REGISTRY,
+        OpenEyeToolkitWrapper,
+    )
+
+    for toolkit in GLOBAL_TOOLKIT_REGISTRY.registered_toolkits:
+        if isinstance(toolkit, OpenEyeToolkitWrapper):
+            return "openeye"
+        if isinstance(toolkit, RDKitToolkitWrapper):
+            return "rdkit"
+    return None
+
+
+def _get_rdkit_cmiles(molecule: off.Molecule) -> Dict[str, str]:
+    """
+    Make the smiles and inchi identifiers of the molecule from one RDKit molecule.
+    """
+    from rdkit import Chem
+
+    rdmol = molecule.to_rdkit()
+    heavy_rdmol = Chem.RemoveHs(rdmol)
+    mapped_rdmol = Chem.Mol(rdmol)
+    for atom in mapped_rdmol.GetAtoms():
+        # the mapping must start from 1, as RDKit uses 0 to represent no mapping
+        atom.SetAtomMapNum(atom.GetIdx() + 1)
+
+    standard_inchi = Chem.MolToInchi(rdmol)
+    return {
+        "canonical_smiles": Chem.MolToSmiles(
+            heavy_rdmol, isomericSmiles=False, allHsExplicit=False
+        ),
+        "canonical_isomeric_smiles": Chem.MolToSmiles(
+            heavy_rdmol, isomericSmiles=True, allHsExplicit=False
+        ),
+        "canonical_explicit_hydrogen_smiles": Chem.MolToSmiles(
+            rdmol, isomericSmiles=False, allHsExplicit=True
+        ),
+        "canonical_isomeric_explicit_hydrogen_smiles": Chem.MolToSmiles(
+            rdmol, isomericSmiles=True, allHsExplicit=True
+        ),
+        "canonical_isomeric_explicit_hydrogen_mapped_smiles": Chem.MolToSmiles(
+            mapped_rdmol, isomericSmiles=True, allHsExplicit=True
+        ),
+        "standard_inchi": standard_inchi,
+        "inchi_key": Chem.InchiToInchiKey(standard_inchi),
+    }
+
+
+def _get_openeye_cmiles(molecule: off.Molecule) -> Dict[str, str]:
+    """
+    Make the smiles and inchi identifiers of the molecule from one OpenEye molecule.
+    """
+    from openeye import oechem
+
+    oemol = molecule.to_openeye()
+    heavy_oemol = oechem.OEMol(oemol)
+    oechem.OESuppressHydrogens(heavy_oemol)
+    mapped_oemol = oechem.OEMol(oemol)
+    for atom in mapped_oemol.GetAtoms():
+        atom.SetMapIdx(atom.GetIdx() + 1)
+
+    canonical = (
+        oechem.OESMILESFlag_Canonical
+        | oechem.OESMILESFlag_Isotopes
+        | oechem.OESMILESFlag_RGroups
+    )
+    isomeric = (
+        canonical | oechem.OESMILESFlag_AtomStereo | oechem.OESMILESFlag_BondStereo
+    )
+    return {
+        "canonical_smiles": oechem.OECreateSmiString(heavy_oemol, canonical),
+        "canonical_isomeric_smiles": oechem.OECreateSmiString(heavy_oemol, isomeric),
+        "canonical_explicit_hydrogen_smiles": oechem.OECreateSmiString(
+            oemol, canonical | oechem.OESMILESFlag_Hydrogens
+        ),
+        "canonical_isomeric_explicit_hydrogen_smiles": oechem.OECreateSmiString(
+            oemol, isomeric | oechem.OESMILESFlag_Hydrogens
+        ),
+        "canonical_isomeric_explicit_hydrogen_mapped_smiles": oechem.OECreateSmiString(
+            mapped_oemol,
+            isomeric | oechem.OESMILESFlag_Hydrogens | oechem.OESMILESFlag_AtomMaps,
+        ),
+        "standard_inchi": oechem.OEMolToSTDInChI(oemol),
+        "inchi_key": oechem.OEMolToSTDInChIKey(oemol),
+    }
+
+
+def _make_cmiles(molecule: off.Molecule) -> Dict[str, str]:
+    """
+    Make every cmiles identifier of the molecule without using the identifier cache.
+    """
+    toolkit = _get_cmiles_toolkit()
+    if toolkit == "openeye":
+        cmiles = _get_openeye_cmiles(molecule)
+    elif toolkit == "rdkit":
+        cmiles = _get_rdkit_cmiles(molecule)
+    else:
+        # let the toolkit registry find a backend for each identifier
+        mapped_molecule = off.Molecule(molecule)
+        mapped_molecule.properties.pop("atom_map", None)
+        cmiles = {
+            "canonical_smiles": molecule.to_smiles(
+                isomeric=False, explicit_hydrogens=False, mapped=False
+            ),
+            "canonical_isomeric_smiles": molecule.to_smiles(
+                isomeric=True, explicit_hydrogens=False, mapped=False
+            ),
+            "canonical_explicit_hydrogen_smiles": molecule.to_smiles(
+                isomeric=False, explicit_hydrogens=True, mapped=False
+            ),
+            "canonical_isomeric_explicit_hydrogen_smiles": molecule.to_smiles(
+                isomeric=True, explicit_hydrogens=True, mapped=False
+            ),
+            "canonical_isomeric_explicit_hydrogen_mapped_smiles": mapped_molecule.to_smiles(
+                isomeric=True, explicit_hydrogens=True, mapped=True
+            ),
+            "standard_inchi": molecule.to_inchi(fixed_hydrogens=False),
+            "inchi_key": molecule.to_inchikey(fixed_hydrogens=False),
+        }
+
+    cmiles["molecular_formula"] = molecule.hill_formula
+    return cmiles
+
+
+class IdentifierCache:
+    """
+    A bounded least recently used cache of the identifiers of molecules, such as the InChIKey and cmiles, so that the
+    identifiers of a molecule seen many times while building a dataset are only made once by the toolkit.
+
+    Molecules are keyed by a cheap fingerprint of their graph and atom order made with `get_graph_key`, though any
+    string which fixes the graph and atom order such as a mapped smiles can be used. Keys are prefixed by their kind,
+    for example `graph:` or `mapped_smiles:`, so different kinds of key never collide in the cache. One cache is shared
+    by the whole process through `IDENTIFIER_CACHE`.
+    """
+
+    def __init__(self, max_size: Optional[int] = 100000):
+        """
+        Parameters:
+            max_size: The most molecules whose identifiers are held at once, None means no limit.
+        """
+        import threading
+        from collections import OrderedDict
+
+        self.max_size: Optional[int] = max_size
+        self.hits: int = 0
+        self.misses: int = 0
+        self._identifiers: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # components may be ran in threads which share the cache
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"IdentifierCache(max_size={self.max_size}, size={len(self)}, hit_rate={self.hit_rate:.2f})"
+
+    def __len__(self):
+        return len(self._identifiers)
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Returns:
+            The fraction of look ups which were found in the cache.
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(
+        self, key: str, identifier: str, function: Optional[Callable[[], Any]] = None
+    ) -> Any:
+        """
+        Get an identifier of a molecule, making it with the function if it is not cached.
+
+        Parameters:
+            key: The key of the molecule, see `get_graph_key`.
+            identifier: The name of the identifier, for example `inchikey`.
+            function: Makes the identifier when it is not cached, if this is not given nothing is stored.
+
+        Returns:
+            The identifier of the molecule, or `None` if it is not cached and no function is given.
+        """
+        with self._lock:
+            identifiers = self._identifiers.get(key)
+            if identifiers is not None and identifier in identifiers:
+                self._identifiers.move_to_end(key)
+                self.hits += 1
+                return identifiers[identifier]
+            self.misses += 1
+
+        if function is None:
+            return None
+        value = function()
+        self.put(key, identifier, value)
+        return value
+
+    def put(self, key: str, identifier: str, value: Any) -> None:
+        """
+        Store an identifier of a molecule, the least recently used molecules are removed once the cache is full.
+
+        Parameters:
+            key: The key of the molecule, see `get_graph_key`.
+            identifier: The name of the identifier.
+            value: The identifier of the molecule.
+        """
+        with self._lock:
+            self._identifiers.setdefault(key, {})[identifier] = value
+            self._identifiers.move_to_end(key)
+            if self.max_size is not None:
+                while len(self._identifiers) > self.max_size:
+                    self._identifiers.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Remove every identifier and reset the statistics.
+        """
+        with self._lock:
+            self._identifiers.clear()
+            self.hits = self.misses = 0
+
+
+IDENTIFIER_CACHE = IdentifierCache()
+
+
+def get_graph_key(molecule: off.Molecule) -> str:
+    """
+    Make a cheap fingerprint of the chemical graph of the molecule in its atom order, this covers everything the
+    identifiers depend on such as charges, bond orders and stereochemistry but not the conformers or properties.
+
+    Parameters:
+        molecule: The molecule which should be keyed.
+
+    Returns:
+        The fingerprint prefixed with `graph:` for use as an `IdentifierCache` key.
+    """
+    import hashlib
+
+    from simtk import unit
+
+    atoms = [
+        (
+            atom.atomic_number,
+            _get_value(atom.formal_charge, unit.elementary_charge),
+            atom.is_aromatic,
+            atom.stereochemistry,
+        )
+        for atom in molecule.atoms
+    ]
+    bonds = [
+        (
+            bond.atom1_index,
+            bond.atom2_index,
+            bond.bond_order,
+            bond.is_aromatic,
+            bond.stereochemistry,
+        )
+        for bond in molecule.bonds
+    ]
+    return f"graph:{hashlib.sha1(repr((atoms, bonds)).encode()).hexdigest()}"
+
+
+def get_inchikey(molecule: off.Molecule, fixed_hydrogens: bool = False) -> str:
+    """
+    Get the InChIKey of the molecule through the process wide identifier cache.
+
+    Parameters:
+        molecule: The molecule the InChIKey should be made for.
+        fixed_hydrogens: If the fixed hydrogen layer should be included, this tells tautomers apart.
+    """
+    return IDENTIFIER_CACHE.get(
+        get_graph_key(molecule),
+        "fixed_inchikey" if fixed_hydrogens else "inchikey",
+        lambda: molecule.to_inchikey(fixed_hydrogens=fixed_hydrogens),
+    )
+
+
+def get_cmiles(molecule: off.Molecule) -> Dict[str, str]:
+    """
+    Make every cmiles identifier of the molecule, the molecule is converted to the backend toolkit once and all of the
+    smiles and inchi are made from that one object rather than converting it again for each identifier. The
+    identifiers are held in the process wide identifier cache.
+
+    Parameters:
+        molecule: The molecule the identifiers should be made for.
+
+    Returns:
+        The identifiers keyed by the fields of [MoleculeAttributes][qcsubmit.common_structures.MoleculeAttributes].
+
+    Note:
+        The mapped smiles maps every atom in the order of the molecule unless the molecule has an `atom_map` property,
+        in which case only the mapped atoms are labelled as in `Molecule.to_smiles`.
+    """
+    key = get_graph_key(molecule)
+    cmiles = IDENTIFIER_CACHE.get(key, "cmiles", lambda: _make_cmiles(molecule))
+    IDENTIFIER_CACHE.put(key, "inchikey", cmiles["inchi_key"])
+    return _apply_atom_map(molecule, cmiles)
+
+
+def _apply_atom_map(molecule: off.Molecule, cmiles: Dict[str, str]) -> Dict[str, str]:
+    """
+    Copy the cached identifiers of a molecule, making the mapped smiles from any `atom_map` property of the molecule
+    as the cached mapped smiles always maps every atom.
+    """
+    cmiles = dict(cmiles)
+    if "atom_map" in molecule.properties:
+        cmiles[
+            "canonical_isomeric_explicit_hydrogen_mapped_smiles"
+        ] = molecule.to_smiles(isomeric=True, explicit_hydrogens=True, mapped=True)
+    return cmiles
+
+
+def get_bulk_cmiles(
+    molecules: List[off.Molecule], processors: Optional[int] = 1
+) -> List[Dict[str, str]]:
+    """
+    Make the cmiles identifiers of a list of molecules, see `get_cmiles`. Only molecules which are not in the
+    identifier cache are sent to the workers.
+
+    Parameters:
+        molecules: The molecules the identifiers should be made for.
+        processors: The number of processes to use, None will use all cores.
+
+    Returns:
+        The identifiers of each molecule in the order of the input.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    processors = processors or os.cpu_count()
+    if processors == 1 or len(molecules) < 2:
+        return [get_cmiles(molecule) for molecule in molecules]
+
+    keys = [get_graph_key(molecule) for molecule in molecules]
+    cmiles = [IDENTIFIER_CACHE.get(key, "cmiles") for key in keys]
+    # only make the identifiers of each new molecule once
+    missing = {}
+    for key, molecule, identifiers in zip(keys, molecules, cmiles):
+        if identifiers is None:
+            missing.setdefault(key, molecule)
+
+    if missing:
+        # send a few chunks to each worker to cut the overhead of pickling single molecules
+        chunk_size = max(len(missing) // (processors * 4), 1)
+        with ProcessPoolExecutor(max_workers=processors) as pool:
+            new_cmiles = dict(
+                zip(
+                    missing,
+                    pool.map(_make_cmiles, missing.values(), chunksize=chunk_size),
+                )
+            )
+        for key, identifiers in new_cmiles.items():
+            IDENTIFIER_CACHE.put(key, "cmiles", identifiers)
+            IDENTIFIER_CACHE.put(key, "inchikey", identifiers["inchi_key"])
+        cmiles = [
+            new_cmiles[key] if identifiers is None else identifiers
+            for key, identifiers in zip(keys, cmiles)
+        ]
+
+    return [
+        _apply_atom_map(molecule, identifiers)
+        for molecule, identifiers in zip(molecules, cmiles)
+    ]
+
+
+def _mix_labels(labels: np.ndarray) -> np.ndarray:
+    """
+    Scramble an array of 64 bit labels with the splitmix64 finaliser so that sums of labels rarely collide.
+    """
+    with np.errstate(over="ignore"):
+        labels = labels + np.uint64(0x9E3779B97F4A7C15)
+        labels = (labels ^ (labels >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        labels = (labels ^ (labels >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return labels ^ (labels >> np.uint64(31))
+
+
+def get_graph_hash(molecule: off.Molecule) -> str:
+    """
+    Make a Weisfeiler-Lehman hash of the molecular graph with numpy, this does not depend on the atom order and needs
+    no toolkit so it is much cheaper than an InChIKey.
+
+    Each atom starts with a label from its element, formal charge, aromaticity and stereochemistry, every round the
+    label of each atom is mixed with the labels of its neighbours and the bonds to them until the number of distinct
+    labels stops growing. The hash is made from the sorted final labels.
+
+    Parameters:
+        molecule: The molecule which should be hashed.
+
+    Returns:
+        The hex digest of the hash.
+
+    Note:
+        Different graphs can share a Weisfeiler-Lehman hash, for example some highly symmetric ring systems, so
+        molecules with the same hash still need an isomorphism check to be sure they are the same.
+    """
+    import hashlib
+
+    from simtk import unit
+
+    stereo_labels = {None: 0, "R": 1, "S": 2, "E": 3, "Z": 4}
+    labels = np.array(
+        [
+            (
+                atom.atomic_number * 1000
+                + (int(_get_value(atom.formal_charge, unit.elementary_charge)) + 10)
+                * 10
+                + int(atom.is_aromatic) * 5
+            )
+            * 8
+            + stereo_labels.get(atom.stereochemistry, 7)
+            for atom in molecule.atoms
+        ],
+        dtype=np.uint64,
+    )
+    bonds = molecule.bonds
+    if bonds:
+        atom_pairs = np.array(
+            [(bond.atom1_index, bond.atom2_index) for bond in bonds], dtype=np.int64
+        )
+        bond_labels = _mix_labels(
+            np.array(
+                [
+                    (bond.bond_order * 2 + int(bond.is_aromatic)) * 8
+                    + stereo_labels.get(bond.stereochemistry, 7)
+                    for bond in bonds
+                ],
+                dtype=np.uint64,
+            )
+        )
+        # each bond is seen from both of its atoms
+        sources = np.concatenate([atom_pairs[:, 0], atom_pairs[:, 1]])
+        targets = np.concatenate([atom_pairs[:, 1], atom_pairs[:, 0]])
+        bond_labels = np.concatenate([bond_labels, bond_labels])
+    else:
+        sources = targets = np.zeros(0, dtype=np.int64)
+
+    labels = _mix_labels(labels)
+    n_distinct = len(np.unique(labels))
+    for _ in range(len(labels)):
+        neighbours = np.zeros_like(labels)
+        with np.errstate(over="ignore"):
+            # a sum is independent of the order of the neighbours
+            np.add.at(neighbours, sources, _mix_labels(labels[targets] ^ bond_labels))
+            new_labels = _mix_labels(labels * np.uint64(31) + neighbours)
+        new_distinct = len(np.unique(new_labels))
+        labels = new_labels
+        if new_distinct == n_distinct:
+            break
+        n_distinct = new_distinct
+
+    hasher = hashlib.sha1()
+    hasher.update(np.sort(labels).tobytes())
+    hasher.update(np.array([len(bonds)], dtype=np.int64).tobytes())
+    return hasher.hexdigest()
+
+
+# the ways molecules can be de-duplicated, see `get_molecule_hash`
+MOLECULE_HASH_METHODS: Tuple[str, ...] = ("inchikey", "smiles", "graph")
+
+
+def get_canonical_order(molecule: off.Molecule) -> Tuple[str, List[int]]:
+    """
+    Get the canonical smiles and the canonical rank of each atom of the molecule using RDKit, two molecules with the
+    same canonical smiles can be aligned by matching the atoms with the same rank.
+
+    Parameters:
+        molecule: The molecule which should be ordered.
+    """
+    from rdkit import Chem
+
+    rdkit_molecule = molecule.to_rdkit()
+    ranks = list(Chem.CanonicalRankAtoms(rdkit_molecule, breakTies=True))
+    return Chem.MolToSmiles(rdkit_molecule), ranks
+
+
+def get_molecule_hash(
+    molecule: off.Molecule, hash_method: str = "inchikey"
+) -> Tuple[str, Optional[Tuple[str, List[int]]]]:
+    """
+    Make the key used to de-duplicate the molecule.
+
+    Parameters:
+        molecule: The molecule which should be keyed.
+        hash_method: The type of key to make, one of
+
+            - `inchikey` the fixed hydrogen InChIKey, this is the default and matches molecules the way InChI does.
+            - `smiles` the canonical isomeric smiles, from RDKit when it is installed so the canonical atom order comes
+              with it and duplicates can be aligned without an isomorphism check.
+            - `graph` a Weisfeiler-Lehman hash of the graph made with numpy, see `get_graph_hash`.
+
+    Returns:
+        The key of the molecule and its canonical order if it was made along the way.
+
+    Raises:
+        ValueError: If the hash method is not supported.
+    """
+    if hash_method == "inchikey":
+        return get_inchikey(molecule, fixed_hydrogens=True), None
+    if hash_method == "smiles":
+        if not RDKitToolkitWrapper.is_available():
+            return molecule.to_smiles(isomeric=True, explicit_hydrogens=True), None
+        # the canonical smiles and atom ranks come from the same conversion
+        canonical_order = get_canonical_order(molecule)
+        return canonical_order[0], canonical_order
+    if hash_method == "graph":
+        return get_graph_hash(molecule), None
+
+    raise ValueError(
+        f"The hash method {hash_method} is not supported, please chose from {list(MOLECULE_HASH_METHODS)}."
+    )
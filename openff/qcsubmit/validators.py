@@ -2,7 +2,7 @@
 Centralise the validators for easy reuse between factories and datasets.
 """
 
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 import qcelemental as qcel
 from openforcefield import topology as off
@@ -213,7 +213,9 @@ def check_constraints(constraints: Constraints, molecule: off.Molecule) -> Const
 
 
 def check_linear_torsions(
-    torsion: Tuple[int, int, int, int], molecule: off.Molecule
+    torsion: Tuple[int, int, int, int],
+    molecule: off.Molecule,
+    linear_bonds: Optional[List[Tuple[int, int]]] = None,
 ) -> Tuple[int, int, int, int]:
     """
     Check that the torsion supplied is not for a linear bond.
@@ -221,18 +223,21 @@ def check_linear_torsions(
     Parameters:
         torsion: The indices of the atoms in the selected torsion.
         molecule: The molecule which should be checked.
+        linear_bonds: The central bonds of the linear torsions in the molecule if they have already been found, this
+            saves matching the molecule again when it has many torsions.
 
     Raises:
         LinearTorsionError: If the given torsion involves driving a linear bond.
     """
 
-    # this is based on the past submissions to QCarchive which have failed
-    # highlight the central bond of a linear torsion
-    linear_smarts = "[*!D1:1]~[$(*#*)&D2,$(C=*)&D2:2]"
+    if linear_bonds is None:
+        # this is based on the past submissions to QCarchive which have failed
+        # highlight the central bond of a linear torsion
+        linear_smarts = "[*!D1:1]~[$(*#*)&D2,$(C=*)&D2:2]"
 
-    matches = molecule.chemical_environment_matches(linear_smarts)
+        linear_bonds = molecule.chemical_environment_matches(linear_smarts)
 
-    if torsion[1:3] in matches or torsion[2:0:-1] in matches:
+    if torsion[1:3] in linear_bonds or torsion[2:0:-1] in linear_bonds:
         raise LinearTorsionError(
             f"The dihedral {torsion} in molecule {molecule} highlights a linear bond."
         )
@@ -1,5 +1,6 @@
 import abc
-from typing import Any, Dict, List, Optional
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
 import tqdm
 from openforcefield.topology import Molecule
@@ -8,8 +9,15 @@ from pydantic import BaseModel, Field, validator
 from pydantic.main import ModelMetaclass
 from qcelemental.util import which_import
 
+from openff.qcsubmit.cache import ResultCache
 from openff.qcsubmit.common_structures import ComponentProperties
 from openff.qcsubmit.datasets import ComponentResult
+from openff.qcsubmit.executors import (
+    SchedulingReport,
+    WorkflowExecutor,
+    get_executor,
+)
+from openff.qcsubmit.utils import chunk_generator
 
 
 class InheritSlots(ModelMetaclass):
@@ -61,13 +69,15 @@ class CustomWorkflowComponent(BaseModel, abc.ABC, metaclass=InheritSlots):
 
     # this is a pydantic workaround to add private variables taken from
     # https://github.com/samuelcolvin/pydantic/issues/655
-    __slots__ = [
-        "_cache",
-    ]
+    __slots__ = ["_cache", "_resource_limits", "_result_info", "_hash_method"]
 
     def __init__(self, *args, **kwargs):
         super(CustomWorkflowComponent, self).__init__(*args, **kwargs)
         self._cache = {}
+        self._resource_limits = {}
+        self._result_info = None
+        # the duplicate key used by the results, this is set by the factory running the component
+        self._hash_method = "inchikey"
 
     def __setattr__(self, attr: str, value: Any) -> None:
         """
@@ -77,6 +87,8 @@ class CustomWorkflowComponent(BaseModel, abc.ABC, metaclass=InheritSlots):
             object.__setattr__(self, attr, value)
         else:
             super(CustomWorkflowComponent, self).__setattr__(attr, value)
+            # the settings have changed so the cached description is out of date
+            object.__setattr__(self, "_result_info", None)
 
     # getstate and setstate are needed since private instance members (_*)
     # are not included in pickles by Pydantic at the current moment. Force them
@@ -93,6 +105,45 @@ class CustomWorkflowComponent(BaseModel, abc.ABC, metaclass=InheritSlots):
         for slot in d:
             setattr(self, slot, d[slot])
 
+    @property
+    def resource_limits(self) -> ComponentProperties:
+        """
+        Returns:
+            The runtime properties of the component including any resource limits set on this instance.
+        """
+        if not self._resource_limits:
+            return self._properties
+        return self._properties.copy(update=self._resource_limits)
+
+    def set_resource_limits(
+        self,
+        max_workers: Optional[int] = None,
+        max_memory: Optional[float] = None,
+        licence_seats: Optional[int] = None,
+    ) -> None:
+        """
+        Override the resource limits declared by the component for this instance, so that cheap components can be ran
+        wide and heavy components narrow in the same workflow.
+
+        Parameters:
+            max_workers: The most workers which may run the component at once.
+            max_memory: The memory in MB each worker needs to run the component.
+            licence_seats: The number of licence seats available to the component.
+
+        Note:
+            Only the limits which are given are changed, the limits are not part of the component settings so they are
+            not exported with the workflow.
+        """
+        limits = {
+            "max_workers": max_workers,
+            "max_memory": max_memory,
+            "licence_seats": licence_seats,
+        }
+        limits = {name: value for name, value in limits.items() if value is not None}
+        # validate the new limits before storing them
+        ComponentProperties(**limits)
+        self._resource_limits.update(limits)
+
     @classmethod
     @abc.abstractmethod
     def is_available(cls) -> bool:
@@ -120,9 +171,52 @@ class CustomWorkflowComponent(BaseModel, abc.ABC, metaclass=InheritSlots):
         """
         ...
 
+    def _apply_batch(self, molecules: List[Molecule]) -> ComponentResult:
+        """
+        Apply the component to a batch of molecules in a single call, this is only used when the component declares a
+        preferred `batch_size` in its properties and lets the component share setup or use vectorised code across the
+        batch.
+
+        By default the batch is passed straight to `_apply`, components should only override this when the batched
+        code differs from `_apply`.
+
+        Parameters:
+            molecules: The batch of molecules to be processed by this component.
+
+        Returns:
+            A [ComponentResult][qcsubmit.datasets.ComponentResult] holding the results of every molecule in the batch.
+        """
+        return self._apply(molecules)
+
+    def _iter_work(
+        self, molecules: List[Molecule], cache: Optional[ResultCache] = None
+    ) -> Iterator[Tuple[int, ComponentResult]]:
+        """
+        Apply the component to the molecules one molecule at a time, or in batches when the component declares a
+        preferred batch size.
+
+        Note:
+            Molecules are always processed one at a time when a cache is used as the results are stored per molecule.
+
+        Parameters:
+            molecules: The molecules to be processed by this component.
+            cache: The cache of results for single molecules.
+
+        Returns:
+            An iterator over the number of molecules processed and their result.
+        """
+        batch_size = self._properties.batch_size
+        if batch_size is None or cache is not None:
+            for molecule in molecules:
+                yield 1, self._apply_molecule(molecule, cache=cache)
+        else:
+            for batch in chunk_generator(molecules, batch_size):
+                yield len(batch), self._apply_batch(batch)
+
     def _apply_init(self, result: ComponentResult) -> None:
         """
         Any actions that should be performed before running the main apply method should set up such as setting up the _cache for multiprocessing.
+        When running in parallel this is called once in each worker process before its first task.
         Here we clear out the _cache in case something has been set.
         """
         self._cache.clear()
@@ -133,11 +227,148 @@ class CustomWorkflowComponent(BaseModel, abc.ABC, metaclass=InheritSlots):
         """
         self._cache.clear()
 
+    def _is_pure_filter(self) -> bool:
+        """
+        Returns:
+            `True` if the component with its current settings is a pure filter which may be moved by the workflow
+            planner, components whose settings decide if they change the molecules should override this.
+        """
+        return self._properties.pure_filter
+
+    @classmethod
+    def _finalizes_result(cls) -> bool:
+        """
+        Returns:
+            `True` if the component overrides `_apply_finalize`, in which case its merged result must be finalized
+            before the molecules are handed to the next component.
+        """
+        return cls._apply_finalize is not CustomWorkflowComponent._apply_finalize
+
+    def _apply_molecule(
+        self, molecule: Molecule, cache: Optional[ResultCache] = None
+    ) -> ComponentResult:
+        """
+        Apply the component to a single molecule, reusing the cached result when there is one.
+
+        Parameters:
+            molecule: The molecule to be processed by this component.
+            cache: The cache of results which should be checked first and updated with the new result.
+        """
+        if cache is None:
+            return self._apply([molecule])
+
+        component_key = cache.get_component_key(*self._get_result_info())
+        molecule_key = cache.get_molecule_key(molecule)
+        result = cache.get(component_key, molecule_key)
+        if result is None:
+            result = self._apply([molecule])
+            cache.put(component_key, molecule_key, result)
+
+        return result
+
+    def _apply_chunk(
+        self, molecules: List[Molecule], cache: Optional[ResultCache] = None
+    ) -> ComponentResult:
+        """
+        Apply the component to a chunk of molecules one molecule at a time and collect the results together, this is
+        the unit of work sent to each worker process so that the component only has to be sent once per chunk.
+
+        Parameters:
+            molecules: The chunk of molecules to be processed by this component.
+            cache: The cache of results for single molecules, molecules with a cached result are not processed again.
+
+        Returns:
+            A [ComponentResult][qcsubmit.datasets.ComponentResult] containing the combined results for the chunk, with
+            the canonical order of each molecule computed so it can be merged in the parent without isomorphism checks.
+        """
+        # the description and provenance are only attached to the final result in the parent
+        result = ComponentResult(
+            component_name=self.component_name,
+            component_description={},
+            component_provenance={},
+            skip_unique_check=not self._properties.produces_duplicates,
+            hash_method=self._hash_method,
+        )
+
+        for _, work in self._iter_work(molecules, cache=cache):
+            result.update(work)
+
+        result.compute_canonical_orders()
+        return result
+
+    @staticmethod
+    def _get_chunk_size(
+        n_molecules: int, n_workers: int, batch_size: Optional[int] = None
+    ) -> int:
+        """
+        Work out a chunk size which keeps every worker busy while keeping the number of tasks sent between processes
+        small, this follows the heuristic used by `multiprocessing.Pool.map` of roughly four chunks per worker.
+
+        Parameters:
+            n_molecules: The total number of molecules to be processed.
+            n_workers: The number of worker processes available.
+            batch_size: The preferred batch size of the component, chunks larger than a batch are rounded up to a
+                whole number of batches so no short batches are made.
+
+        Returns:
+            The number of molecules which should be sent to a worker in each task.
+        """
+        chunk_size, extra = divmod(n_molecules, max(n_workers, 1) * 4)
+        if extra:
+            chunk_size += 1
+
+        if batch_size is not None and chunk_size > batch_size:
+            chunk_size = -(-chunk_size // batch_size) * batch_size
+
+        return max(chunk_size, 1)
+
+    def _estimate_cost(self, molecule: Molecule) -> float:
+        """
+        Make a cheap estimate of how long the component will take to process a molecule, this is only used to order
+        the work so the most expensive molecules start first and components whose cost scales differently should
+        override it.
+
+        The default grows with the number of heavy atoms, rotatable bonds and defined stereocentres.
+
+        Parameters:
+            molecule: The molecule whose cost should be estimated.
+
+        Returns:
+            The relative cost of processing the molecule.
+        """
+        import networkx as nx
+
+        heavy_graph = nx.Graph()
+        for bond in molecule.bonds:
+            if bond.atom1.atomic_number != 1 and bond.atom2.atomic_number != 1:
+                heavy_graph.add_edge(
+                    bond.atom1_index, bond.atom2_index, bond_order=bond.bond_order
+                )
+
+        n_heavy_atoms = sum(1 for atom in molecule.atoms if atom.atomic_number != 1)
+        # bonds which are not in a ring are the bridges of the heavy atom graph
+        n_rotors = sum(
+            1
+            for i, j in nx.bridges(heavy_graph)
+            if heavy_graph.edges[i, j]["bond_order"] == 1
+            and heavy_graph.degree[i] > 1
+            and heavy_graph.degree[j] > 1
+        )
+        n_stereo = sum(
+            1 for atom in molecule.atoms if atom.stereochemistry is not None
+        ) + sum(1 for bond in molecule.bonds if bond.stereochemistry is not None)
+
+        return float(n_heavy_atoms * (1 + n_rotors) * (1 + n_stereo))
+
     def apply(
         self,
         molecules: List[Molecule],
         processors: Optional[int] = None,
         verbose: bool = True,
+        chunk_size: Optional[int] = None,
+        executor: Optional[Union[str, WorkflowExecutor]] = None,
+        schedule: str = "input",
+        cache: Optional[Union[str, ResultCache]] = None,
     ) -> ComponentResult:
         """
         This is the main feature of the workflow component which should accept a molecule, perform the component action
@@ -147,58 +378,119 @@ class CustomWorkflowComponent(BaseModel, abc.ABC, metaclass=InheritSlots):
             molecules: The list of molecules to be processed by this component.
             processors: The number of processor the component can use to run the job in parallel across molecules, None will default to all cores.
             verbose: If true a progress bar will be shown on screen.
+            chunk_size: The number of molecules sent to a worker process in each task, None will pick a chunk size
+                based on the number of molecules and processors.
+            executor: The executor used to run the component in parallel, either the name of an executor type
+                `serial`, `threads`, `processes` or `dask` which is started for this component, or a running
+                [WorkflowExecutor][qcsubmit.executors.WorkflowExecutor] whose workers should be used in which case the
+                number of processors is set by the executor. None will use a pool of processes.
+            schedule: The order the molecules are sent to the workers, `input` keeps the input order while `lpt`
+                sends the most expensive molecules first by their estimated cost so that no worker is left running a
+                large molecule at the end of the run. The estimated time saved is stored on the result and printed
+                when verbose.
+            cache: A [ResultCache][qcsubmit.cache.ResultCache] or the directory of one, the result of the component
+                for each molecule is stored in the cache and molecules which were processed before with the same
+                settings are not processed again.
 
         Returns:
             An instance of the [ComponentResult][qcsubmit.datasets.ComponentResult]
             class which handles collecting together molecules that pass and fail
             the component
         """
-        result: ComponentResult = self._create_result()
+        if schedule not in ["input", "lpt"]:
+            raise ValueError(
+                f"The schedule {schedule} is not supported, please chose from ['input', 'lpt']."
+            )
 
-        self._apply_init(result)
+        if isinstance(cache, str):
+            cache = ResultCache(directory=cache)
 
-        # Use a Pool to get around the GIL. As long as self does not contain
-        # too much data, this should be efficient.
+        result: ComponentResult = self._create_result()
+
+        # Use a Pool to get around the GIL, each worker sets up the component
+        # once using _apply_init before processing its chunks.
+        if self._properties.process_parallel and (
+            executor is not None or processors is None or processors > 1
+        ):
 
-        if (processors is None or processors > 1) and self._properties.process_parallel:
+            pool = get_executor(
+                executor or "processes", processors=processors, components=[self]
+            )
 
-            from multiprocessing.pool import Pool
+            # the component may be limited to fewer workers than the pool has
+            n_workers = pool.get_max_workers([self])
+            if chunk_size is None:
+                chunk_size = self._get_chunk_size(
+                    n_molecules=len(molecules),
+                    n_workers=n_workers,
+                    batch_size=self._properties.batch_size,
+                )
 
-            with Pool(processes=processors) as pool:
+            costs = None
+            if schedule == "lpt":
+                costs = [self._estimate_cost(molecule) for molecule in molecules]
 
-                # Assumes to process in batches of 1 for now
-                work_list = [
-                    pool.apply_async(self._apply, ([molecule],))
-                    for molecule in molecules
-                ]
-                for work in tqdm.tqdm(
-                    work_list,
-                    total=len(work_list),
+            try:
+                start_time = time.perf_counter()
+                with tqdm.tqdm(
+                    total=len(molecules),
                     ncols=80,
                     desc="{:30s}".format(self.component_name),
                     disable=not verbose,
-                ):
-                    work = work.get()
-                    for success in work.molecules:
-                        result.add_molecule(success)
-                    for fail in work.filtered:
-                        result.filter_molecule(fail)
+                ) as progress:
+
+                    # stream the results back as each chunk finishes and merge them straight away
+                    for work in pool.apply_component(
+                        component=self,
+                        molecules=molecules,
+                        chunk_size=chunk_size,
+                        costs=costs,
+                        cache=cache,
+                    ):
+                        # the workers already computed the hashes so this is only dictionary operations
+                        result.update(work)
+                        # chunks hold at most chunk size molecules
+                        progress.update(min(chunk_size, progress.total - progress.n))
+
+                # the workers only clean up their own copies so finish the merged
+                # result here
+                pool.finalize_component(self, result)
+
+                if costs is not None:
+                    result.scheduling_report = SchedulingReport.from_costs(
+                        costs=costs,
+                        n_workers=n_workers,
+                        chunk_size=chunk_size,
+                        wall_time=time.perf_counter() - start_time,
+                    )
+                    if verbose:
+                        print(
+                            f"{self.component_name}: largest first scheduling saved an estimated "
+                            f"{result.scheduling_report.time_saved:.1f}s of tail latency."
+                        )
+
+            finally:
+                # only close the pool if we made it
+                if pool is not executor:
+                    pool.shutdown()
 
         else:
-            for molecule in tqdm.tqdm(
-                molecules,
+            self._apply_init(result)
+
+            with tqdm.tqdm(
                 total=len(molecules),
                 ncols=80,
                 desc="{:30s}".format(self.component_name),
                 disable=not verbose,
-            ):
-                work = self._apply([molecule])
-                for success in work.molecules:
-                    result.add_molecule(success)
-                for fail in work.filtered:
-                    result.filter_molecule(fail)
+            ) as progress:
+                for n_molecules, work in self._iter_work(molecules, cache=cache):
+                    result.update(work)
+                    progress.update(n_molecules)
+
+            self._apply_finalize(result)
 
-        self._apply_finalize(result)
+        if cache is not None:
+            cache.evict()
 
         return result
 
@@ -213,6 +505,19 @@ class CustomWorkflowComponent(BaseModel, abc.ABC, metaclass=InheritSlots):
         """
         ...
 
+    def _get_result_info(self) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """
+        Get the description and provenance of the component, these are computed once and reused until the settings of
+        the component are changed as the provenance has to import and inspect each dependency.
+
+        Returns:
+            The dictionary representation of the component and its provenance.
+        """
+        if getattr(self, "_result_info", None) is None:
+            self._result_info = (self.dict(), self.provenance())
+
+        return self._result_info
+
     def _create_result(self, **kwargs) -> ComponentResult:
         """
         A helpful method to build to create the component result with the required information.
@@ -220,12 +525,14 @@ class CustomWorkflowComponent(BaseModel, abc.ABC, metaclass=InheritSlots):
         Returns:
             A [ComponentResult][qcsubmit.datasets.ComponentResult] instantiated with the required information.
         """
+        description, provenance = self._get_result_info()
 
         result = ComponentResult(
             component_name=self.component_name,
-            component_description=self.dict(),
-            component_provenance=self.provenance(),
+            component_description=description,
+            component_provenance=provenance,
             skip_unique_check=not self._properties.produces_duplicates,
+            hash_method=self._hash_method,
             **kwargs,
         )
 
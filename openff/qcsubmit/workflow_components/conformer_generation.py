@@ -27,7 +27,12 @@ class StandardConformerGenerator(ToolkitValidator, CustomWorkflowComponent):
     component_fail_message = "Conformers could not be generated"
 
     # custom components for this class
-    _properties = ComponentProperties(process_parallel=True, produces_duplicates=False)
+    _properties = ComponentProperties(
+        process_parallel=True,
+        produces_duplicates=False,
+        changes_graph=False,
+        relative_cost=100,
+    )
 
     rms_cutoff: Optional[float] = Field(
         None,
@@ -2,8 +2,9 @@
 File containing the filters workflow components.
 """
 import re
-from typing import Dict, List, Optional, Set, Union
+from typing import Dict, List, Optional, Set, Tuple, Union
 
+import numpy as np
 from openforcefield.topology import Molecule
 from openforcefield.typing.chemistry.environment import (
     ChemicalEnvironment,
@@ -21,6 +22,21 @@ from openff.qcsubmit.workflow_components.base_component import (
 )
 
 
+def _get_atomic_numbers(molecules: List[Molecule]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Get the atomic numbers of every atom in a batch of molecules as a single array along with the index of the molecule
+    each atom belongs to, so that values per molecule can be found with `np.bincount`.
+    """
+    n_atoms = np.array([molecule.n_atoms for molecule in molecules], dtype=np.int64)
+    atomic_numbers = np.fromiter(
+        (atom.atomic_number for molecule in molecules for atom in molecule.atoms),
+        dtype=np.int64,
+        count=int(n_atoms.sum()),
+    )
+    molecule_indices = np.repeat(np.arange(len(molecules)), n_atoms)
+    return atomic_numbers, molecule_indices
+
+
 class MolecularWeightFilter(BasicSettings, CustomWorkflowComponent):
     """
     Filters molecules based on the minimum and maximum allowed molecular weights.
@@ -41,7 +57,11 @@ class MolecularWeightFilter(BasicSettings, CustomWorkflowComponent):
         description="The maximum allow molecule weight, default taken from the openeye blockbuster filter.",
     )
     _properties: ComponentProperties = ComponentProperties(
-        process_parallel=True, produces_duplicates=False
+        process_parallel=True,
+        produces_duplicates=False,
+        pure_filter=True,
+        changes_graph=False,
+        batch_size=256,
     )
 
     def _apply(self, molecules: List[Molecule]) -> ComponentResult:
@@ -133,7 +153,13 @@ class ElementFilter(BasicSettings, CustomWorkflowComponent):
         ],
         description="The list of allowed elements as symbols or atomic number ints.",
     )
-    _properties = ComponentProperties(process_parallel=True, produces_duplicates=False)
+    _properties = ComponentProperties(
+        process_parallel=True,
+        produces_duplicates=False,
+        pure_filter=True,
+        changes_graph=False,
+        batch_size=256,
+    )
 
     @validator("allowed_elements", each_item=True)
     def check_allowed_elements(cls, element: Union[str, int]) -> Union[str, int]:
@@ -182,18 +208,24 @@ class ElementFilter(BasicSettings, CustomWorkflowComponent):
         """
 
         result = self._create_result()
+        if not molecules:
+            return result
 
         # First lets convert the allowed_elements list to ints as this is what is stored in the atom object
         _allowed_elements = self._cache["elements"]
 
-        # now apply the filter
-        for molecule in molecules:
-            for atom in molecule.atoms:
-                if atom.atomic_number not in _allowed_elements:
-                    result.filter_molecule(molecule)
-                    break
-            else:
+        # now apply the filter to every atom in the batch at once
+        atomic_numbers, molecule_indices = _get_atomic_numbers(molecules)
+        n_disallowed = np.bincount(
+            molecule_indices[~np.isin(atomic_numbers, _allowed_elements)],
+            minlength=len(molecules),
+        )
+        passed = n_disallowed == 0
+        for molecule, molecule_passed in zip(molecules, passed):
+            if molecule_passed:
                 result.add_molecule(molecule)
+            else:
+                result.filter_molecule(molecule)
 
         return result
 
@@ -254,7 +286,17 @@ class CoverageFilter(BasicSettings, CustomWorkflowComponent):
         False,
         description="If we should tag any dihedral ids exercised for torsion driving.",
     )
-    _properties = ComponentProperties(process_parallel=True, produces_duplicates=False)
+    _properties = ComponentProperties(
+        process_parallel=True,
+        produces_duplicates=False,
+        pure_filter=True,
+        changes_graph=False,
+        relative_cost=20,
+    )
+
+    def _is_pure_filter(self) -> bool:
+        # tagging the dihedrals changes the molecules
+        return super()._is_pure_filter() and not self.tag_dihedrals
 
     def _apply_init(self, result: ComponentResult) -> None:
 
@@ -359,7 +401,13 @@ class RotorFilter(BasicSettings, CustomWorkflowComponent):
     maximum_rotors: int = Field(
         4, description="The maximum number of rotatable bonds allowed in the molecule."
     )
-    _properties = ComponentProperties(process_parallel=True, produces_duplicates=False)
+    _properties = ComponentProperties(
+        process_parallel=True,
+        produces_duplicates=False,
+        pure_filter=True,
+        changes_graph=False,
+        relative_cost=2,
+    )
 
     def _apply(self, molecules: List[Molecule]) -> ComponentResult:
         """
@@ -403,7 +451,9 @@ class SmartsFilter(BasicSettings, CustomWorkflowComponent):
     component_fail_message = (
         "The molecule did/didn't contain the given smarts patterns."
     )
-    _properties = ComponentProperties(process_parallel=True, produces_duplicates=False)
+    _properties = ComponentProperties(
+        process_parallel=True, produces_duplicates=False, changes_graph=False
+    )
 
     allowed_substructures: Optional[List[str]] = Field(
         None,
@@ -511,7 +561,12 @@ class RMSDCutoffConformerFilter(BasicSettings, CustomWorkflowComponent):
 
     # custom components for this class
     cutoff: float = Field(-1.0, description="The RMSD cut off in angstroms.")
-    _properties = ComponentProperties(process_parallel=True, produces_duplicates=False)
+    _properties = ComponentProperties(
+        process_parallel=True,
+        produces_duplicates=False,
+        changes_graph=False,
+        relative_cost=10,
+    )
 
     def _prune_conformers(self, molecule: Molecule) -> None:
 
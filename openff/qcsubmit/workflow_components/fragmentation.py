@@ -27,7 +27,9 @@ class WBOFragmenter(ToolkitValidator, CustomWorkflowComponent):
         "Fragment a molecule across all rotatble bonds using the WBO fragmenter."
     )
     component_fail_message = "The molecule could not be fragmented correctly."
-    _properties = ComponentProperties(process_parallel=True, produces_duplicates=True)
+    _properties = ComponentProperties(
+        process_parallel=True, produces_duplicates=True, relative_cost=100
+    )
     threshold: float = Field(
         0.03,
         description="The WBO error threshold between the parent and the fragment value, the fragmentation will stop when the difference between the fragment and parent is less than this value.",
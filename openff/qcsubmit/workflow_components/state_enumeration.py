@@ -33,7 +33,9 @@ class EnumerateTautomers(ToolkitValidator, CustomWorkflowComponent):
     max_tautomers: int = Field(
         20, description="The maximum number of tautomers that should be generated."
     )
-    _properties = ComponentProperties(process_parallel=True, produces_duplicates=True)
+    _properties = ComponentProperties(
+        process_parallel=True, produces_duplicates=True, relative_cost=20
+    )
 
     def _apply_init(self, result: ComponentResult) -> None:
         """
@@ -92,7 +94,9 @@ class EnumerateStereoisomers(ToolkitValidator, CustomWorkflowComponent):
     component_fail_message = (
         "The molecules stereo centers or bonds could not be enumerated"
     )
-    _properties = ComponentProperties(process_parallel=True, produces_duplicates=True)
+    _properties = ComponentProperties(
+        process_parallel=True, produces_duplicates=True, relative_cost=20
+    )
     undefined_only: bool = Field(
         False,
         description="If we should only enumerate parts of the molecule with undefined stereochemistry or all stereochemistry.",
@@ -168,7 +172,9 @@ class EnumerateProtomers(ToolkitValidator, CustomWorkflowComponent):
     # restrict the allowed toolkits for this module
     toolkit = "openeye"
     _toolkits = {"openeye": OpenEyeToolkitWrapper}
-    _properties = ComponentProperties(process_parallel=True, produces_duplicates=True)
+    _properties = ComponentProperties(
+        process_parallel=True, produces_duplicates=True, relative_cost=20
+    )
 
     max_states: int = Field(
         10, description="The maximum number of states that should be generated."